@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+import chess_elo_chart
+
+# Batch rendering of many charts from one shared rating matrix.
+#
+# The manifest lists chart jobs (output path plus render_chart options, typically a player
+# subset). The interpolated matrix for the union of all charted players is computed once,
+# copied into a shared memory block and mapped read-only by every worker of a process
+# pool, so workers never receive pickled copies of it. Each worker renders its jobs with
+# the object-oriented Figure API and shares no pyplot state with the others.
+#
+# Jobs on the 'calendar' axis are drawn from a second shared matrix on the calendar date
+# grid, computed once for the players of those jobs.
+
+# Per-worker state set up by _init_worker
+_worker = {}
+
+
+# Read a manifest: either a list of jobs or {"input": roster.json, "jobs": [...]}.
+# Every job needs an "output" path; its other keys are render_chart options.
+def load_manifest(path):
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+    for job in manifest['jobs']:
+        if 'output' not in job:
+            raise ValueError(f"Every job in {path} needs an 'output' path")
+    if manifest.get('input'):
+        roster = os.path.join(os.path.dirname(path), manifest['input'])
+        manifest['data'] = chess_elo_chart.load_players_data(roster)
+    return manifest
+
+
+# Players used by any job, in first-use order
+def _charted_players(jobs, data):
+    players = {}
+    for job in jobs:
+        for player in job.get('players') or data:
+            players.setdefault(player, None)
+    return list(players)
+
+
+# Pool workers share the parent's resource tracker, so the block stays owned by the
+# parent and is unlinked once, by render_batch, whichever way the workers exit
+def _attach_shared(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(blocks, data):
+    import pandas as pd
+
+    _worker['shm'] = []
+    _worker['matrix'] = {}
+    for axis, (name, shape, dtype, players, index) in blocks.items():
+        shm = _attach_shared(name)
+        matrix = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        matrix.flags.writeable = False
+        _worker['shm'].append(shm)
+        _worker['matrix'][axis] = pd.DataFrame(matrix, index=index, columns=players, copy=False)
+    _worker['data'] = data
+
+
+def _job_axis(job):
+    return job.get('axis') or chess_elo_chart.DEFAULT_OPTIONS['axis']
+
+
+def _render_job(job):
+    started = time.perf_counter()
+    options = {key: value for key, value in job.items() if key != 'output'}
+    chess_elo_chart.render_chart(_worker['data'], job['output'], options,
+                                 rating_matrix=_worker['matrix'][_job_axis(job)])
+    return job['output'], time.perf_counter() - started
+
+
+# Copy a rating matrix into a new shared memory block; returns the block and what
+# _init_worker needs to map it
+def _share(df):
+    values = np.ascontiguousarray(df.to_numpy())
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+    return shm, (shm.name, values.shape, values.dtype, list(df.columns), df.index.to_numpy())
+
+
+# Render every job of a manifest with `workers` processes (all cores when None).
+# Returns [(output, seconds), ...] in completion order.
+def render_batch(jobs, data=None, workers=None, cache=None, progress=None):
+    data = chess_elo_chart.players_data if data is None else data
+    for job in jobs:
+        if job.get('show'):
+            raise ValueError("Batch jobs cannot use the 'show' option")
+        if _job_axis(job) not in chess_elo_chart.CHART_AXES:
+            raise ValueError(f"Unknown axis {job['axis']!r} in job {job['output']}")
+    calendar_jobs = [job for job in jobs if _job_axis(job) == 'calendar']
+    birth_years = [job.get('birth_years') for job in calendar_jobs]
+    if any(years != birth_years[0] for years in birth_years):
+        raise ValueError("Calendar jobs of one batch must share the same 'birth_years'")
+    players = _charted_players(jobs, data)
+    data = chess_elo_chart.select_players(data, players)
+
+    # Compute each matrix once and place it in shared memory
+    matrices = {}
+    age_jobs = [job for job in jobs if _job_axis(job) == 'age']
+    if age_jobs:
+        age_data = chess_elo_chart.select_players(data, _charted_players(age_jobs, data))
+        matrices['age'] = chess_elo_chart.build_rating_matrix(age_data, chess_elo_chart.all_ages, cache=cache)
+    if calendar_jobs:
+        from calendar_index import build_calendar_matrix
+        calendar_data = chess_elo_chart.select_players(data, _charted_players(calendar_jobs, data))
+        matrices['calendar'] = build_calendar_matrix(calendar_data, birth_years[0])
+
+    shared, blocks = [], {}
+    try:
+        for axis in list(matrices):
+            shm, blocks[axis] = _share(matrices.pop(axis))
+            shared.append(shm)
+
+        workers = workers or os.cpu_count() or 1
+        results = []
+        with get_context().Pool(workers, initializer=_init_worker, initargs=(blocks, data)) as pool:
+            for result in pool.imap_unordered(_render_job, jobs):
+                results.append(result)
+                if progress is not None:
+                    progress(*result)
+        return results
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m batch_render',
+        description='Render many charts from one shared, precomputed rating matrix.')
+    parser.add_argument('manifest', help='JSON manifest of chart jobs')
+    parser.add_argument('-j', '--workers', type=int, help='worker processes (default: all cores)')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only print the summary')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    manifest = load_manifest(args.manifest)
+    cache = None
+    if args.cache_dir:
+        from rating_cache import GridCache
+        cache = GridCache(args.cache_dir)
+
+    progress = None if args.quiet else (lambda output, seconds: print(f"{output} ({seconds:.2f}s)"))
+    started = time.perf_counter()
+    results = render_batch(manifest['jobs'], manifest.get('data'), workers=args.workers,
+                           cache=cache, progress=progress)
+    elapsed = time.perf_counter() - started
+    print(f"Rendered {len(results)} charts in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+import chess_elo_chart
+
+# Benchmark suite for the chart pipeline.
+#
+# Synthetic rosters of increasing size are rendered with render_chart() under an
+# instrumentation.Instrumentation, which times each stage separately: interpolation, the
+# grid cells, markers, the side panels (legend, info and timeline), layout and savefig, and
+# counts the artists of every axes. Every case runs in a fresh worker process
+# so its peak RSS is not inflated by earlier, larger cases. Results are written as JSON so
+# runs can be compared between releases.
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_SERIES_LENGTHS = (20, 60)
+DEFAULT_MODES = ('patches', 'collection', 'raster')
+
+# The per-cell renderer gets too slow to be worth timing on big rosters
+PATCHES_MAX_PLAYERS = 100
+
+
+# A roster of `n_players` synthetic careers with `series_length` points each: a rise from
+# a junior rating to a peak, then a slow decline, with some noise on top
+def make_synthetic_roster(n_players, series_length=40, seed=0):
+    rng = np.random.default_rng(seed)
+    start_ages = rng.uniform(10, 20, n_players)
+    spans = rng.uniform(15, 55, n_players)
+    peaks = rng.uniform(2400, 2880, n_players)
+    peak_at = rng.uniform(0.2, 0.6, n_players)
+    juniors = rng.uniform(1900, 2300, n_players)
+
+    steps = np.linspace(0, 1, series_length)
+    roster = {}
+    for i in range(n_players):
+        ages = start_ages[i] + spans[i] * steps
+        rise = juniors[i] + (peaks[i] - juniors[i]) * np.minimum(steps / peak_at[i], 1) ** 0.5
+        decline = np.maximum(steps - peak_at[i], 0) * rng.uniform(50, 300)
+        ratings = np.round(rise - decline + rng.normal(0, 8, series_length))
+        roster[f'Player {i:05d}'] = list(zip(np.round(ages, 3).tolist(), ratings.astype(int).tolist()))
+    return roster
+
+
+# Run one case through render_chart() and return its stage timings and artist counts
+def run_case(n_players, series_length, render_mode, dpi=120, seed=0):
+    from fide_ingest import peak_rss_mib
+    from instrumentation import Instrumentation
+
+    data = make_synthetic_roster(n_players, series_length, seed)
+
+    # Pay the pandas/scipy import cost outside of the timed stages
+    chess_elo_chart.build_rating_matrix(make_synthetic_roster(1, 4), chess_elo_chart.all_ages[:2])
+
+    instrument = Instrumentation()
+    options = {'render_mode': render_mode, 'dpi': dpi, 'instrument': instrument}
+    try:
+        chess_elo_chart.render_chart(data, io.BytesIO(), options)
+    finally:
+        instrument.close()
+    totals = instrument.totals()
+    df = chess_elo_chart.build_rating_matrix(data, chess_elo_chart.all_ages)
+
+    return {
+        'players': n_players,
+        'series_length': series_length,
+        'render_mode': render_mode,
+        'cells': int(df.iloc[::chess_elo_chart.sample_step].notna().to_numpy().sum()),
+        'stages': {stage: round(seconds, 4) for stage, seconds in totals.items()},
+        'total': round(sum(totals.values()), 4),
+        'artists': instrument.artists,
+        'peak_rss_mib': round(peak_rss_mib(), 1),
+    }
+
+
+def _run_case_star(args):
+    return run_case(*args)
+
+
+def cases(sizes, series_lengths, modes):
+    for n_players in sizes:
+        for series_length in series_lengths:
+            for mode in modes:
+                if mode == 'patches' and n_players > PATCHES_MAX_PLAYERS:
+                    continue
+                yield n_players, series_length, mode
+
+
+# Run every case, each in a fresh process, and return the JSON-ready report
+def run_benchmarks(sizes=DEFAULT_SIZES, series_lengths=DEFAULT_SERIES_LENGTHS, modes=DEFAULT_MODES,
+                   dpi=120, progress=None):
+    import matplotlib
+
+    results = []
+    context = get_context()
+    for case in cases(sizes, series_lengths, modes):
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            result = pool.apply(_run_case_star, ((*case, dpi),))
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'dpi': dpi,
+        },
+        'results': results,
+    }
+
+
+def _format_result(result):
+    stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in result['stages'].items())
+    return (f"{result['players']:>6} players x {result['series_length']:>3} points "
+            f"[{result['render_mode']}]: {result['total']:.2f}s ({stages}), "
+            f"peak RSS {result['peak_rss_mib']:.0f} MiB")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmark',
+        description='Time every stage of the chart pipeline on synthetic rosters.')
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='JSON report path (default: %(default)s)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='roster sizes (default: %(default)s)')
+    parser.add_argument('--series-lengths', type=int, nargs='+', default=list(DEFAULT_SERIES_LENGTHS),
+                        help='data points per player (default: %(default)s)')
+    parser.add_argument('--modes', nargs='+', default=list(DEFAULT_MODES),
+                        choices=[mode for mode in chess_elo_chart.RENDER_MODES if mode != 'auto'],
+                        help='render modes to time (default: %(default)s)')
+    parser.add_argument('--dpi', type=int, default=120, help='savefig resolution (default: %(default)s)')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    report = run_benchmarks(args.sizes, args.series_lengths, args.modes, dpi=args.dpi,
+                            progress=lambda result: print(_format_result(result)))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
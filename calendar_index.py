@@ -0,0 +1,268 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+
+import chess_elo_chart
+
+# Calendar-year alignment and "top N at a date" rankings.
+#
+# Series are recorded by age. With each player's birth year they are placed on the
+# calendar in one vectorized pass over the flattened roster (date = birth year + age), then
+# interpolated onto a shared monthly date grid. The result is a (dates x players) matrix
+# that is NaN outside each player's recorded career: a player is not ranked before the
+# first or after the last rating, instead of being clamped to the end ratings as on the
+# age chart.
+#
+# For every date a rank index keeps the columns of the top `depth` players, sorted once
+# with argpartition over the whole matrix. "Top 10 at 1985-01" is then a row slice, and
+# "months at #1" a bincount of the first column. The same matrix drives the calendar-year
+# view of the chart ('axis' option of render_chart).
+#
+# Dates are months, written 'YYYY-MM' (or 'YYYY' for January) and held internally as
+# year * 12 + month - 1.
+
+MONTHS_PER_YEAR = 12
+DEFAULT_DEPTH = 100
+
+
+# Month number of a 'YYYY-MM' / 'YYYY' string or a fractional year
+def parse_month(value):
+    if isinstance(value, str):
+        year, _, month = value.strip().partition('-')
+        try:
+            year, month = int(year), int(month or 1)
+        except ValueError:
+            raise ValueError(f"Invalid date {value!r}, expected YYYY-MM") from None
+        if not 1 <= month <= MONTHS_PER_YEAR:
+            raise ValueError(f"Invalid month in {value!r}")
+        return year * MONTHS_PER_YEAR + month - 1
+    return int(round(float(value) * MONTHS_PER_YEAR))
+
+
+def format_month(month):
+    return f'{month // MONTHS_PER_YEAR}-{month % MONTHS_PER_YEAR + 1:02d}'
+
+
+# Birth year of every player of `data` in roster order (0 = unknown). Explicit
+# `birth_years` win over a PlayerStore's own metadata, which wins over the built-in table.
+def resolve_birth_years(data, birth_years=None):
+    from player_store import PlayerStore
+
+    names = list(data)
+    if isinstance(data, PlayerStore):
+        births = data.birth_years.astype(np.int64)
+    else:
+        births = np.fromiter((getattr(series, 'birth_year', None) or 0 for series in data.values()),
+                             dtype=np.int64, count=len(names))
+    for i in np.flatnonzero(births == 0):
+        births[i] = chess_elo_chart.birth_years.get(names[i], 0)
+    if birth_years:
+        for i, name in enumerate(names):
+            if name in birth_years:
+                births[i] = birth_years[name]
+    return births
+
+
+# {player: birth year} of the players of `data` whose birth year is known
+def birth_year_map(data, birth_years=None):
+    return {player: int(year) for player, year in zip(data, resolve_birth_years(data, birth_years)) if year}
+
+
+# Flat (lengths, ages, ratings) arrays of a roster, in roster order
+def _flatten(data):
+    from player_store import PlayerStore
+
+    if isinstance(data, PlayerStore):
+        points = data.points
+        return (np.diff(data.offsets), data.age_months[:points] / MONTHS_PER_YEAR,
+                data.ratings[:points].astype(np.float64))
+
+    arrays = [np.asarray(series, dtype=np.float64).reshape(-1, 2) for series in data.values()]
+    lengths = np.fromiter((len(points) for points in arrays), dtype=np.int64, count=len(arrays))
+    points = np.concatenate(arrays) if arrays else np.empty((0, 2))
+    return lengths, points[:, 0], points[:, 1]
+
+
+# Place every series on the calendar at once: flat (rows, dates, ratings) arrays with
+# dates in fractional years, where rows index the roster. Points of players without a
+# known birth year are dropped.
+def align_to_calendar(data, birth_years=None):
+    lengths, ages, ratings = _flatten(data)
+    births = resolve_birth_years(data, birth_years)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    point_births = births[rows]
+    known = point_births > 0
+    return rows[known], point_births[known] + ages[known], ratings[known]
+
+
+class CalendarIndex:
+    def __init__(self, data=None, birth_years=None, kind='cubic', step_months=1, start=None, stop=None,
+                 depth=DEFAULT_DEPTH, dtype=np.float32):
+        data = chess_elo_chart.players_data if data is None else data
+        if step_months < 1:
+            raise ValueError("step_months must be at least 1")
+        names = list(data)
+        rows, dates, ratings = align_to_calendar(data, birth_years)
+        if not len(rows):
+            raise ValueError(f"No birth year for: {', '.join(names)}" if names else "No players to index")
+        aligned = np.unique(rows)
+        self.missing = [names[row] for row in np.setdiff1d(np.arange(len(names)), aligned)]
+        self.players = [names[row] for row in aligned]
+        self.kind = kind
+        self.step_months = step_months
+        self._columns = {player: column for column, player in enumerate(self.players)}
+
+        # Whole-year bounds by default, so grid samples fall on every January
+        first = parse_month(start) if start is not None else int(np.floor(dates.min())) * MONTHS_PER_YEAR
+        last = parse_month(stop) if stop is not None else int(np.ceil(dates.max())) * MONTHS_PER_YEAR
+        self.months = np.arange(first, last + 1, step_months)
+        self.dates = self.months / MONTHS_PER_YEAR
+        self.matrix = self._interpolate(rows, dates, ratings, dtype)
+        self.active = np.count_nonzero(~np.isnan(self.matrix), axis=1)
+        self.requested_depth = depth
+        self.depth = min(depth, len(self.players))
+        self.ranks = self._rank(self.depth)
+
+    # Evaluate each player's interpolant only over the grid dates inside its career
+    def _interpolate(self, rows, dates, ratings, dtype):
+        matrix = np.full((len(self.months), len(self.players)), np.nan, dtype=dtype)
+        boundaries = np.flatnonzero(np.diff(rows)) + 1
+        for column, (x, y) in enumerate(zip(np.split(dates, boundaries), np.split(ratings, boundaries))):
+            lo = np.searchsorted(self.dates, x.min() - 1e-9, side='left')
+            hi = np.searchsorted(self.dates, x.max() + 1e-9, side='right')
+            if lo < hi:
+                f = chess_elo_chart.fit_interpolant(np.column_stack([x, y]), self.kind)
+                matrix[lo:hi, column] = f(self.dates[lo:hi])
+        return matrix
+
+    # Columns of the `depth` highest rated players at every date, best first; unrated
+    # players sort last and are cut off by self.active
+    def _rank(self, depth):
+        if depth == 0:
+            return np.empty((len(self.months), 0), dtype=np.int32)
+        keys = np.where(np.isnan(self.matrix), np.inf, -self.matrix)
+        if depth < keys.shape[1]:
+            top = np.argpartition(keys, depth - 1, axis=1)[:, :depth]
+        else:
+            top = np.broadcast_to(np.arange(keys.shape[1]), keys.shape)
+        order = np.argsort(np.take_along_axis(keys, top, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(top, order, axis=1).astype(np.int32)
+
+    # Grid row of a date: the last sample at or before it
+    def row(self, date):
+        month = parse_month(date)
+        row = (month - self.months[0]) // self.step_months
+        if not 0 <= row < len(self.months):
+            raise ValueError(f"{format_month(month)} is outside "
+                             f"{format_month(self.months[0])}..{format_month(self.months[-1])}")
+        return int(row)
+
+    # [(player, rating), ...] of the n highest rated players at a date (all of them when
+    # the roster is smaller)
+    def top(self, date, n=10):
+        if n > self.requested_depth:
+            raise ValueError(f"Only the top {self.requested_depth} players are indexed")
+        n = min(n, len(self.players))
+        row = self.row(date)
+        columns = self.ranks[row, :min(n, self.active[row])]
+        return [(self.players[column], float(self.matrix[row, column])) for column in columns]
+
+    # 1-based rank of a player at a date, or None when not rated then
+    def rank_of(self, player, date):
+        if player not in self._columns:
+            raise KeyError(f"Unknown players: {player}")
+        ratings = self.matrix[self.row(date)]
+        rating = ratings[self._columns[player]]
+        if np.isnan(rating):
+            return None
+        return int(np.count_nonzero(ratings > rating)) + 1
+
+    # Column of the #1 player at every date, -1 when nobody is rated
+    def leaders(self):
+        if self.depth == 0:
+            raise ValueError("The index was built without rankings (depth=0)")
+        return np.where(self.active > 0, self.ranks[:, 0], -1)
+
+    # {player: months at #1}, longest first
+    def months_at_number_one(self):
+        leaders = self.leaders()
+        counts = np.bincount(leaders[leaders >= 0], minlength=len(self.players)) * self.step_months
+        order = np.argsort(-counts, kind='stable')
+        return {self.players[column]: int(counts[column]) for column in order if counts[column]}
+
+    # Uninterrupted spells at #1 as [(player, first month, last month), ...] in date order
+    def number_one_spells(self):
+        leaders = self.leaders()
+        starts = np.flatnonzero(np.diff(leaders, prepend=-2))
+        ends = np.append(starts[1:], len(leaders)) - 1
+        return [(self.players[leaders[s]], format_month(self.months[s]), format_month(self.months[e]))
+                for s, e in zip(starts, ends) if leaders[s] >= 0]
+
+    # The (dates x players) matrix as a DataFrame indexed by fractional year
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.matrix, index=self.dates, columns=self.players, copy=False)
+
+
+# Calendar-year rating grid of the chart: monthly dates x players, without rankings.
+# Every player must have a known birth year.
+def build_calendar_matrix(data, birth_years=None, kind='cubic', dtype=np.float64):
+    index = CalendarIndex(data, birth_years, kind=kind, depth=0, dtype=dtype)
+    if index.missing:
+        raise ValueError(f"No birth year for: {', '.join(index.missing)}")
+    return index.to_frame()
+
+
+def load_birth_years(path):
+    with open(path, encoding='utf-8') as f:
+        return {player: int(year) for player, year in json.load(f).items()}
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m calendar_index',
+        description='Rank players by interpolated rating at calendar dates.')
+    parser.add_argument('--input', help='JSON roster file or player store (defaults to the built-in roster)')
+    parser.add_argument('--birth-years', help='JSON file mapping player names to birth years')
+    parser.add_argument('--kind', choices=chess_elo_chart.INTERPOLATION_KINDS, default='cubic',
+                        help='interpolation kind (default: %(default)s)')
+    parser.add_argument('--step-months', type=int, default=1,
+                        help='months between grid dates (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    top = commands.add_parser('top', help='highest rated players at a date')
+    top.add_argument('date', help='YYYY-MM')
+    top.add_argument('-n', type=int, default=10, help='number of players (default: %(default)s)')
+    commands.add_parser('number-one', help='months spent at #1 and the spells at #1')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    data = chess_elo_chart.load_players_data(args.input) if args.input else None
+    birth_years = load_birth_years(args.birth_years) if args.birth_years else None
+    index = CalendarIndex(data, birth_years, kind=args.kind, step_months=args.step_months,
+                          depth=max(getattr(args, 'n', 1), 1))
+    if index.missing:
+        print(f"warning: no birth year for {len(index.missing)} players, left out", file=sys.stderr)
+
+    try:
+        if args.command == 'top':
+            for rank, (player, rating) in enumerate(index.top(args.date, args.n), start=1):
+                print(f"{rank:>3}  {rating:7.1f}  {player}")
+        else:
+            for player, months in index.months_at_number_one().items():
+                print(f"{months:>5} months  {player}")
+            print()
+            for player, first, last in index.number_one_spells():
+                print(f"{first} .. {last}  {player}")
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import argparse
+import re
+import sys
+
+import numpy as np
+
+import chess_elo_chart
+
+# Career statistics of every player, computed in one vectorized pass over the rating
+# matrix (grid positions x players) rather than per player in Python.
+#
+# - peak rating and the grid position (age or year) where it is reached
+# - years spent in each of chess_elo_chart.rating_categories, by np.digitize of the whole
+#   matrix against the category bounds and one bincount over (player, category) codes
+# - the first position at which the rating reaches each of CROSSING_THRESHOLDS
+# - the longest plateau: the longest stretch over which the rating moves by less than
+#   `plateau_rate` points per year, found with a running-reset trick along the grid
+#
+# On the age grid the interpolated values are clamped outside each player's recorded
+# ages. Those stretches are masked out when the roster is given, so the clamped ends
+# do not count as plateaus or time in a category. The calendar grid is already NaN there.
+
+CROSSING_THRESHOLDS = (2500, 2600, 2700, 2800)
+DEFAULT_PLATEAU_RATE = 5.0  # Rating points per year
+
+
+# Columns holding a grid position (age or year), best read earliest first
+def is_position_column(column):
+    return column.startswith('first_') or column.endswith(('_at', '_start'))
+
+
+# Mask of the grid positions inside each player's recorded range of ages
+def recorded_mask(df, data):
+    positions = df.index.to_numpy(dtype=np.float64)
+    bounds = np.empty((2, len(df.columns)))
+    for column, player in enumerate(df.columns):
+        ages = np.asarray(data[player], dtype=np.float64).reshape(-1, 2)[:, 0]
+        bounds[:, column] = ages.min(), ages.max()
+    tolerance = 1e-9
+    return (positions[:, None] >= bounds[0] - tolerance) & (positions[:, None] <= bounds[1] + tolerance)
+
+
+# Table of career statistics, one row per player of the rating matrix `df` (as built by
+# build_rating_matrix or calendar_index). Positions are ages on the age grid and years on
+# the calendar grid. Give the roster as `data` to leave out clamped stretches of an age grid.
+def compute_career_stats(df, data=None, plateau_rate=DEFAULT_PLATEAU_RATE):
+    import pandas as pd
+
+    values = df.to_numpy(dtype=np.float64, copy=True)
+    positions = df.index.to_numpy(dtype=np.float64)
+    if data is not None:
+        values[~recorded_mask(df, data)] = np.nan
+    valid = ~np.isnan(values)
+    step = float(np.median(np.diff(positions))) if len(positions) > 1 else 1.0
+    n_players = values.shape[1]
+    rated = valid.any(axis=0)
+    stats = {}
+
+    # Peak and where it is reached
+    filled = np.where(valid, values, -np.inf)
+    peak_row = filled.argmax(axis=0)
+    stats['peak'] = np.where(rated, filled[peak_row, np.arange(n_players)], np.nan)
+    stats['peak_at'] = np.where(rated, positions[peak_row], np.nan)
+
+    # First crossing of each threshold
+    for threshold in CROSSING_THRESHOLDS:
+        reached = valid & (values >= threshold)
+        stats[f'first_{threshold}'] = np.where(reached.any(axis=0), positions[reached.argmax(axis=0)], np.nan)
+
+    # Longest plateau: consecutive grid steps whose rate of change stays under plateau_rate
+    flat = (np.abs(np.diff(values, axis=0)) < plateau_rate * step) & valid[1:] & valid[:-1]
+    steps = np.arange(len(flat))[:, None]
+    last_break = np.maximum.accumulate(np.where(flat, -1, steps), axis=0)
+    runs = np.where(flat, steps - last_break, 0)
+    longest = runs.max(axis=0, initial=0)
+    end_row = runs.argmax(axis=0) if len(runs) else np.zeros(n_players, dtype=np.intp)
+    stats['plateau_years'] = longest * step
+    stats['plateau_start'] = np.where(longest > 0, positions[np.maximum(end_row + 1 - longest, 0)], np.nan)
+
+    # Years in each rating category: 0 = below the first category, k = k-th category
+    categories = chess_elo_chart.rating_categories
+    codes = np.digitize(values, [category['min'] for category in categories])
+    player_codes = np.broadcast_to(np.arange(n_players), values.shape)[valid] * (len(categories) + 1) + codes[valid]
+    counts = np.bincount(player_codes, minlength=n_players * (len(categories) + 1))
+    counts = counts.reshape(n_players, len(categories) + 1)[:, 1:]
+    for k, category in enumerate(categories):
+        stats[f"years_{re.sub(r'[^0-9a-z]+', '_', category['name'].lower())}"] = counts[:, k] * step
+
+    return pd.DataFrame(stats, index=pd.Index(df.columns, name='player'))
+
+
+# Career statistics of a roster on the chart's age grid
+def roster_career_stats(data=None, plateau_rate=DEFAULT_PLATEAU_RATE, cache=None, kind='cubic'):
+    data = chess_elo_chart.players_data if data is None else data
+    df = chess_elo_chart.build_rating_matrix(data, chess_elo_chart.all_ages, cache=cache, kind=kind)
+    return compute_career_stats(df, data, plateau_rate)
+
+
+# Write a statistics table as CSV or JSON, chosen by the file extension
+def export_career_stats(stats, path):
+    if path.endswith('.json'):
+        stats.reset_index().to_json(path, orient='records', indent=2)
+    else:
+        stats.to_csv(path, float_format='%.2f')
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m career_stats',
+        description='Compute peak, category time, threshold crossings and plateaus of every player.')
+    parser.add_argument('input', nargs='?',
+                        help='JSON roster file or player store (defaults to the built-in roster)')
+    parser.add_argument('-o', '--output', help='write the table to this .csv or .json file instead of printing it')
+    parser.add_argument('--sort', default='peak',
+                        help='column to sort by: ages and years ascending, other columns descending '
+                             '(default: %(default)s)')
+    parser.add_argument('--reverse', action='store_true', help='reverse the sort order')
+    parser.add_argument('--plateau-rate', type=float, default=DEFAULT_PLATEAU_RATE,
+                        help='largest change, in points per year, still counted as a plateau (default: %(default)s)')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        data = chess_elo_chart.load_players_data(args.input) if args.input else None
+        cache = None
+        if args.cache_dir:
+            from rating_cache import GridCache
+            cache = GridCache(args.cache_dir)
+        stats = roster_career_stats(data, args.plateau_rate, cache=cache)
+    except OSError as e:
+        print(f"error: {e.filename}: {e.strerror}", file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return 2
+    if args.sort not in stats.columns:
+        print(f"error: unknown column {args.sort!r}", file=sys.stderr)
+        return 2
+    stats = stats.sort_values(args.sort, ascending=is_position_column(args.sort) != args.reverse)
+    if args.output:
+        export_career_stats(stats, args.output)
+        print(f"Wrote statistics of {len(stats):,} players to {args.output}")
+    else:
+        import pandas as pd
+
+        with pd.option_context('display.max_columns', None, 'display.width', 200):
+            print(stats.round(1).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+import chess_elo_chart
+
+# Animation of the chart filling in month by month, by age or by calendar date.
+#
+# The chart is drawn once with the batched 'collection' renderer and cached static panels.
+# Each frame then only edits that figure in place: cells, highlights and markers right of
+# the current position get a zero alpha in their face/edge colour arrays, trend lines are
+# clipped to it and annotations are hidden, so no artist is ever recreated.
+#
+# Frames are blitted: everything static (panels, labels, ticks, title) is rendered once
+# as a background, and each frame only renders the moving artists on a transparent layer
+# that is alpha-composited over it. Matplotlib's own canvas blitting cannot be used
+# because the chart's legend reaches beyond the canvas. Both layers are therefore saved
+# with one fixed bounding box, the still chart's tight bbox, so every frame has the same
+# pixel size and matches the still image.
+#
+# Frames can be rendered by several worker processes, each with its own copy of the
+# figure rendering a contiguous run of frames. They are written as a PNG sequence and
+# assembled into a GIF with Pillow or an MP4 with ffmpeg when it is on the PATH.
+
+DEFAULT_OPTIONS = {
+    'players': None,
+    'axis': 'age',  # or 'calendar'
+    'birth_years': None,
+    'dpi': 50,
+    'figsize': chess_elo_chart.DEFAULT_OPTIONS['figsize'],
+    'step_months': 1,  # Grid months between frames
+    'fps': 24,
+    'hold': 2.0,  # Seconds the finished chart stays on screen at the end
+    'cache': None,
+}
+ANIMATION_FORMATS = ('.gif', '.mp4')
+SAVE_PAD = 0.3  # Inches, as in chess_elo_chart.save_chart
+
+# Per-worker state set up by _init_worker
+_worker = {}
+
+
+class _RevealedCollection:
+    # Per-element x positions and original colours of a cell/highlight PolyCollection or a
+    # scatter PathCollection
+    def __init__(self, collection, x):
+        self.collection = collection
+        self.x = x
+        self.facecolors = np.array(np.broadcast_to(collection.get_facecolor(), (len(x), 4)))
+        self.edgecolors = np.array(np.broadcast_to(collection.get_edgecolor(), (len(x), 4))) \
+            if len(collection.get_edgecolor()) else None
+        # A collection-wide alpha would override the per-element ones, so fold it in
+        alpha = collection.get_alpha()
+        if alpha is not None:
+            collection.set_alpha(None)
+            for colors in (self.facecolors, self.edgecolors):
+                if colors is not None:
+                    colors[:, 3] *= alpha
+
+    def update(self, position):
+        hidden = self.x > position + 1e-9
+        facecolors = self.facecolors.copy()
+        facecolors[hidden, 3] = 0
+        self.collection.set_facecolor(facecolors)
+        if self.edgecolors is not None:
+            edgecolors = self.edgecolors.copy()
+            edgecolors[hidden, 3] = 0
+            self.collection.set_edgecolor(edgecolors)
+
+
+class _RevealedLines:
+    # Trend lines, clipped to the current position
+    def __init__(self, collection):
+        self.collection = collection
+        self.segments = np.array([segment for segment in collection.get_segments()]).reshape(-1, 2, 2)
+
+    def update(self, position):
+        segments = self.segments.copy()
+        segments[:, 1, 0] = np.clip(position, segments[:, 0, 0], segments[:, 1, 0])
+        self.collection.set_segments(segments)
+
+
+class ChartAnimation:
+    def __init__(self, data=None, options=None):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import LineCollection, PathCollection, PolyCollection
+        from matplotlib.text import Annotation
+
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        chart_options = {key: self.options[key] for key in ('players', 'axis', 'birth_years', 'dpi', 'figsize', 'cache')}
+        self.fig = chess_elo_chart.render_chart(data, None, {**chart_options, 'render_mode': 'collection',
+                                                             'static_panels': 'cached'})
+        ax = next(ax for ax in self.fig.axes if ax.get_label() == 'main')
+        renderer = FigureCanvasAgg(self.fig).get_renderer()
+        self.bbox = self.fig.get_tightbbox(renderer).padded(SAVE_PAD)
+
+        half_cell = chess_elo_chart.cell_size / 2
+        self.parts = []
+        for collection in ax.collections:
+            if isinstance(collection, PolyCollection):
+                x = np.array([path.vertices[0, 0] for path in collection.get_paths()]) + half_cell
+                self.parts.append(_RevealedCollection(collection, x))
+            elif isinstance(collection, PathCollection):
+                self.parts.append(_RevealedCollection(collection, collection.get_offsets()[:, 0]))
+            elif isinstance(collection, LineCollection):
+                self.parts.append(_RevealedLines(collection))
+        self.annotations = [(text, text.xy[0]) for text in ax.texts if isinstance(text, Annotation)]
+        dynamic = [part.collection for part in self.parts] + [text for text, _ in self.annotations]
+        self._static = [(artist, artist.get_visible()) for artist in _static_artists(self.fig, ax, dynamic)]
+        self._dynamic = dynamic
+        self.background = self._render_layer(background=True)
+
+        # One frame per step of the grid, from just before the first cell to the last one
+        xs = [part.x for part in self.parts if isinstance(part, _RevealedCollection) and len(part.x)]
+        x = np.concatenate(xs) if xs else np.zeros(1)
+        step = self.options['step_months'] / 12
+        self.positions = np.arange(x.min() - step, x.max() + step, step)
+
+    def __len__(self):
+        return len(self.positions)
+
+    # Show the chart as it stands at a grid position (age or fractional year)
+    def update(self, position):
+        for part in self.parts:
+            part.update(position)
+        for text, x in self.annotations:
+            text.set_visible(x <= position + 1e-9)
+
+    # RGBA image of the static artists only (background=True) or of the moving ones only
+    def _render_layer(self, background):
+        from PIL import Image
+
+        for artist, visible in self._static:
+            artist.set_visible(visible and background)
+        hidden = [artist for artist in self._dynamic if artist.get_visible()] if background else []
+        for artist in hidden:
+            artist.set_visible(False)
+        try:
+            buffer = io.BytesIO()
+            self.fig.savefig(buffer, format='rgba', dpi=self.options['dpi'], bbox_inches=self.bbox,
+                             facecolor='#0d1117', transparent=not background)
+        finally:
+            for artist in hidden:
+                artist.set_visible(True)
+            for artist, visible in self._static:
+                artist.set_visible(visible)
+        width, height = (int(round(size * self.options['dpi'])) for size in self.bbox.size)
+        return Image.frombuffer('RGBA', (width, height), buffer.getvalue(), 'raw', 'RGBA', 0, 1)
+
+    # The chart at a frame, as an RGB PIL image
+    def frame(self, index):
+        from PIL import Image
+
+        self.update(self.positions[index])
+        return Image.alpha_composite(self.background, self._render_layer(background=False)).convert('RGB')
+
+    def save_frame(self, index, path):
+        self.frame(index).save(path)
+
+
+# Every artist of the figure except `dynamic` ones and the main axes that holds them:
+# the whole of the other axes, and the static children of the main axes
+def _static_artists(fig, ax, dynamic):
+    dynamic = set(map(id, dynamic))
+    static = [artist for artist in fig.get_children() if artist is not ax]
+    static += [artist for artist in ax.get_children() if id(artist) not in dynamic]
+    return static
+
+
+def _frame_path(directory, index):
+    return os.path.join(directory, f'frame_{index:05d}.png')
+
+
+def _init_worker(data, options):
+    _worker['animation'] = ChartAnimation(data, options)
+
+
+def _render_frames_job(job):
+    directory, indices = job
+    for index in indices:
+        _worker['animation'].save_frame(index, _frame_path(directory, index))
+    return len(indices)
+
+
+# Render every frame as directory/frame_00000.png, ... and return the number of frames.
+# With workers > 1, contiguous runs of frames are rendered by a process pool.
+def render_frames(data, directory, options=None, workers=1, progress=None):
+    os.makedirs(directory, exist_ok=True)
+    animation = ChartAnimation(data, options)
+    total = len(animation)
+    if workers <= 1:
+        for index in range(total):
+            animation.save_frame(index, _frame_path(directory, index))
+            if progress is not None:
+                progress(index + 1, total)
+        return total
+
+    runs = np.array_split(np.arange(total), workers * 4)
+    jobs = [(directory, run.tolist()) for run in runs if len(run)]
+    done = 0
+    with get_context('spawn').Pool(workers, _init_worker, (data, animation.options)) as pool:
+        for count in pool.imap_unordered(_render_frames_job, jobs):
+            done += count
+            if progress is not None:
+                progress(done, total)
+    return total
+
+
+def _write_gif(directory, total, output, fps, hold_frames):
+    from PIL import Image
+
+    def frames():
+        for index in range(1, total):
+            with Image.open(_frame_path(directory, index)) as frame:
+                yield frame.convert('RGB').quantize(colors=128)
+
+    with Image.open(_frame_path(directory, 0)) as first:
+        durations = [round(1000 / fps)] * (total - 1) + [round(1000 / fps) + round(1000 * hold_frames / fps)]
+        first.convert('RGB').quantize(colors=128).save(output, save_all=True, append_images=frames(),
+                                                       duration=durations, loop=0, optimize=False)
+
+
+def _write_mp4(directory, output, fps, hold_seconds):
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("MP4 output needs ffmpeg on the PATH; write a .gif or a frame directory instead")
+    subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-framerate', str(fps),
+                    '-i', os.path.join(directory, 'frame_%05d.png'),
+                    '-vf', f'tpad=stop_mode=clone:stop_duration={hold_seconds},scale=trunc(iw/2)*2:trunc(ih/2)*2',
+                    '-pix_fmt', 'yuv420p', output], check=True)
+
+
+# Render the animation to a .gif, an .mp4 or (any other path) a directory of PNG frames.
+# Returns the number of frames.
+def render_animation(data=None, output='chess_elo_animation.gif', options=None, workers=1, progress=None):
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    ext = os.path.splitext(output)[1].lower()
+    if ext not in ANIMATION_FORMATS:
+        return render_frames(data, output, options, workers, progress)
+
+    if ext == '.mp4' and shutil.which('ffmpeg') is None:
+        raise RuntimeError("MP4 output needs ffmpeg on the PATH; write a .gif or a frame directory instead")
+    with tempfile.TemporaryDirectory(prefix='chess_elo_frames_') as directory:
+        total = render_frames(data, directory, options, workers, progress)
+        if ext == '.gif':
+            _write_gif(directory, total, output, options['fps'], options['hold'] * options['fps'])
+        else:
+            _write_mp4(directory, output, options['fps'], options['hold'])
+    return total
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m chart_animation',
+        description='Animate the chart filling in month by month.')
+    parser.add_argument('input', nargs='?',
+                        help='JSON roster file or player store (defaults to the built-in roster)')
+    parser.add_argument('-o', '--output', default='chess_elo_animation.gif',
+                        help='.gif, .mp4 (needs ffmpeg) or a directory for PNG frames (default: %(default)s)')
+    parser.add_argument('--players', nargs='+', metavar='NAME', help='only animate these players, in this order')
+    parser.add_argument('--axis', choices=chess_elo_chart.CHART_AXES, default=DEFAULT_OPTIONS['axis'],
+                        help='fill in by age or by calendar date (default: %(default)s)')
+    parser.add_argument('--birth-years', help='JSON file mapping player names to birth years')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_OPTIONS['dpi'], help='frame resolution (default: %(default)s)')
+    parser.add_argument('--step-months', type=int, default=DEFAULT_OPTIONS['step_months'],
+                        help='months of the grid per frame (default: %(default)s)')
+    parser.add_argument('--fps', type=int, default=DEFAULT_OPTIONS['fps'], help='frames per second (default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='render frames in this many processes (default: %(default)s)')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not report progress')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    data = chess_elo_chart.load_players_data(args.input) if args.input else None
+    options = {'players': args.players, 'axis': args.axis, 'dpi': args.dpi,
+               'step_months': args.step_months, 'fps': args.fps}
+    if args.birth_years:
+        from calendar_index import load_birth_years
+        options['birth_years'] = load_birth_years(args.birth_years)
+    if args.cache_dir:
+        from rating_cache import GridCache
+        options['cache'] = GridCache(args.cache_dir)
+
+    def progress(done, total):
+        if not args.quiet:
+            print(f"\rframes {done}/{total}", end='', file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    try:
+        total = render_animation(data, args.output, options, workers=args.workers, progress=progress)
+    except (KeyError, ValueError, RuntimeError) as e:
+        print(f"error: {e.args[0] if e.args else e}", file=sys.stderr)
+        return 2
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Wrote {total} frames to {args.output} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
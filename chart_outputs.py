@@ -0,0 +1,197 @@
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Several output files from one drawn chart.
+#
+# Raster targets (PNG, WebP, JPEG at any dpi or pixel width) all come from a single Agg
+# draw at the highest dpi any of them asks for: the figure is rasterised once with the
+# same tight bbox as chess_elo_chart.save_chart, then every other size is resampled from
+# that image with Pillow. Resampling and encoding happen in worker threads, since Pillow
+# releases the GIL for both. Vector targets (SVG, PDF) cannot reuse a raster and each take
+# their own savefig pass, on the calling thread while the raster targets encode.
+#
+# A target is a path with an optional size suffix:
+#
+#   chart.png          at the chart's dpi
+#   chart@2x.png       twice the chart's dpi (retina)
+#   chart.webp@240     at 240 dpi
+#   thumb.png@480w     480 pixels wide
+#   chart.svg          vector
+
+RASTER_FORMATS = {'.png': 'PNG', '.webp': 'WEBP', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+VECTOR_FORMATS = {'.svg': 'svg', '.pdf': 'pdf'}
+DEFAULT_WORKERS = 4
+BACKGROUND = '#0d1117'
+SAVE_PAD = 0.3  # Inches, as in chess_elo_chart.save_chart
+
+
+# Target dict {'path', 'dpi', 'scale', 'width', 'format'} from a 'path@size' string (or a
+# dict with those keys). A size after the extension is dropped from the file name
+# (chart.webp@240 writes chart.webp); one before it is kept (chart@2x.png).
+def parse_target(spec):
+    if isinstance(spec, dict):
+        target = {'dpi': None, 'scale': None, 'width': None, **spec}
+        ext = os.path.splitext(target['path'])[1]
+    else:
+        root, ext = os.path.splitext(str(spec))
+        size = ''
+        if '@' in ext:
+            ext, _, size = ext.partition('@')
+        elif '@' in os.path.basename(root):
+            size = root.rpartition('@')[2]
+        target = {'path': root + ext, 'dpi': None, 'scale': None, 'width': None}
+        try:
+            if size.endswith('x'):
+                target['scale'] = float(size[:-1])
+            elif size.endswith('w'):
+                target['width'] = int(size[:-1])
+            elif size:
+                target['dpi'] = int(size)
+        except ValueError:
+            raise ValueError(f"Invalid output size {size!r} in {spec!r}, expected DPI, SCALEx or WIDTHw") from None
+
+    ext = ext.lower()
+    if ext not in RASTER_FORMATS and ext not in VECTOR_FORMATS:
+        raise ValueError(f"Unsupported output format {ext or target['path']!r}, "
+                         f"expected one of {', '.join([*RASTER_FORMATS, *VECTOR_FORMATS])}")
+    target['format'] = RASTER_FORMATS.get(ext) or VECTOR_FORMATS[ext]
+    return target
+
+
+def is_raster(target):
+    return target['format'] not in VECTOR_FORMATS.values()
+
+
+# Dpi a raster target is drawn at, given the chart's dpi (width targets need no more)
+def target_dpi(target, dpi):
+    if target['dpi']:
+        return target['dpi']
+    if target['scale']:
+        return round(dpi * target['scale'])
+    return dpi
+
+
+# Highest dpi needed by the raster targets: the single draw happens at this resolution
+def master_dpi(targets, dpi):
+    return max([target_dpi(target, dpi) for target in targets if is_raster(target)] or [dpi])
+
+
+# Rasterise the figure with a single Agg draw at `dpi`, cropped to the tight bbox and
+# padding of save_chart (or the whole figure when not tight), into an RGBA image
+def _rasterise(fig, dpi, tight=True):
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from PIL import Image
+
+    try:
+        from matplotlib._tight_bbox import adjust_bbox  # Private: the crop savefig applies for bbox_inches
+    except ImportError:
+        adjust_bbox = None
+    if tight and adjust_bbox is None:
+        return _rasterise_with_savefig(fig, dpi)
+
+    original_canvas, original_dpi, original_facecolor = fig.canvas, fig.dpi, fig.get_facecolor()
+    canvas = FigureCanvasAgg(fig)
+    restore = None
+    fig.dpi = dpi
+    fig.set_facecolor(BACKGROUND)
+    try:
+        if tight:
+            # Apply pending autoscaling, so the bbox is measured on the final limits
+            for ax in fig.axes:
+                ax.get_xlim()
+                ax.get_ylim()
+            renderer = canvas.get_renderer()
+            restore = adjust_bbox(fig, fig.get_tightbbox(renderer).padded(SAVE_PAD), renderer)
+        canvas.draw()
+        return Image.fromarray(np.array(canvas.buffer_rgba()), 'RGBA')
+    finally:
+        if restore is not None:
+            restore()
+        fig.dpi = original_dpi
+        fig.set_facecolor(original_facecolor)
+        fig.set_canvas(original_canvas)
+
+
+# Fallback for matplotlib releases without _tight_bbox: savefig draws and crops the figure
+# itself into an uncompressed PNG, which is decoded back
+def _rasterise_with_savefig(fig, dpi):
+    import chess_elo_chart
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    chess_elo_chart.save_chart(fig, buffer, dpi, format='png', pil_kwargs={'compress_level': 0})
+    buffer.seek(0)
+    return Image.open(buffer).convert('RGBA')
+
+
+def _encode(master, master_dpi_, target, dpi, compress_level, quality):
+    from PIL import Image
+
+    started = time.perf_counter()
+    image = master
+    if target['width']:
+        height = max(round(master.height * target['width'] / master.width), 1)
+        image = master.resize((target['width'], height), Image.LANCZOS, reducing_gap=3.0)
+    elif target_dpi(target, dpi) != master_dpi_:
+        ratio = target_dpi(target, dpi) / master_dpi_
+        image = master.resize((max(round(master.width * ratio), 1), max(round(master.height * ratio), 1)),
+                              Image.LANCZOS, reducing_gap=3.0)
+
+    kwargs = {}
+    if target['format'] == 'PNG':
+        if compress_level is not None:
+            kwargs['compress_level'] = compress_level
+        kwargs['dpi'] = (target_dpi(target, dpi),) * 2
+    elif target['format'] == 'JPEG':
+        image = image.convert('RGB')
+        kwargs['quality'] = quality
+    else:
+        kwargs['quality'] = quality
+    image.save(target['path'], target['format'], **kwargs)
+    return target['path'], image.size, time.perf_counter() - started
+
+
+# Write every target from `fig`. `dpi` is the chart's base resolution for targets without
+# a size. Returns [(path, (width, height) or None for vector files, seconds), ...] in
+# target order.
+# With tight=False the figure is saved at its exact size, as save_chart(tight=False) does.
+def save_targets(fig, targets, dpi=120, compress_level=None, quality=90, workers=DEFAULT_WORKERS, tight=True):
+    import chess_elo_chart
+
+    targets = [parse_target(target) for target in targets]
+    paths = [os.path.abspath(target['path']) for target in targets]
+    duplicates = [target['path'] for target, path in zip(targets, paths) if paths.count(path) > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate output paths: {', '.join(dict.fromkeys(duplicates))}")
+    raster = [target for target in targets if is_raster(target)]
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = []
+        if raster:
+            started = time.perf_counter()
+            top_dpi = master_dpi(raster, dpi)
+            master = _rasterise(fig, top_dpi, tight)
+            draw_seconds = time.perf_counter() - started
+            futures = [pool.submit(_encode, master, top_dpi, target, dpi, compress_level, quality)
+                       for target in raster]
+
+        # Vector passes run here while the threads encode
+        for target in targets:
+            if not is_raster(target):
+                started = time.perf_counter()
+                chess_elo_chart.save_chart(fig, target['path'], dpi, format=target['format'], tight=tight)
+                results[target['path']] = (target['path'], None, time.perf_counter() - started)
+
+        for future in futures:
+            path, size, seconds = future.result()
+            results[path] = (path, size, seconds)
+        if raster:
+            # The shared draw is charged to the first raster target
+            path, size, seconds = results[raster[0]['path']]
+            results[path] = (path, size, seconds + draw_seconds)
+
+    return [results[target['path']] for target in targets]
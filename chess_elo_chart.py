@@ -1,13 +1,17 @@
-import matplotlib.pyplot as plt
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+from collections import OrderedDict
+from contextlib import nullcontext
+
 import numpy as np
-import pandas as pd
-from matplotlib.ticker import MultipleLocator
-import matplotlib.gridspec as gridspec
-from matplotlib.colors import LinearSegmentedColormap, Normalize
-import matplotlib.patches as patches
-import matplotlib.patheffects as path_effects
-import matplotlib.dates as mdates
-from matplotlib.ticker import MaxNLocator
+
+# matplotlib, pandas and scipy are imported lazily inside the functions that need
+# them, so importing this module (or running --help) stays cheap and a long-lived
+# worker only pays for those imports once.
 
 # Data for some of the greatest chess players and their approximate ELO ratings at different ages
 # Note: Historical ELO data is approximate, especially for older players
@@ -83,6 +87,18 @@ world_champion_periods = {
     'Emanuel Lasker': [(1894, 1921)]
 }
 
+# Approximate birth years, used to convert championship years to ages
+birth_years = {
+    'Garry Kasparov': 1963,
+    'Magnus Carlsen': 1990,
+    'Bobby Fischer': 1943,
+    'Anatoly Karpov': 1951,
+    'Viswanathan Anand': 1969,
+    'Jose Raul Capablanca': 1888,
+    'Mikhail Tal': 1936,
+    'Emanuel Lasker': 1868
+}
+
 # Notable achievements and tournaments
 notable_events = {
     'Garry Kasparov': [
@@ -127,42 +143,91 @@ rating_categories = [
     {'name': 'All-Time Great', 'min': 2900, 'max': 3000, 'color': '#d9d9d9'}
 ]
 
-# Create a highly detailed GitHub-style contribution chart for chess ELO ratings
-plt.style.use('dark_background')
-plt.rcParams['font.family'] = 'monospace'
-plt.rcParams['figure.facecolor'] = '#0d1117'  # GitHub dark mode background
-plt.rcParams['axes.facecolor'] = '#0d1117'
-plt.rcParams['text.color'] = '#c9d1d9'  # GitHub text color
-plt.rcParams['axes.labelcolor'] = '#c9d1d9'
-plt.rcParams['xtick.color'] = '#c9d1d9'
-plt.rcParams['ytick.color'] = '#c9d1d9'
-
-# Create figure with subplots (adjusted for better text spacing)
-fig = plt.figure(figsize=(18, 14), dpi=100)
-gs = gridspec.GridSpec(3, 2, height_ratios=[5, 1.5, 1.5], width_ratios=[4, 1])
-
-# Main heatmap plot
-ax_main = plt.subplot(gs[0, 0])
-ax_legend = plt.subplot(gs[0, 1])
-ax_info = plt.subplot(gs[1, :])
-ax_timeline = plt.subplot(gs[2, :])
-
-# Create a more detailed pandas DataFrame with interpolated data points
+# Historical context shown next to the rating categories
+historical_notes = [
+    "• FIDE rating system introduced in 1970",
+    "• Pre-1970 ratings are retroactively calculated",
+    "• 2700+ considered 'super-grandmaster' level",
+    "• 2800+ achieved by only 15 players in history",
+    "• 2882 (Carlsen, 2014) is the highest official rating",
+    "• Ratings inflation: ~1-3 points per year"
+]
+
+# Simplified timeline events (fewer events)
+timeline_events = [
+    {"year": 1886, "event": "First official World Championship", "importance": "major"},
+    {"year": 1924, "event": "FIDE founded", "importance": "major"},
+    {"year": 1970, "event": "FIDE rating system introduced", "importance": "major"},
+    {"year": 1972, "event": "Fischer-Spassky 'Match of the Century'", "importance": "major"},
+    {"year": 1985, "event": "Kasparov becomes youngest World Champion", "importance": "major"},
+    {"year": 1996, "event": "Kasparov vs Deep Blue", "importance": "major"},
+    {"year": 2013, "event": "Carlsen becomes World Champion", "importance": "major"},
+    {"year": 2023, "event": "Ding Liren becomes World Champion", "importance": "major"}
+]
+
 # Generate data at monthly intervals instead of yearly
 all_ages = np.linspace(10, 75, 781)  # Monthly data points from age 10 to 75
-df = pd.DataFrame(index=all_ages, columns=players_data.keys())
 
-# Fill the DataFrame with ratings and interpolate for smoother transitions
-for player, data in players_data.items():
-    ages, ratings = zip(*data)
-    
-    # Create a function to interpolate between known data points
-    from scipy.interpolate import interp1d
-    f = interp1d(ages, ratings, kind='cubic', bounds_error=False, fill_value=(ratings[0], ratings[-1]))
-    
-    # Fill in interpolated values
-    for age in all_ages:
-        df.loc[age, player] = f(age)
+# Define the rating ranges for color mapping with finer granularity
+min_rating = 2000
+max_rating = 2900
+
+# Cell size and spacing (adjusted for better screen fit)
+cell_size = 0.25
+cell_spacing = 0.1
+total_cell_size = cell_size + cell_spacing
+
+# Sample data points to avoid overcrowding (show every month instead of every 2 weeks)
+sample_step = 4
+
+# Rendering engine for the main grid:
+# - 'patches' draws one Rectangle artist per cell (the original renderer)
+# - 'collection' draws every cell as a single PolyCollection
+# - 'raster' paints the whole grid as one image, for very large rosters
+# - 'auto' uses 'collection' and switches to 'raster' once the roster gets tall
+RENDER_MODES = ('auto', 'patches', 'collection', 'raster')
+RASTER_MIN_PLAYERS = 200
+
+DEFAULT_OUTPUT = 'chess_grandmasters_github_style_detailed.png'
+
+# Options understood by render_chart(); anything passed in overrides these
+DEFAULT_OPTIONS = {
+    'players': None,  # Subset of players to chart, in the given order (None = all)
+    'dpi': 120,
+    'render_mode': 'auto',
+    'figsize': (18, 14),
+    'show': False,  # Open an interactive window after saving
+    'cache': None,  # rating_cache.GridCache for the interpolated grid
+    'instrument': None,  # instrumentation.Instrumentation recording per-stage timings
+    'static_panels': 'draw',  # 'cached' composites the static panels from cached images
+    'axis': 'age',  # 'calendar' charts the grid against calendar years (see calendar_index)
+    'birth_years': None,  # {player: year} for the calendar axis, over the built-in birth_years
+    'stats_panel': 'basic',  # 'career' adds peak and threshold leaders (see career_stats)
+    'export': None,  # Also write the rating matrix to this .parquet/.arrow/.csv (see rating_export)
+    'targets': None,  # More outputs from the same draw, e.g. ['chart@2x.png', 'thumb.webp@480w'] (see chart_outputs)
+    'compress_level': None,  # PNG zlib level of the targets (None = Pillow's default)
+    'layout': 'tight',  # 'fixed' places the panels up front and saves with a single draw
+    'row_order': 'roster',  # 'euclidean' or 'dtw' puts players with similar careers next to each other
+}
+
+LAYOUTS = ('tight', 'fixed')
+ROW_ORDERS = ('roster', 'euclidean', 'dtw')
+
+STATS_PANELS = ('basic', 'career')
+CAREER_LEADERS = 5
+
+CHART_AXES = ('age', 'calendar')
+
+# GitHub dark mode look, applied on top of matplotlib's dark_background style
+CHART_STYLE = {
+    'font.family': 'monospace',
+    'figure.facecolor': '#0d1117',  # GitHub dark mode background
+    'axes.facecolor': '#0d1117',
+    'text.color': '#c9d1d9',  # GitHub text color
+    'axes.labelcolor': '#c9d1d9',
+    'xtick.color': '#c9d1d9',
+    'ytick.color': '#c9d1d9',
+}
 
 # Create an enhanced GitHub-style colormap with more gradations
 github_colors = ['#0e1117', '#0e4429', '#006d32', '#26a641', '#39d353']
@@ -181,401 +246,1261 @@ for i in range(len(github_colors)-1):
         
         enhanced_colors.append(f'#{int(r):02x}{int(g):02x}{int(b):02x}')
 
-github_cmap = LinearSegmentedColormap.from_list('github_enhanced', enhanced_colors, N=256)
+_github_cmap = None
 
-# Define the rating ranges for color mapping with finer granularity
-min_rating = 2000
-max_rating = 2900
-norm = Normalize(vmin=min_rating, vmax=max_rating)
 
-# Cell size and spacing (adjusted for better screen fit)
-cell_size = 0.25
-cell_spacing = 0.1
-total_cell_size = cell_size + cell_spacing
+# The colormap is built once per process and reused by every chart
+def get_github_cmap():
+    global _github_cmap
+    if _github_cmap is None:
+        from matplotlib.colors import LinearSegmentedColormap
+        _github_cmap = LinearSegmentedColormap.from_list('github_enhanced', enhanced_colors, N=256)
+    return _github_cmap
+
+
+def get_rating_norm():
+    from matplotlib.colors import Normalize
+    return Normalize(vmin=min_rating, vmax=max_rating)
+
+
+# Without a display there is nothing to show a window on, so fall back to Agg
+def _is_headless():
+    if sys.platform.startswith(('win', 'darwin')):
+        return False
+    return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
 
-# Draw the highly detailed GitHub-style contribution grid
-for i, player in enumerate(df.columns):
-    player_data = df[player].dropna()
+
+# Import pyplot on first use, selecting the Agg backend when running headless
+def _pyplot():
+    if 'matplotlib.pyplot' not in sys.modules and 'MPLBACKEND' not in os.environ and _is_headless():
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# Load a roster from a JSON file mapping player names to [[age, rating], ...] pairs,
+# or a player_store.PlayerStore directory (memory-mapped)
+def load_players_data(path):
+    if os.path.isdir(path):
+        from player_store import PlayerStore
+        
+        if not PlayerStore.is_store(path):
+            raise ValueError(f"{path} is not a player store directory")
+        return PlayerStore.load(path)
+    with open(path, encoding='utf-8') as f:
+        raw = json.load(f)
+    return {player: [tuple(point) for point in series] for player, series in raw.items()}
+
+
+# Restrict a roster to the given players, keeping the requested order
+def select_players(data, players=None):
+    if players is None:
+        return data
+    missing = [player for player in players if player not in data]
+    if missing:
+        raise KeyError(f"Unknown players: {', '.join(missing)}")
+    return {player: data[player] for player in players}
+
+
+INTERPOLATION_KINDS = ('cubic', 'pchip', 'linear')
+
+
+# Fit one player's (age, rating) series and return a callable evaluating it at any ages.
+# Ages outside the series are clamped to its first and last ratings.
+def fit_interpolant(series, kind='cubic'):
+    if kind not in INTERPOLATION_KINDS:
+        raise ValueError(f"Unknown interpolation kind {kind!r}, expected one of {', '.join(INTERPOLATION_KINDS)}")
     
-    # Sample data points to avoid overcrowding (show every month instead of every 2 weeks)
-    sampled_data = [(age, rating) for j, (age, rating) in enumerate(player_data.items()) if j % 4 == 0]
+    points = np.asarray(series, dtype=np.float64)
+    player_ages, ratings = points[:, 0], points[:, 1]
+    
+    if kind == 'pchip':
+        from scipy.interpolate import PchipInterpolator
+        
+        # Shape-preserving: no overshoot between data points
+        order = np.argsort(player_ages, kind='stable')
+        x = player_ages[order]
+        spline = PchipInterpolator(x, ratings[order], extrapolate=False)
+        return lambda ages: spline(np.clip(ages, x[0], x[-1]))
     
-    for j, (age, rating) in enumerate(sampled_data):
-        # Calculate cell position
-        x = age
+    from scipy.interpolate import interp1d
+    
+    # Create a function to interpolate between known data points
+    return interp1d(player_ages, ratings, kind=kind, bounds_error=False,
+                    fill_value=(ratings[0], ratings[-1]))
+
+
+# Interpolate one player's (age, rating) series over the whole age vector in one call
+def interpolate_series(series, ages, kind='cubic'):
+    return fit_interpolant(series, kind)(ages)
+
+
+# Build the interpolated (ages x players) rating grid in one pass per player.
+# Each player's interpolant is evaluated over the whole age vector at once
+# and written into a single contiguous float matrix, so the resulting DataFrame
+# has one typed float block instead of object-dtype cells.
+# With a rating_cache.GridCache, unchanged players are read back from disk and only
+# new or edited series are interpolated.
+def build_rating_matrix(players_data, ages, dtype=np.float64, cache=None, kind='cubic'):
+    import pandas as pd
+    
+    ages = np.asarray(ages, dtype=np.float64)
+    players = list(players_data.keys())
+    matrix = np.empty((len(ages), len(players)), dtype=dtype)
+    
+    for column, player in enumerate(players):
+        series = players_data[player]
+        if cache is None:
+            matrix[:, column] = interpolate_series(series, ages, kind)
+            continue
+        
+        key = cache.key(series, ages, kind=kind, dtype=dtype)
+        values = cache.get(key)
+        if values is None:
+            values = interpolate_series(series, ages, kind).astype(dtype)
+            cache.put(key, values)
+        matrix[:, column] = values
+    
+    return pd.DataFrame(matrix, index=ages, columns=players, copy=False)
+
+
+def resolve_render_mode(mode, n_players):
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode {mode!r}, expected one of {', '.join(RENDER_MODES)}")
+    if mode == 'auto':
+        return 'raster' if n_players >= RASTER_MIN_PLAYERS else 'collection'
+    return mode
+
+
+# Original renderer: one Rectangle (plus a highlight Rectangle) per sampled cell
+def _draw_grid_patches(ax, df, cmap, norm):
+    import matplotlib.patches as patches
+    import pandas as pd
+    
+    for i, player in enumerate(df.columns):
+        player_data = df[player].dropna()
+        sampled_data = [(age, rating) for j, (age, rating) in enumerate(player_data.items()) if j % sample_step == 0]
         y = i * total_cell_size
         
-        # Determine cell color based on rating
-        if pd.isna(rating):
-            color = '#161b22'  # Empty cell color in GitHub dark mode
-        else:
-            color = github_cmap(norm(rating))
-        
-        # Draw the cell as a rounded rectangle with subtle 3D effect
-        rect = patches.Rectangle((x - cell_size/2, y - cell_size/2), 
-                                cell_size, cell_size, 
-                                linewidth=0.5, edgecolor='#30363d',
-                                facecolor=color, alpha=0.95, zorder=3,
-                                angle=0, capstyle='round')
-        ax_main.add_patch(rect)
-        
-        # Add subtle highlight to top-left edge for 3D effect
-        if not pd.isna(rating) and rating > min_rating + 100:
-            highlight = patches.Rectangle((x - cell_size/2, y - cell_size/2), 
-                                        cell_size/3, cell_size/3, 
-                                        linewidth=0, facecolor='white', 
-                                        alpha=0.1, zorder=4)
-            ax_main.add_patch(highlight)
-        
-        # Add world championship indicator (only for integer ages to avoid overcrowding)
-        if player in world_champion_periods and abs(age - round(age)) < 0.01:
-            for start_year, end_year in world_champion_periods[player]:
-                birth_year = 0  # Approximate
-                if start_year - birth_year <= age <= end_year - birth_year:
-                    # Add a gold crown marker
-                    ax_main.plot(x, y, marker='$♔$', markersize=6, 
-                                color='gold', zorder=5)
-        
-        # Add notable achievement indicator
-        if player in notable_events:
-            for event_age, event in notable_events[player]:
-                if abs(age - event_age) < 0.1:  # Allow small tolerance for matching
-                    # Add a star marker
-                    ax_main.plot(x, y, marker='*', markersize=8, 
-                                color='gold', markeredgecolor='#30363d', 
-                                markeredgewidth=0.5, zorder=6)
-                    
-                    # Add tooltip-style annotation
-                    tooltip = ax_main.annotate(event,
-                                xy=(x, y), xytext=(15, 0),
-                                textcoords='offset points',
-                                fontsize=8, color='#c9d1d9',
-                                bbox=dict(boxstyle="round,pad=0.3", fc='#161b22', ec='#30363d', alpha=0.9),
-                                arrowprops=dict(arrowstyle="->", color='#30363d'),
-                                zorder=7, visible=False)
-                    
-                    # Create hover effect (simulated with always-visible for key events)
-                    if "World Champion" in event or "highest" in event:
-                        tooltip.set_visible(True)
-    
-    # Add rating trend line
-    trend_ages = [age for age, _ in sampled_data]
-    trend_ratings = [rating for _, rating in sampled_data]
-    ax_main.plot(trend_ages, [y] * len(trend_ages), '-', color='#8b949e', 
+        for age, rating in sampled_data:
+            x = age
+            
+            # Determine cell color based on rating
+            if pd.isna(rating):
+                color = '#161b22'  # Empty cell color in GitHub dark mode
+            else:
+                color = cmap(norm(rating))
+            
+            # Draw the cell as a rounded rectangle with subtle 3D effect
+            rect = patches.Rectangle((x - cell_size/2, y - cell_size/2), 
+                                    cell_size, cell_size, 
+                                    linewidth=0.5, edgecolor='#30363d',
+                                    facecolor=color, alpha=0.95, zorder=3,
+                                    angle=0, capstyle='round')
+            ax.add_patch(rect)
+            
+            # Add subtle highlight to top-left edge for 3D effect
+            if not pd.isna(rating) and rating > min_rating + 100:
+                highlight = patches.Rectangle((x - cell_size/2, y - cell_size/2), 
+                                            cell_size/3, cell_size/3, 
+                                            linewidth=0, facecolor='white', 
+                                            alpha=0.1, zorder=4)
+                ax.add_patch(highlight)
+        
+        # Add rating trend line
+        trend_ages = [age for age, _ in sampled_data]
+        ax.plot(trend_ages, [y] * len(trend_ages), '-', color='#8b949e', 
                 alpha=0.3, linewidth=0.5, zorder=2)
 
-# Add player labels on y-axis with custom styling (improved spacing)
-ax_main.set_yticks([i * total_cell_size for i in range(len(df.columns))])
-player_labels = []
-for player in df.columns:
-    # Add player name with peak rating
-    peak_rating = max([rating for _, rating in players_data[player]])
-    player_labels.append(f"{player} ({peak_rating})")
-ax_main.set_yticklabels(player_labels, fontsize=8)
-
-# Style the y-tick labels
-for tick in ax_main.yaxis.get_major_ticks():
-    tick.label1.set_fontweight('bold')
-
-# Set x-axis to show ages with more detail
-ax_main.set_xticks(range(10, 76, 5))
-ax_main.set_xticklabels(range(10, 76, 5), fontsize=9)
-# Add minor ticks for each year
-ax_main.set_xticks(range(10, 76, 1), minor=True)
-ax_main.tick_params(axis='x', which='minor', length=2, color='#30363d')
-
-# Remove spines
-for spine in ax_main.spines.values():
-    spine.set_visible(False)
-
-# Add grid lines with more detail
-ax_main.grid(True, linestyle='--', alpha=0.1, color='#30363d', which='major')
-ax_main.grid(True, linestyle=':', alpha=0.05, color='#30363d', which='minor', axis='x')
-ax_main.set_axisbelow(True)
-
-# Set axis limits
-ax_main.set_xlim(9.5, 73.5)
-ax_main.set_ylim(-0.5, len(df.columns) * total_cell_size - 0.5)
-
-# Add titles and labels with enhanced styling (shortened title)
-title = ax_main.set_title('Chess Grandmasters ELO Rating Progression', 
-                fontsize=14, fontweight='bold', pad=15, color='#c9d1d9')
-# Add subtle glow effect to title
-title.set_path_effects([path_effects.withStroke(linewidth=3, foreground='#161b22')])
-
-ax_main.set_xlabel('Age', fontsize=10, labelpad=8, color='#c9d1d9', fontweight='bold')
+
+# Square cell outlines of the given size anchored at the bottom-left of each (x, y) centre
+def _cell_vertices(x, y, size):
+    x0 = x - cell_size/2
+    y0 = y - cell_size/2
+    verts = np.empty((len(x), 4, 2))
+    verts[:, 0, 0] = x0
+    verts[:, 0, 1] = y0
+    verts[:, 1, 0] = x0 + size
+    verts[:, 1, 1] = y0
+    verts[:, 2, 0] = x0 + size
+    verts[:, 2, 1] = y0 + size
+    verts[:, 3, 0] = x0
+    verts[:, 3, 1] = y0 + size
+    return verts
+
+
+# Batched renderer: every cell, every highlight and every trend line is a single artist,
+# and the cell colours come from one vectorized colormap call over the whole grid
+def _draw_grid_collection(ax, df, cmap, norm):
+    from matplotlib.collections import LineCollection, PolyCollection
+    
+    sampled = df.iloc[::sample_step]
+    values = sampled.to_numpy(dtype=np.float64)
+    ages = sampled.index.to_numpy(dtype=np.float64)
+    rows = np.arange(values.shape[1]) * total_cell_size
+    
+    valid = ~np.isnan(values)
+    x = np.broadcast_to(ages[:, None], values.shape)[valid]
+    y = np.broadcast_to(rows[None, :], values.shape)[valid]
+    ratings = values[valid]
+    
+    cells = PolyCollection(_cell_vertices(x, y, cell_size),
+                           facecolors=cmap(norm(ratings), alpha=0.95),
+                           edgecolors='#30363d', linewidths=0.5,
+                           capstyle='round', zorder=3)
+    ax.add_collection(cells, autolim=False)
+    
+    # Add subtle highlight to top-left edge for 3D effect
+    bright = ratings > min_rating + 100
+    highlights = PolyCollection(_cell_vertices(x[bright], y[bright], cell_size/3),
+                                facecolors='white', alpha=0.1,
+                                linewidths=0, zorder=4)
+    ax.add_collection(highlights, autolim=False)
+    
+    # Add rating trend lines, one segment per player spanning its sampled cells
+    has_data = valid.any(axis=0)
+    first = ages[valid.argmax(axis=0)]
+    last = ages[len(ages) - 1 - valid[::-1].argmax(axis=0)]
+    segments = np.stack([np.column_stack([first, rows]), np.column_stack([last, rows])], axis=1)
+    trend = LineCollection(segments[has_data], colors='#8b949e', alpha=0.3,
+                           linewidths=0.5, zorder=2)
+    ax.add_collection(trend, autolim=False)
+    return cells
+
+
+# Raster renderer: the sampled grid is painted as one RGBA image, so drawing cost
+# depends only on the output size, not on the number of cells
+def _draw_grid_raster(ax, df, cmap, norm):
+    sampled = df.iloc[::sample_step]
+    values = sampled.to_numpy(dtype=np.float64).T
+    ages = sampled.index.to_numpy(dtype=np.float64)
+    
+    colors = cmap(norm(values), alpha=0.95)
+    colors[np.isnan(values)] = (0, 0, 0, 0)
+    
+    # Split each row into sub-rows so the spacing between players stays transparent
+    unit = cell_spacing / 2
+    rows_per_player = int(round(total_cell_size / unit))
+    filled = int(round(cell_size / unit))
+    pad = (rows_per_player - filled) // 2
+    image = np.zeros((values.shape[0], rows_per_player) + colors.shape[1:])
+    image[:, pad:pad + filled] = colors[:, None]
+    image = image.reshape((-1,) + colors.shape[1:])
+    
+    half_step = (ages[-1] - ages[0]) / max(len(ages) - 1, 1) / 2
+    extent = (ages[0] - half_step, ages[-1] + half_step,
+              -total_cell_size/2, (values.shape[0] - 0.5) * total_cell_size)
+    return ax.imshow(image, extent=extent, origin='lower', aspect='auto',
+                     interpolation='nearest', zorder=3)
+
+
+# Draw the highly detailed GitHub-style contribution grid with the selected engine
+def draw_rating_grid(ax, df, cmap, norm, mode='auto'):
+    mode = resolve_render_mode(mode, len(df.columns))
+    if mode == 'patches':
+        return _draw_grid_patches(ax, df, cmap, norm)
+    if mode == 'collection':
+        return _draw_grid_collection(ax, df, cmap, norm)
+    return _draw_grid_raster(ax, df, cmap, norm)
+
+
+# Index of every world championship reign (as an age interval) and notable event of the
+# given players, flattened into arrays keyed by the player's row in the chart.
+# Reigns of players without a known birth year cannot be placed on the age axis and are left out.
+# With calendar=True positions are calendar years instead: reigns need no birth year, and
+# events (recorded by age) are left out when it is unknown.
+def build_event_index(players, calendar=False, births=None):
+    births = birth_years if births is None else births
+    reign_rows, reign_starts, reign_ends = [], [], []
+    event_rows, event_ages, event_texts = [], [], []
+    
+    for row, player in enumerate(players):
+        birth_year = births.get(player)
+        if birth_year is not None or calendar:
+            offset = 0 if calendar else birth_year
+            for start_year, end_year in world_champion_periods.get(player, []):
+                reign_rows.append(row)
+                reign_starts.append(start_year - offset)
+                reign_ends.append(end_year - offset)
+        
+        if calendar and birth_year is None:
+            continue
+        offset = birth_year if calendar else 0
+        for event_age, event in notable_events.get(player, []):
+            event_rows.append(row)
+            event_ages.append(event_age + offset)
+            event_texts.append(event)
+    
+    return {
+        'reign_rows': np.array(reign_rows, dtype=np.intp),
+        'reign_starts': np.array(reign_starts, dtype=np.float64),
+        'reign_ends': np.array(reign_ends, dtype=np.float64),
+        'event_rows': np.array(event_rows, dtype=np.intp),
+        'event_ages': np.array(event_ages, dtype=np.float64),
+        'event_texts': event_texts,
+    }
+
+
+# Tooltips are simulated with always-visible annotations for key events
+def is_highlighted_event(event):
+    return "World Champion" in event or "highest" in event
+
+
+# Resolve the markers of the sampled grid in one vectorized pass over (sampled ages x index
+# entries): a crown on every whole-year cell inside a reign, a star on the cell matching
+# each notable event. Returns marker coordinates in chart units.
+def resolve_markers(df, index):
+    sampled = df.iloc[::sample_step]
+    ages = sampled.index.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(sampled.to_numpy(dtype=np.float64))
+    
+    # Add world championship indicator (only for integer ages to avoid overcrowding)
+    whole_year = np.abs(ages - np.round(ages)) < 0.01
+    in_reign = ((ages[:, None] >= index['reign_starts']) & (ages[:, None] <= index['reign_ends'])
+                & whole_year[:, None] & valid[:, index['reign_rows']])
+    age_idx, reign_idx = np.nonzero(in_reign)
+    crowns = np.unique(np.column_stack([index['reign_rows'][reign_idx], age_idx]), axis=0)
+    
+    # Add notable achievement indicator, allowing small tolerance for matching
+    at_event = (np.abs(ages[:, None] - index['event_ages']) < 0.1) & valid[:, index['event_rows']]
+    age_idx, event_idx = np.nonzero(at_event)
+    
+    return {
+        'crown_x': ages[crowns[:, 1]],
+        'crown_y': crowns[:, 0] * total_cell_size,
+        'star_x': ages[age_idx],
+        'star_y': index['event_rows'][event_idx] * total_cell_size,
+        'star_events': [index['event_texts'][k] for k in event_idx],
+    }
+
+
+# Add world championship and notable achievement markers: one scatter per marker type,
+# plus annotations only for the events that are shown
+def draw_event_markers(ax, df, index=None):
+    if index is None:
+        index = build_event_index(df.columns)
+    markers = resolve_markers(df, index)
+    
+    # Add gold crown markers
+    ax.scatter(markers['crown_x'], markers['crown_y'], marker='$♔$', s=6**2,
+               color='gold', linewidths=0, zorder=5)
+    
+    # Add star markers
+    ax.scatter(markers['star_x'], markers['star_y'], marker='*', s=8**2,
+               color='gold', edgecolors='#30363d', linewidths=0.5, zorder=6)
+    
+    # Add tooltip-style annotations
+    for x, y, event in zip(markers['star_x'], markers['star_y'], markers['star_events']):
+        if not is_highlighted_event(event):
+            continue
+        ax.annotate(event,
+                    xy=(x, y), xytext=(15, 0),
+                    textcoords='offset points',
+                    fontsize=8, color='#c9d1d9',
+                    bbox=dict(boxstyle="round,pad=0.3", fc='#161b22', ec='#30363d', alpha=0.9),
+                    arrowprops=dict(arrowstyle="->", color='#30363d'),
+                    zorder=7)
+
+
+# Player labels, ticks, grid lines and title of the main heatmap. With calendar=True the
+# x axis shows calendar years over the range of the grid instead of ages.
+def style_main_axes(ax, df, data, calendar=False):
+    import matplotlib.patheffects as path_effects
+    
+    # Add player labels on y-axis with custom styling (improved spacing)
+    ax.set_yticks([i * total_cell_size for i in range(len(df.columns))])
+    player_labels = []
+    for player in df.columns:
+        # Add player name with peak rating
+        peak_rating = max([rating for _, rating in data[player]])
+        player_labels.append(f"{player} ({peak_rating})")
+    ax.set_yticklabels(player_labels, fontsize=8)
+    
+    # Style the y-tick labels
+    for tick in ax.yaxis.get_major_ticks():
+        tick.label1.set_fontweight('bold')
+    
+    if calendar:
+        # Decades, with a minor tick for each year
+        first, last = float(df.index[0]), float(df.index[-1])
+        decades = range(int(np.ceil(first / 10)) * 10, int(last) + 1, 10)
+        ax.set_xticks(decades)
+        ax.set_xticklabels(decades, fontsize=9)
+        ax.set_xticks(range(int(np.ceil(first)), int(last) + 1), minor=True)
+        xlim, xlabel = (first - 0.5, last + 0.5), 'Year'
+    else:
+        # Set x-axis to show ages with more detail
+        ax.set_xticks(range(10, 76, 5))
+        ax.set_xticklabels(range(10, 76, 5), fontsize=9)
+        # Add minor ticks for each year
+        ax.set_xticks(range(10, 76, 1), minor=True)
+        xlim, xlabel = (9.5, 73.5), 'Age'
+    ax.tick_params(axis='x', which='minor', length=2, color='#30363d')
+    
+    # Remove spines
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    
+    # Add grid lines with more detail
+    ax.grid(True, linestyle='--', alpha=0.1, color='#30363d', which='major')
+    ax.grid(True, linestyle=':', alpha=0.05, color='#30363d', which='minor', axis='x')
+    ax.set_axisbelow(True)
+    
+    # Set axis limits
+    ax.set_xlim(*xlim)
+    ax.set_ylim(-0.5, len(df.columns) * total_cell_size - 0.5)
+    
+    # Add titles and labels with enhanced styling (shortened title)
+    title = ax.set_title('Chess Grandmasters ELO Rating Progression', 
+                         fontsize=14, fontweight='bold', pad=15, color='#c9d1d9')
+    # Add subtle glow effect to title
+    title.set_path_effects([path_effects.withStroke(linewidth=3, foreground='#161b22')])
+    
+    ax.set_xlabel(xlabel, fontsize=10, labelpad=8, color='#c9d1d9', fontweight='bold')
+    
+    # Add a smaller watermark (kept over the grid on the calendar axis, far from x = 0.5)
+    ax.text(np.mean(xlim) if calendar else 0.5, 0.5, "CHESS ELO", fontsize=60, color='#161b22',
+            ha='center', va='center', alpha=0.1, zorder=1,
+            fontweight='bold', rotation=30)
+
 
 # Create an enhanced color legend in the separate axis
-ax_legend.axis('off')
-
-# Add rating level legend with more detailed gradations
-legend_title = ax_legend.text(0.5, 0.95, "Rating Levels", 
-                            ha='center', va='top', fontsize=10, 
-                            fontweight='bold', color='#c9d1d9')
-legend_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
-
-# Create simplified rating level boxes (5 levels instead of 10)
-step = (max_rating - min_rating) / 5
-rating_levels = []
-for i in range(5):
-    start = min_rating + i * step
-    end = min_rating + (i+1) * step
-    # Get color from our enhanced colormap
-    color_val = i / 5
-    color = github_cmap(color_val)
-    rating_levels.append({
-        "label": f"{int(start)}-{int(end)}" if i < 4 else f"> {int(start)}",
-        "color": color
-    })
-
-# Draw the rating level boxes in a single column
-for i, level in enumerate(rating_levels):
-    y_pos = 0.85 - (i * 0.15)
-    x_pos = 0.1
-    
-    # Add color box with 3D effect
-    rect = patches.Rectangle((x_pos, y_pos-0.03), 0.08, 0.06, 
-                           facecolor=level["color"], edgecolor='#30363d',
-                           linewidth=0.5)
-    ax_legend.add_patch(rect)
-    
-    # Add subtle highlight for 3D effect
-    if i > 0:  # Skip the darkest box
-        highlight = patches.Rectangle((x_pos, y_pos-0.03), 0.03, 0.03, 
-                                    linewidth=0, facecolor='white', alpha=0.1)
-        ax_legend.add_patch(highlight)
-    
-    # Add label
-    ax_legend.text(x_pos + 0.1, y_pos, level["label"], fontsize=8, 
-                  va='center', color='#c9d1d9')
-
-# Add indicators legend with enhanced styling (better spacing)
-indicator_title = ax_legend.text(0.5, 0.25, "Indicators", ha='center', va='top', 
-                               fontsize=10, fontweight='bold', color='#c9d1d9')
-indicator_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
-
-# World champion indicator with enhanced styling
-ax_legend.plot(0.15, 0.15, marker='$♔$', markersize=8, color='gold')
-ax_legend.text(0.25, 0.15, "World Champion", fontsize=8, va='center', color='#c9d1d9',
-              path_effects=[path_effects.withStroke(linewidth=1, foreground='#161b22')])
-
-# Notable achievement indicator with enhanced styling
-ax_legend.plot(0.15, 0.05, marker='*', markersize=8, color='gold', 
-              markeredgecolor='#30363d', markeredgewidth=0.5)
-ax_legend.text(0.25, 0.05, "Notable Achievement", fontsize=8, va='center', color='#c9d1d9',
-              path_effects=[path_effects.withStroke(linewidth=1, foreground='#161b22')])
-
-# Add statistics section (moved down for better spacing)
-stats_title = ax_legend.text(0.5, -0.15, "Statistics", ha='center', va='top', 
-                           fontsize=10, fontweight='bold', color='#c9d1d9')
-stats_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
-
-# Calculate and display some statistics (adjusted positions)
-total_cells = sum(len(player_data) for player in df.columns for player_data in [df[player].dropna()])
-ax_legend.text(0.1, -0.25, f"Total Data Points: {total_cells:,}", fontsize=8, color='#c9d1d9')
-ax_legend.text(0.1, -0.35, f"Date Range: Ages 10-75", fontsize=8, color='#c9d1d9')
-ax_legend.text(0.1, -0.45, f"Rating Range: {min_rating}-{max_rating}", fontsize=8, color='#c9d1d9')
+def draw_legend_panel(ax, df, cmap, calendar=False):
+    import matplotlib.patches as patches
+    import matplotlib.patheffects as path_effects
+    
+    ax.axis('off')
+    
+    # Add rating level legend with more detailed gradations
+    legend_title = ax.text(0.5, 0.95, "Rating Levels", 
+                           ha='center', va='top', fontsize=10, 
+                           fontweight='bold', color='#c9d1d9')
+    legend_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+    
+    # Create simplified rating level boxes (5 levels instead of 10)
+    step = (max_rating - min_rating) / 5
+    rating_levels = []
+    for i in range(5):
+        start = min_rating + i * step
+        end = min_rating + (i+1) * step
+        # Get color from our enhanced colormap
+        color_val = i / 5
+        color = cmap(color_val)
+        rating_levels.append({
+            "label": f"{int(start)}-{int(end)}" if i < 4 else f"> {int(start)}",
+            "color": color
+        })
+    
+    # Draw the rating level boxes in a single column
+    for i, level in enumerate(rating_levels):
+        y_pos = 0.85 - (i * 0.15)
+        x_pos = 0.1
+        
+        # Add color box with 3D effect
+        rect = patches.Rectangle((x_pos, y_pos-0.03), 0.08, 0.06, 
+                                 facecolor=level["color"], edgecolor='#30363d',
+                                 linewidth=0.5)
+        ax.add_patch(rect)
+        
+        # Add subtle highlight for 3D effect
+        if i > 0:  # Skip the darkest box
+            highlight = patches.Rectangle((x_pos, y_pos-0.03), 0.03, 0.03, 
+                                          linewidth=0, facecolor='white', alpha=0.1)
+            ax.add_patch(highlight)
+        
+        # Add label
+        ax.text(x_pos + 0.1, y_pos, level["label"], fontsize=8, 
+                va='center', color='#c9d1d9')
+    
+    # Add indicators legend with enhanced styling (better spacing)
+    indicator_title = ax.text(0.5, 0.25, "Indicators", ha='center', va='top', 
+                              fontsize=10, fontweight='bold', color='#c9d1d9')
+    indicator_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+    
+    # World champion indicator with enhanced styling
+    ax.plot(0.15, 0.15, marker='$♔$', markersize=8, color='gold')
+    ax.text(0.25, 0.15, "World Champion", fontsize=8, va='center', color='#c9d1d9',
+            path_effects=[path_effects.withStroke(linewidth=1, foreground='#161b22')])
+    
+    # Notable achievement indicator with enhanced styling
+    ax.plot(0.15, 0.05, marker='*', markersize=8, color='gold', 
+            markeredgecolor='#30363d', markeredgewidth=0.5)
+    ax.text(0.25, 0.05, "Notable Achievement", fontsize=8, va='center', color='#c9d1d9',
+            path_effects=[path_effects.withStroke(linewidth=1, foreground='#161b22')])
+    
+    # Add statistics section (moved down for better spacing)
+    stats_title = ax.text(0.5, -0.15, "Statistics", ha='center', va='top', 
+                          fontsize=10, fontweight='bold', color='#c9d1d9')
+    stats_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+    
+    # Calculate and display some statistics (adjusted positions)
+    total_cells = int(df.notna().to_numpy().sum())
+    # The data-dependent artists of the panel, returned so they can stay live when the rest
+    # of the panel is composited from a cached image
+    stats_text = ax.text(0.1, -0.25, f"Total Data Points: {total_cells:,}", fontsize=8, color='#c9d1d9')
+    first, last = df.index.min(), df.index.max()
+    range_text = ax.text(0.1, -0.35, f"Date Range: {'Years' if calendar else 'Ages'} {first:.0f}-{last:.0f}",
+                         fontsize=8, color='#c9d1d9')
+    ax.text(0.1, -0.45, f"Rating Range: {min_rating}-{max_rating}", fontsize=8, color='#c9d1d9')
+    return [stats_text, range_text]
+
+
+# Career leaderboard under the statistics of the legend panel, from a
+# career_stats.compute_career_stats table. Returns its (data-dependent) text artist.
+def draw_career_stats(ax, stats, position_label='age'):
+    leaders = stats.dropna(subset=['peak']).sort_values('peak', ascending=False).head(CAREER_LEADERS)
+    lines = ["Peak Leaders:"]
+    for player, row in leaders.iterrows():
+        lines.append(f"  {player[:18]:<18} {row['peak']:4.0f} @ {position_label} {row['peak_at']:.0f}")
+    first = stats['first_2800'].dropna()
+    if len(first):
+        lines.append(f"First to 2800: {first.idxmin()} ({position_label} {first.min():.0f})")
+    plateaus = stats['plateau_years']
+    if len(plateaus) and plateaus.max() > 0:
+        lines.append(f"Longest Plateau: {plateaus.idxmax()} ({plateaus.max():.1f} years)")
+    return ax.text(0.1, -0.55, "\n".join(lines), fontsize=7, va='top', color='#c9d1d9', linespacing=1.4)
+
 
 # Create enhanced rating categories section in info panel
-ax_info.axis('off')
-info_title = ax_info.set_title('Rating Categories and Historical Context', 
-                             fontsize=12, fontweight='bold', color='#c9d1d9')
-info_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+def draw_info_panel(fig, subplot_spec, ax):
+    import matplotlib.gridspec as gridspec
+    import matplotlib.patheffects as path_effects
+    
+    ax.axis('off')
+    info_title = ax.set_title('Rating Categories and Historical Context', 
+                              fontsize=12, fontweight='bold', color='#c9d1d9')
+    info_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+    
+    # Create a grid for the info panel with 2 columns instead of 3
+    info_grid = gridspec.GridSpecFromSubplotSpec(1, 2, subplot_spec=subplot_spec)
+    
+    ax_categories = fig.add_subplot(info_grid[0, 0], label='categories')
+    draw_categories_panel(ax_categories)
+    
+    ax_history = fig.add_subplot(info_grid[0, 1], label='history')
+    draw_history_panel(ax_history)
+    return ax_categories, ax_history
 
-# Create a grid for the info panel with 2 columns instead of 3
-info_grid = gridspec.GridSpecFromSubplotSpec(1, 2, subplot_spec=gs[1, :])
 
 # Rating categories section with enhanced styling
-ax_categories = fig.add_subplot(info_grid[0, 0])
-ax_categories.axis('off')
-
-# Add a background panel
-ax_categories.add_patch(
-    patches.Rectangle((0.02, 0.02), 0.96, 0.96, 
-                     facecolor='#161b22', edgecolor='#30363d',
-                     linewidth=1, alpha=0.7, zorder=1)
-)
-
-# Add a title for the section
-cat_title = ax_categories.text(0.5, 0.95, "FIDE Rating Categories", 
-                             fontsize=10, fontweight='bold', color='#c9d1d9',
-                             ha='center', va='top', zorder=2)
-cat_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
-
-# Create a GitHub-style table for rating categories with enhanced styling
-category_data = [[cat['name'], f"{cat['min']}-{cat['max']}"] for cat in rating_categories]
-
-for i, (name, range_text) in enumerate(category_data):
-    # Adjust spacing based on number of categories
-    y_pos = 0.85 - (i * (0.7 / len(category_data)))
-    # Category name with color indicator
-    color = rating_categories[i]['color']
-    ax_categories.add_patch(
-        patches.Rectangle((0.05, y_pos-0.03), 0.03, 0.06, 
-                         facecolor=color, edgecolor='#30363d',
-                         linewidth=0.5, alpha=0.7, zorder=2)
+def draw_categories_panel(ax):
+    import matplotlib.patches as patches
+    import matplotlib.patheffects as path_effects
+    
+    ax.axis('off')
+    
+    # Add a background panel
+    ax.add_patch(
+        patches.Rectangle((0.02, 0.02), 0.96, 0.96, 
+                          facecolor='#161b22', edgecolor='#30363d',
+                          linewidth=1, alpha=0.7, zorder=1)
     )
-    ax_categories.text(0.1, y_pos, name, fontsize=7, color='#c9d1d9', 
-                      ha='left', va='center', zorder=2,
-                      path_effects=[path_effects.withStroke(linewidth=1, foreground='#161b22')])
     
-    # Rating range
-    ax_categories.text(0.7, y_pos, range_text, fontsize=7, color='#c9d1d9', 
-                      ha='left', va='center', zorder=2)
+    # Add a title for the section
+    cat_title = ax.text(0.5, 0.95, "FIDE Rating Categories", 
+                        fontsize=10, fontweight='bold', color='#c9d1d9',
+                        ha='center', va='top', zorder=2)
+    cat_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+    
+    # Create a GitHub-style table for rating categories with enhanced styling
+    category_data = [[cat['name'], f"{cat['min']}-{cat['max']}"] for cat in rating_categories]
     
-    # Add separator line
-    if i < len(category_data) - 1:
-        ax_categories.axhline(y=y_pos-0.04, xmin=0.05, xmax=0.95, 
-                             color='#30363d', linestyle='-', linewidth=0.5, zorder=2)
+    for i, (name, range_text) in enumerate(category_data):
+        # Adjust spacing based on number of categories
+        y_pos = 0.85 - (i * (0.7 / len(category_data)))
+        # Category name with color indicator
+        color = rating_categories[i]['color']
+        ax.add_patch(
+            patches.Rectangle((0.05, y_pos-0.03), 0.03, 0.06, 
+                              facecolor=color, edgecolor='#30363d',
+                              linewidth=0.5, alpha=0.7, zorder=2)
+        )
+        ax.text(0.1, y_pos, name, fontsize=7, color='#c9d1d9', 
+                ha='left', va='center', zorder=2,
+                path_effects=[path_effects.withStroke(linewidth=1, foreground='#161b22')])
+        
+        # Rating range
+        ax.text(0.7, y_pos, range_text, fontsize=7, color='#c9d1d9', 
+                ha='left', va='center', zorder=2)
+        
+        # Add separator line
+        if i < len(category_data) - 1:
+            ax.axhline(y=y_pos-0.04, xmin=0.05, xmax=0.95, 
+                       color='#30363d', linestyle='-', linewidth=0.5, zorder=2)
+
 
 # Historical context section with enhanced styling
-ax_history = fig.add_subplot(info_grid[0, 1])
-ax_history.axis('off')
-
-# Add a background panel
-ax_history.add_patch(
-    patches.Rectangle((0.02, 0.02), 0.96, 0.96, 
-                     facecolor='#161b22', edgecolor='#30363d',
-                     linewidth=1, alpha=0.7, zorder=1)
-)
-
-# Add a title for the section
-hist_title = ax_history.text(0.5, 0.95, "Historical Context", 
-                           fontsize=10, fontweight='bold', color='#c9d1d9',
-                           ha='center', va='top', zorder=2)
-hist_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+def draw_history_panel(ax):
+    import matplotlib.patches as patches
+    import matplotlib.patheffects as path_effects
+    
+    ax.axis('off')
+    
+    # Add a background panel
+    ax.add_patch(
+        patches.Rectangle((0.02, 0.02), 0.96, 0.96, 
+                          facecolor='#161b22', edgecolor='#30363d',
+                          linewidth=1, alpha=0.7, zorder=1)
+    )
+    
+    # Add a title for the section
+    hist_title = ax.text(0.5, 0.95, "Historical Context", 
+                         fontsize=10, fontweight='bold', color='#c9d1d9',
+                         ha='center', va='top', zorder=2)
+    hist_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+    
+    y_pos = 0.85
+    for note in historical_notes:
+        ax.text(0.05, y_pos, note, fontsize=7, va='top', ha='left', 
+                color='#c9d1d9', zorder=2)
+        y_pos -= 0.12
 
-historical_notes = [
-    "• FIDE rating system introduced in 1970",
-    "• Pre-1970 ratings are retroactively calculated",
-    "• 2700+ considered 'super-grandmaster' level",
-    "• 2800+ achieved by only 15 players in history",
-    "• 2882 (Carlsen, 2014) is the highest official rating",
-    "• Ratings inflation: ~1-3 points per year"
-]
 
-y_pos = 0.85
-for note in historical_notes:
-    ax_history.text(0.05, y_pos, note, fontsize=7, va='top', ha='left', 
-                   color='#c9d1d9', zorder=2)
-    y_pos -= 0.12
+# Create an enhanced timeline of chess history in the bottom panel
+def draw_timeline_panel(ax):
+    import matplotlib.patches as patches
+    import matplotlib.patheffects as path_effects
+    
+    ax.axis('off')
+    timeline_title = ax.set_title('Timeline of Chess History', 
+                                  fontsize=12, fontweight='bold', color='#c9d1d9')
+    timeline_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
+    
+    # Add a background panel
+    ax.add_patch(
+        patches.Rectangle((0.02, 0.05), 0.96, 0.9, 
+                          facecolor='#161b22', edgecolor='#30363d',
+                          linewidth=1, alpha=0.7, zorder=1)
+    )
+    
+    # Draw enhanced timeline with decorative elements
+    timeline_start = 1880
+    timeline_end = 2025
+    ax.axhline(y=0.5, xmin=0.05, xmax=0.95, color='#30363d', linewidth=3, zorder=2)
+    
+    # Add decade markers
+    for decade in range(1880, 2030, 10):
+        x_pos = 0.05 + 0.9 * (decade - timeline_start) / (timeline_end - timeline_start)
+        # Add tick mark
+        ax.plot([x_pos, x_pos], [0.48, 0.52], '-', color='#8b949e', linewidth=1, zorder=3)
+        # Add decade label
+        ax.text(x_pos, 0.43, str(decade), fontsize=8, ha='center', va='top', 
+                color='#8b949e', zorder=3)
+    
+    # Calculate position on timeline and add events
+    timeline_length = timeline_end - timeline_start
+    for index, event in enumerate(timeline_events):
+        x_pos = 0.05 + 0.9 * (event["year"] - timeline_start) / timeline_length
+        
+        # Add marker with different styling based on importance
+        if event["importance"] == "major":
+            marker_size = 10
+            marker_color = '#39d353'
+            text_size = 9
+            text_weight = 'bold'
+        else:
+            marker_size = 7
+            marker_color = '#26a641'
+            text_size = 8
+            text_weight = 'normal'
+        
+        # Add marker with 3D effect
+        ax.plot(x_pos, 0.5, 'o', markersize=marker_size, color=marker_color, 
+                markeredgecolor='#30363d', markeredgewidth=1, zorder=4)
+        
+        # Add year label
+        ax.text(x_pos, 0.4, str(event["year"]), fontsize=8, 
+                ha='center', va='top', color='#c9d1d9', zorder=3)
+        
+        # Add event description (alternating above/below)
+        if index % 2 == 0:
+            y_text = 0.7
+            va = 'bottom'
+        else:
+            y_text = 0.3
+            va = 'top'
+        
+        # Add text with custom styling (smaller text and wider boxes)
+        event_text = ax.text(x_pos, y_text, event["event"], fontsize=text_size-1, 
+                             ha='center', va=va, color='#c9d1d9', fontweight=text_weight,
+                             bbox=dict(boxstyle="round,pad=0.3", fc='#161b22', ec='#30363d', alpha=0.8),
+                             zorder=4)
+        
+        # Add subtle glow effect for major events
+        if event["importance"] == "major":
+            event_text.set_path_effects([path_effects.withStroke(linewidth=1, foreground='#161b22')])
+    
+    # Add connecting lines between events and timeline
+    for index, event in enumerate(timeline_events):
+        x_pos = 0.05 + 0.9 * (event["year"] - timeline_start) / timeline_length
+        
+        # Determine if event is above or below timeline
+        if index % 2 == 0:
+            y_text = 0.65  # Adjust to connect to the text box
+        else:
+            y_text = 0.35  # Adjust to connect to the text box
+        ax.plot([x_pos, x_pos], [0.5, y_text], '--', color='#30363d', 
+                linewidth=0.5, alpha=0.7, zorder=2)
+
 
-# Combine historical context and achievements in one panel
-historical_notes.extend([
-    "",
-    "• Kasparov: Longest time as world #1 (255 months)",
-    "• Carlsen: Highest classical rating (2882)",
-    "• Fischer: 20 consecutive wins against top players"
-])
+# A figure for one chart. Only interactive charts go through pyplot; everything else is a
+# plain Figure, so batch workers and long-lived services share no pyplot state.
+def _new_figure(figsize, show=False):
+    if show:
+        return _pyplot().figure(figsize=figsize, dpi=100)
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize, dpi=100)
 
-# Create an enhanced timeline of chess history in the bottom panel
-ax_timeline.axis('off')
-timeline_title = ax_timeline.set_title('Timeline of Chess History', 
-                                     fontsize=12, fontweight='bold', color='#c9d1d9')
-timeline_title.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#161b22')])
-
-# Add a background panel
-ax_timeline.add_patch(
-    patches.Rectangle((0.02, 0.05), 0.96, 0.9, 
-                     facecolor='#161b22', edgecolor='#30363d',
-                     linewidth=1, alpha=0.7, zorder=1)
-)
 
-# Simplified timeline events (fewer events)
-timeline_events = [
-    {"year": 1886, "event": "First official World Championship", "importance": "major"},
-    {"year": 1924, "event": "FIDE founded", "importance": "major"},
-    {"year": 1970, "event": "FIDE rating system introduced", "importance": "major"},
-    {"year": 1972, "event": "Fischer-Spassky 'Match of the Century'", "importance": "major"},
-    {"year": 1985, "event": "Kasparov becomes youngest World Champion", "importance": "major"},
-    {"year": 1996, "event": "Kasparov vs Deep Blue", "importance": "major"},
-    {"year": 2013, "event": "Carlsen becomes World Champion", "importance": "major"},
-    {"year": 2023, "event": "Ding Liren becomes World Champion", "importance": "major"}
-]
+# Time a pipeline stage when an instrumentation.Instrumentation is attached
+def _stage(instrument, name):
+    return nullcontext() if instrument is None else instrument.stage(name)
 
-# Draw enhanced timeline with decorative elements
-timeline_start = 1880
-timeline_end = 2025
-ax_timeline.axhline(y=0.5, xmin=0.05, xmax=0.95, color='#30363d', linewidth=3, zorder=2)
-
-# Add decade markers
-for decade in range(1880, 2030, 10):
-    x_pos = 0.05 + 0.9 * (decade - timeline_start) / (timeline_end - timeline_start)
-    # Add tick mark
-    ax_timeline.plot([x_pos, x_pos], [0.48, 0.52], '-', color='#8b949e', linewidth=1, zorder=3)
-    # Add decade label
-    ax_timeline.text(x_pos, 0.43, str(decade), fontsize=8, ha='center', va='top', 
-                    color='#8b949e', zorder=3)
-
-# Calculate position on timeline and add events
-timeline_length = timeline_end - timeline_start
-for event in timeline_events:
-    x_pos = 0.05 + 0.9 * (event["year"] - timeline_start) / timeline_length
-    
-    # Add marker with different styling based on importance
-    if event["importance"] == "major":
-        marker_size = 10
-        marker_color = '#39d353'
-        text_size = 9
-        text_weight = 'bold'
-    else:
-        marker_size = 7
-        marker_color = '#26a641'
-        text_size = 8
-        text_weight = 'normal'
-    
-    # Add marker with 3D effect
-    ax_timeline.plot(x_pos, 0.5, 'o', markersize=marker_size, color=marker_color, 
-                    markeredgecolor='#30363d', markeredgewidth=1, zorder=4)
-    
-    # Add year label
-    ax_timeline.text(x_pos, 0.4, str(event["year"]), fontsize=8, 
-                    ha='center', va='top', color='#c9d1d9', zorder=3)
-    
-    # Add event description (alternating above/below)
-    if timeline_events.index(event) % 2 == 0:
-        y_text = 0.7
-        va = 'bottom'
-    else:
-        y_text = 0.3
-        va = 'top'
-    
-    # Add text with custom styling (smaller text and wider boxes)
-    event_text = ax_timeline.text(x_pos, y_text, event["event"], fontsize=text_size-1, 
-                                ha='center', va=va, color='#c9d1d9', fontweight=text_weight,
-                                bbox=dict(boxstyle="round,pad=0.3", fc='#161b22', ec='#30363d', alpha=0.8),
-                                zorder=4)
-    
-    # Add subtle glow effect for major events
-    if event["importance"] == "major":
-        event_text.set_path_effects([path_effects.withStroke(linewidth=1, foreground='#161b22')])
-
-# Add connecting lines between events and timeline
-for event in timeline_events:
-    x_pos = 0.05 + 0.9 * (event["year"] - timeline_start) / timeline_length
-    
-    # Determine if event is above or below timeline
-    if timeline_events.index(event) % 2 == 0:
-        y_text = 0.65  # Adjust to connect to the text box
-        ax_timeline.plot([x_pos, x_pos], [0.5, y_text], '--', color='#30363d', 
-                        linewidth=0.5, alpha=0.7, zorder=2)
-    else:
-        y_text = 0.35  # Adjust to connect to the text box
-        ax_timeline.plot([x_pos, x_pos], [0.5, y_text], '--', color='#30363d', 
-                        linewidth=0.5, alpha=0.7, zorder=2)
-
-# Add a smaller watermark
-watermark = ax_main.text(0.5, 0.5, "CHESS ELO", fontsize=60, color='#161b22',
-                        ha='center', va='center', alpha=0.1, zorder=1,
-                        fontweight='bold', rotation=30)
-
-# Add metadata and credits
-fig.text(0.01, 0.01, "Created with matplotlib • Data source: FIDE and historical records • © 2025",
-        fontsize=8, color='#8b949e', ha='left')
-
-# Adjust layout with more space between elements
-plt.tight_layout()
-fig.subplots_adjust(hspace=0.6, wspace=0.2)
-plt.savefig('chess_grandmasters_github_style_detailed.png', dpi=120, bbox_inches='tight', 
-           facecolor='#0d1117', pad_inches=0.3)
-plt.show()
+
+# Figure, grid layout and axes of the chart, keyed main, legend, info and timeline
+def _new_chart_figure(figsize, show=False):
+    import matplotlib.gridspec as gridspec
+    
+    # Create figure with subplots (adjusted for better text spacing)
+    fig = _new_figure(figsize, show=show)
+    gs = gridspec.GridSpec(3, 2, figure=fig, height_ratios=[5, 1.5, 1.5], width_ratios=[4, 1])
+    
+    # Main heatmap plot
+    axes = {
+        'main': fig.add_subplot(gs[0, 0], label='main'),
+        'legend': fig.add_subplot(gs[0, 1], label='legend'),
+        'info': fig.add_subplot(gs[1, :], label='info'),
+        'timeline': fig.add_subplot(gs[2, :], label='timeline'),
+    }
+    return fig, gs, axes
+
+
+def _draw_credits(fig):
+    # Add metadata and credits
+    fig.text(0.01, 0.01, "Created with matplotlib • Data source: FIDE and historical records • © 2025",
+             fontsize=8, color='#8b949e', ha='left')
+
+
+# Remove everything drawn on an axes but keep its axis objects: recreating the tick
+# artists (as cla() would) is one of the most expensive steps of styling the main axes
+def _clear_drawn_artists(ax):
+    for artist in [*ax.collections, *ax.patches, *ax.lines, *ax.texts, *ax.images, *ax.artists]:
+        artist.remove()
+    ax.containers.clear()
+
+
+# Deterministic layout.
+#
+# With the 'layout': 'fixed' option the panels are not placed by tight_layout() and then
+# cropped by a tight bbox, which together cost extra full draws of every artist. Instead
+# their rectangles are computed once, up front, from the figure size, constant margins
+# and text extents measured with TextToPath (no renderer, no draw). The chart is then saved
+# at its exact figure size, so it is drawn once. The widest player label sets the left
+# margin, and the rest is split like the grid of the tight layout (5 : 1.5 : 1.5 rows, a
+# 4 : 1 main/legend split). The limits of the side and bottom panels are pinned, so their
+# contents stay inside their axes. This also keeps the legend inside the figure; a tight
+# save lets it spill far to the right.
+
+FIXED_MARGIN = 0.3  # Inches around the chart, like the pad of a tight save
+FIXED_GAP = 0.35  # Inches between panels
+PANEL_LIMITS = {
+    'legend': ((0, 1), (-0.9, 1)),  # Room for the statistics below the indicators
+    'info': ((0, 1), (0, 1)),
+    'categories': ((0, 1), (0, 1)),
+    'history': ((0, 1), (0, 1)),
+    'timeline': ((0, 1), (0, 1)),
+}
+
+
+# (width, height) in inches of a line of chart text, from its glyph outlines
+def _text_extent(text, size, weight='normal'):
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.textpath import TextToPath
+    
+    font = FontProperties(family=CHART_STYLE['font.family'], size=size, weight=weight)
+    width, height, descent = TextToPath().get_text_width_height_descent(text, font, ismath=False)
+    # Leave a little room for hinting, which widens rendered text by a few percent. Lines
+    # take at least 1.2 em, as in matplotlib's own text layout.
+    return width * 1.05 / 72, max(height + descent, 1.2 * size) / 72
+
+
+# Figure-fraction rectangles [left, bottom, width, height] of every panel for a figure of
+# `figsize` inches whose main axes carry the given y tick labels
+def fixed_layout(figsize, labels):
+    width, height = figsize
+    point = 1 / 72
+    label_width = max([_text_extent(label, 8, 'bold')[0] for label in labels] or [0])
+    left = FIXED_MARGIN + label_width + 7 * point  # Tick length and pad
+    title = _text_extent('Chess Grandmasters ELO Rating Progression', 14, 'bold')[1] + 15 * point
+    x_axis = 7 * point + _text_extent('0123456789', 9)[1] + 8 * point + _text_extent('Age', 10, 'bold')[1]
+    panel_title = _text_extent('Timeline of Chess History', 12, 'bold')[1] + 6 * point
+    credits = 0.01 * height + _text_extent('Created with matplotlib', 8)[1]
+    
+    top = height - FIXED_MARGIN - title
+    bottom = max(credits, FIXED_MARGIN) + FIXED_GAP
+    unit = (top - bottom - x_axis - 2 * (FIXED_GAP + panel_title)) / 8
+    main_bottom = top - 5 * unit
+    info_top = main_bottom - x_axis - FIXED_GAP - panel_title
+    timeline_top = info_top - 1.5 * unit - FIXED_GAP - panel_title
+    
+    right = width - FIXED_MARGIN
+    legend_width = (right - left - FIXED_GAP) / 5
+    legend_left = right - legend_width
+    half = (right - left - FIXED_GAP) / 2
+    inches = {
+        'main': (left, main_bottom, legend_left - FIXED_GAP - left, 5 * unit),
+        'legend': (legend_left, main_bottom, legend_width, 5 * unit),
+        'info': (left, info_top - 1.5 * unit, right - left, 1.5 * unit),
+        'categories': (left, info_top - 1.5 * unit, half, 1.5 * unit),
+        'history': (right - half, info_top - 1.5 * unit, half, 1.5 * unit),
+        'timeline': (left, timeline_top - 1.5 * unit, right - left, 1.5 * unit),
+    }
+    return {name: [x / width, y / height, w / width, h / height] for name, (x, y, w, h) in inches.items()}
+
+
+# Place every panel of a drawn chart at its fixed_layout() rectangle and pin panel limits
+def apply_fixed_layout(fig, axes):
+    labels = [label.get_text() for label in axes['main'].get_yticklabels()]
+    for name, rect in fixed_layout(fig.get_size_inches(), labels).items():
+        axes[name].set_position(rect)
+        if name in PANEL_LIMITS:
+            axes[name].set_xlim(*PANEL_LIMITS[name][0])
+            axes[name].set_ylim(*PANEL_LIMITS[name][1])
+
+
+# Pre-rendered static panels.
+#
+# With the 'static_panels': 'cached' option, the panels that do not depend on the roster
+# (legend, info title, categories, history and timeline) are still created, so tight_layout
+# sees them exactly as usual. After layout, each of them is replaced by an RGBA image of
+# itself before saving. The only exceptions are the data-dependent legend statistics, which
+# stay live. The images are kept in an in-process LRU keyed by the panel, its size in
+# pixels, the dpi and a digest of the data and style it is drawn from. Later charts with
+# the same panel sizes composite the image instead of drawing hundreds of path-effect
+# texts twice per savefig. Layout margins are snapped to PANEL_SNAP so charts whose labels
+# differ slightly still share panel sizes.
+
+STATIC_PANELS = ('legend', 'info', 'categories', 'history', 'timeline')
+PANEL_CACHE_ENTRIES = 40  # Eight layouts of five panels
+PANEL_SNAP = 0.01  # Figure fraction
+
+_panel_cache = OrderedDict()
+_panel_digest = None
+_panel_image_class = None
+
+
+# Digest of everything the static panels are drawn from
+def _static_panels_digest():
+    global _panel_digest
+    if _panel_digest is None:
+        import matplotlib
+        
+        payload = repr((rating_categories, historical_notes, timeline_events, enhanced_colors,
+                        CHART_STYLE, min_rating, max_rating, matplotlib.__version__))
+        _panel_digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return _panel_digest
+
+
+# Round the subplot margins inwards to a multiple of PANEL_SNAP
+def _snap_layout(fig):
+    params = fig.subplotpars
+    snap = lambda value, rounding: rounding(round(value / PANEL_SNAP, 6)) * PANEL_SNAP
+    fig.subplots_adjust(left=snap(params.left, math.ceil), bottom=snap(params.bottom, math.ceil),
+                        right=snap(params.right, math.floor), top=snap(params.top, math.floor))
+
+
+# Draw one axes alone (without the `keep` artists) at `dpi`, cropped to its tight bbox,
+# which may reach past the figure edges like the rest of a bbox_inches='tight' save.
+# Returns the RGBA pixels and their extent in axes coordinates.
+def _capture_panel(fig, ax, keep, dpi):
+    import io
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.transforms import Bbox
+    from PIL import Image
+    
+    others = [fig.patch, *fig.texts, *fig.artists, *fig.images, *keep,
+              *(other for other in fig.axes if other is not ax)]
+    hidden = [artist for artist in others if artist.get_visible()]
+    original_dpi, original_canvas = fig.dpi, fig.canvas
+    for artist in hidden:
+        artist.set_visible(False)
+    try:
+        fig.dpi = dpi
+        # Text extents are only settled once the figure has been drawn, as savefig does
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        bbox = ax.get_tightbbox(canvas.get_renderer())
+        x0, y0 = math.floor(bbox.x0), math.floor(bbox.y0)
+        x1, y1 = math.ceil(bbox.x1), math.ceil(bbox.y1)
+        extent = ax.transAxes.inverted().transform([(x0, y0), (x1, y1)])
+        
+        output = io.BytesIO()
+        fig.savefig(output, format='png', dpi=dpi, bbox_inches=Bbox([[x0 / dpi, y0 / dpi], [x1 / dpi, y1 / dpi]]),
+                    pad_inches=0, transparent=True)
+        rgba = np.asarray(Image.open(output).convert('RGBA'))
+    finally:
+        for artist in hidden:
+            artist.set_visible(True)
+        fig.dpi = original_dpi
+        fig.set_canvas(original_canvas)
+    return rgba, extent
+
+
+# Artist blitting a cached panel image at its place in the figure. Unlike matplotlib's
+# image artists it never resamples, since the image was captured at the output size.
+def _panel_image(rgba, ax, extent):
+    global _panel_image_class
+    if _panel_image_class is None:
+        from matplotlib.artist import Artist
+        from matplotlib.transforms import Bbox, TransformedBbox
+        
+        class PanelImage(Artist):
+            def __init__(self, rgba, ax, extent):
+                super().__init__()
+                self.rgba = rgba
+                self.bbox = TransformedBbox(Bbox(extent), ax.transAxes)
+            
+            def get_window_extent(self, renderer=None):
+                return self.bbox
+            
+            def draw(self, renderer):
+                if not self.get_visible():
+                    return
+                gc = renderer.new_gc()
+                # Renderers expect the rows bottom-up
+                renderer.draw_image(gc, round(self.bbox.x0), round(self.bbox.y0), self.rgba[::-1])
+                gc.restore()
+        
+        _panel_image_class = PanelImage
+    return _panel_image_class(rgba, ax, extent)
+
+
+# Replace the static panels of a laid-out chart by their cached images (capturing them on
+# a miss). `keep` lists live artists of the panels that must not be baked in.
+# Returns the changes so undo_static_panels() can restore the drawn panels.
+def composite_static_panels(fig, axes, keep=(), dpi=DEFAULT_OPTIONS['dpi']):
+    changes = []
+    digest = _static_panels_digest()
+    width, height = fig.get_size_inches() * dpi
+    for name in STATIC_PANELS:
+        ax = axes[name]
+        position = ax.get_position()
+        key = (name, dpi, round(position.width * width), round(position.height * height), digest)
+        entry = _panel_cache.get(key)
+        if entry is None:
+            entry = _panel_cache[key] = _capture_panel(fig, ax, keep, dpi)
+            if len(_panel_cache) > PANEL_CACHE_ENTRIES:
+                _panel_cache.popitem(last=False)
+        _panel_cache.move_to_end(key)
+        
+        rgba, extent = entry
+        live = [artist for artist in keep if artist.axes is ax]
+        hidden = [ax] if not live else [child for child in ax.get_children()
+                                         if child.get_visible() and child not in live]
+        for artist in hidden:
+            artist.set_visible(False)
+        image = fig.add_artist(_panel_image(rgba, ax, extent))
+        changes.append((image, hidden))
+    return changes
+
+
+def undo_static_panels(changes):
+    for image, hidden in changes:
+        image.remove()
+        for artist in hidden:
+            artist.set_visible(True)
+
+
+def clear_panel_cache():
+    _panel_cache.clear()
+
+
+# A reusable chart figure whose static panels (categories, history, timeline and credits)
+# are already drawn. Passed to render_chart(), only the main grid and the legend are
+# redrawn, so long-running callers skip building the figure and the static panels.
+# A template must only be used by one render at a time.
+def build_chart_template(figsize=DEFAULT_OPTIONS['figsize']):
+    import matplotlib.style
+    
+    with matplotlib.style.context(['dark_background', CHART_STYLE]):
+        fig, gs, axes = _new_chart_figure(figsize)
+        axes['categories'], axes['history'] = draw_info_panel(fig, gs[1, :], axes['info'])
+        draw_timeline_panel(axes['timeline'])
+        _draw_credits(fig)
+    # tight_layout() starts from the current subplot parameters, so every render resets them
+    params = fig.subplotpars
+    subplot_params = {name: getattr(params, name) for name in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')}
+    return {'figure': fig, 'axes': axes, 'figsize': tuple(figsize), 'subplot_params': subplot_params,
+            'composited': []}
+
+
+# Save a rendered chart. `format` is needed for file objects without a name, and
+# `pil_kwargs` is passed to Pillow for raster formats (e.g. {'compress_level': 1}).
+def save_chart(fig, output, dpi=DEFAULT_OPTIONS['dpi'], format=None, pil_kwargs=None, tight=True):
+    kwargs = {} if pil_kwargs is None else {'pil_kwargs': pil_kwargs}
+    if tight:
+        kwargs.update(bbox_inches='tight', pad_inches=0.3)
+    fig.savefig(output, dpi=dpi, format=format, facecolor='#0d1117', **kwargs)
+
+
+# The charted players' columns of a precomputed calendar matrix (possibly built for a larger
+# roster), cut to the whole years their careers span, as build_calendar_matrix would
+def _calendar_rows(rating_matrix, data, birth_years=None):
+    from calendar_index import align_to_calendar
+    
+    if np.array_equal(rating_matrix.index, all_ages):
+        raise ValueError("The 'calendar' axis needs a calendar rating matrix, not one indexed by age")
+    rows, dates, _ = align_to_calendar(data, birth_years)
+    aligned = set(np.unique(rows).tolist())
+    missing = [player for row, player in enumerate(data) if row not in aligned]
+    if missing:
+        raise ValueError(f"No birth year for: {', '.join(missing)}")
+    return rating_matrix.loc[np.floor(dates.min()):np.ceil(dates.max()), list(data)]
+
+
+# Render the full chart for a roster and save it to `output` (skipped when None).
+# A precomputed `rating_matrix` (as returned by build_rating_matrix, or by
+# calendar_index.build_calendar_matrix with the 'calendar' axis) may be passed to skip
+# interpolation; it must contain a column for every charted player.
+# A `template` from build_chart_template() is reused instead of building a new figure;
+# its figsize takes precedence over the 'figsize' option.
+# Returns the matplotlib Figure so callers can save it in other formats as well.
+def render_chart(data=None, output=DEFAULT_OUTPUT, options=None, rating_matrix=None, template=None):
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    instrument = options['instrument']
+    if options['axis'] not in CHART_AXES:
+        raise ValueError(f"Unknown axis {options['axis']!r}, expected one of {', '.join(CHART_AXES)}")
+    if options['row_order'] not in ROW_ORDERS:
+        raise ValueError(f"Unknown row order {options['row_order']!r}, expected one of {', '.join(ROW_ORDERS)}")
+    if options['layout'] not in LAYOUTS:
+        raise ValueError(f"Unknown layout {options['layout']!r}, expected one of {', '.join(LAYOUTS)}")
+    fixed = options['layout'] == 'fixed'
+    if options['stats_panel'] not in STATS_PANELS:
+        raise ValueError(f"Unknown stats panel {options['stats_panel']!r}, "
+                         f"expected one of {', '.join(STATS_PANELS)}")
+    calendar = options['axis'] == 'calendar'
+    if template is not None and options['show']:
+        raise ValueError("Figure templates cannot be shown interactively")
+    
+    with _stage(instrument, 'data'):
+        data = select_players(players_data if data is None else data, options['players'])
+    
+    import matplotlib.style
+    
+    with matplotlib.style.context(['dark_background', CHART_STYLE]):
+        with _stage(instrument, 'figure'):
+            if template is None:
+                fig, gs, axes = _new_chart_figure(options['figsize'], show=options['show'])
+            else:
+                fig, axes = template['figure'], template['axes']
+                undo_static_panels(template['composited'])
+                template['composited'] = []
+                fig.subplots_adjust(**template['subplot_params'])
+                _clear_drawn_artists(axes['main'])
+                axes['legend'].cla()
+            ax_main, ax_legend = axes['main'], axes['legend']
+        
+        with _stage(instrument, 'interpolation'):
+            # Create a more detailed pandas DataFrame with interpolated data points
+            if calendar and rating_matrix is not None:
+                df = _calendar_rows(rating_matrix, data, options['birth_years'])
+            elif calendar:
+                from calendar_index import build_calendar_matrix
+                df = build_calendar_matrix(data, options['birth_years'])
+            elif rating_matrix is None:
+                df = build_rating_matrix(data, all_ages, cache=options['cache'])
+            else:
+                df = rating_matrix[list(data)]
+        
+        if options['row_order'] != 'roster':
+            with _stage(instrument, 'row_order'):
+                from trajectory_similarity import similarity_order
+                ages = build_rating_matrix(data, all_ages, cache=options['cache']) if calendar else df
+                order = similarity_order(ages, data, options['row_order'])
+                data = select_players(data, order)
+                df = df[order]
+        
+        if options['export'] is not None:
+            with _stage(instrument, 'export'):
+                from calendar_index import birth_year_map
+                from rating_export import export_matrix
+                export_matrix(df, options['export'], options['axis'], birth_year_map(data, options['birth_years']))
+        
+        with _stage(instrument, 'colormap'):
+            github_cmap = get_github_cmap()
+            norm = get_rating_norm()
+        
+        with _stage(instrument, 'grid'):
+            draw_rating_grid(ax_main, df, github_cmap, norm, mode=options['render_mode'])
+        with _stage(instrument, 'markers'):
+            event_index = None
+            if calendar:
+                from calendar_index import birth_year_map
+                event_index = build_event_index(df.columns, calendar=True,
+                                                births=birth_year_map(data, options['birth_years']))
+            draw_event_markers(ax_main, df, event_index)
+        with _stage(instrument, 'main_axes'):
+            style_main_axes(ax_main, df, data, calendar=calendar)
+        with _stage(instrument, 'legend'):
+            live_texts = draw_legend_panel(ax_legend, df, github_cmap, calendar=calendar)
+            if options['stats_panel'] == 'career':
+                from career_stats import compute_career_stats
+                stats = compute_career_stats(df, None if calendar else data)
+                live_texts.append(draw_career_stats(ax_legend, stats, 'year' if calendar else 'age'))
+        if template is None:
+            with _stage(instrument, 'info'):
+                axes['categories'], axes['history'] = draw_info_panel(fig, gs[1, :], axes['info'])
+            with _stage(instrument, 'timeline'):
+                draw_timeline_panel(axes['timeline'])
+            _draw_credits(fig)
+        
+        with _stage(instrument, 'layout'):
+            if fixed:
+                apply_fixed_layout(fig, axes)
+            else:
+                # Adjust layout with more space between elements
+                fig.tight_layout()
+                fig.subplots_adjust(hspace=0.6, wspace=0.2)
+        if options['static_panels'] == 'cached':
+            with _stage(instrument, 'panels'):
+                if not fixed:
+                    _snap_layout(fig)
+                panel_dpi = options['dpi']
+                if options['targets']:
+                    # Panels are cached at the resolution of the sharpest target
+                    from chart_outputs import master_dpi, parse_target
+                    panel_dpi = master_dpi([parse_target(target) for target in options['targets']], panel_dpi)
+                changes = composite_static_panels(fig, axes, live_texts, panel_dpi)
+                if template is not None:
+                    template['composited'] = changes
+        if options['targets']:
+            with _stage(instrument, 'savefig'):
+                from chart_outputs import save_targets
+                save_targets(fig, ([output] if output is not None else []) + list(options['targets']),
+                             options['dpi'], compress_level=options['compress_level'], tight=not fixed)
+        elif output is not None:
+            with _stage(instrument, 'savefig'):
+                save_chart(fig, output, options['dpi'], tight=not fixed)
+        if instrument is not None:
+            instrument.count_artists(fig)
+        
+        if options['show']:
+            plt = _pyplot()
+            plt.show()
+            # Release pyplot's reference so long-lived callers don't accumulate figures
+            plt.close(fig)
+    
+    return fig
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m chess_elo_chart',
+        description='Render a GitHub-style chart of chess players\' ELO progression.')
+    parser.add_argument('input', nargs='?',
+                        help='JSON file mapping player names to [[age, rating], ...] '
+                             '(defaults to the built-in roster)')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f'output image path (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_OPTIONS['dpi'],
+                        help='output resolution (default: %(default)s)')
+    parser.add_argument('--players', nargs='+', metavar='NAME',
+                        help='only chart these players, in this order')
+    parser.add_argument('--render-mode', choices=RENDER_MODES, default=DEFAULT_OPTIONS['render_mode'],
+                        help='engine used to draw the rating grid (default: %(default)s)')
+    parser.add_argument('--axis', choices=CHART_AXES, default=DEFAULT_OPTIONS['axis'],
+                        help='chart ratings against age or calendar year (default: %(default)s)')
+    parser.add_argument('--birth-years', metavar='JSON',
+                        help='JSON file mapping player names to birth years, for the calendar axis')
+    parser.add_argument('--stats-panel', choices=STATS_PANELS, default=DEFAULT_OPTIONS['stats_panel'],
+                        help='statistics shown in the legend panel (default: %(default)s)')
+    parser.add_argument('--export', metavar='PATH',
+                        help='also export the rating matrix to a .parquet, .arrow or .csv file')
+    parser.add_argument('--target', action='append', default=[], metavar='PATH[@SIZE]',
+                        help='also write this file from the same draw; SIZE is a dpi, a scale like 2x '
+                             'or a width like 480w (repeatable; .png, .webp, .jpg, .svg, .pdf)')
+    parser.add_argument('--compress-level', type=int, choices=range(10), metavar='0-9',
+                        help='PNG zlib compression level of the targets (default: Pillow\'s)')
+    parser.add_argument('--row-order', choices=ROW_ORDERS, default=DEFAULT_OPTIONS['row_order'],
+                        help='keep the roster order, or group similar careers by this distance (default: %(default)s)')
+    parser.add_argument('--layout', choices=LAYOUTS, default=DEFAULT_OPTIONS['layout'],
+                        help='fit the panels with tight_layout, or place them up front and draw once (default: %(default)s)')
+    parser.add_argument('--show', action='store_true',
+                        help='open an interactive window after saving')
+    parser.add_argument('--cache-dir',
+                        help='directory of the interpolated grid cache (disabled when omitted)')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='print cache statistics after rendering')
+    parser.add_argument('--profile-report', metavar='JSON',
+                        help='write per-stage timings and artist counts to this file')
+    parser.add_argument('--profile-stage', action='append', default=[], metavar='STAGE',
+                        help='also run cProfile over this stage (repeatable)')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='record memory allocations per stage (slower)')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    instrument = None
+    if args.profile_report or args.profile_stage or args.trace_allocations:
+        from instrumentation import Instrumentation
+        instrument = Instrumentation(trace_allocations=args.trace_allocations,
+                                     profile_stages=args.profile_stage)
+    
+    try:
+        try:
+            data = None
+            if args.input:
+                with _stage(instrument, 'load'):
+                    data = load_players_data(args.input)
+            cache = None
+            if args.cache_dir:
+                from rating_cache import GridCache
+                cache = GridCache(args.cache_dir)
+            options = {
+                'players': args.players,
+                'dpi': args.dpi,
+                'render_mode': args.render_mode,
+                'show': args.show,
+                'cache': cache,
+                'instrument': instrument,
+                'axis': args.axis,
+                'stats_panel': args.stats_panel,
+                'export': args.export,
+                'targets': args.target,
+                'compress_level': args.compress_level,
+                'layout': args.layout,
+                'row_order': args.row_order,
+            }
+            if args.birth_years:
+                with open(args.birth_years, encoding='utf-8') as f:
+                    options['birth_years'] = json.load(f)
+            render_chart(data, args.output, options)
+        except OSError as e:
+            print(f"error: {e.filename}: {e.strerror}", file=sys.stderr)
+            return 2
+        except (KeyError, ValueError, ImportError) as e:
+            print(f"error: {e.args[0]}", file=sys.stderr)
+            return 2
+    finally:
+        # Stop tracing and keep the report of the stages that ran, even when one failed
+        if instrument is not None:
+            instrument.close()
+            if args.profile_report:
+                instrument.write_json(args.profile_report)
+    print(f"Saved chart to {args.output}")
+    if cache is not None and args.cache_stats:
+        print(cache.report())
+    
+    if instrument is not None:
+        for record in instrument.stages:
+            print(f"  {record['stage']:<14} {record['seconds']:8.3f}s")
+            if 'profile' in record:
+                print(record['profile'])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import argparse
+import json
+import re
+import sys
+import time
+
+import numpy as np
+
+from fide_ingest import RatingStore
+
+# Elo rating engine computing rating histories from raw game results.
+#
+# Games are streamed from PGN files (only the Date/White/Black/Result tags are read) or from
+# a compact CSV with white,black,result,date columns, in chunks of bounded size. Ratings are
+# updated once per rating period, as FIDE does: every game of a period is scored against
+# the ratings at the start of that period, and all updates are applied together with NumPy
+# (np.bincount over player ids) instead of one game at a time. Only the games of the period
+# being collected are buffered, so memory stays bounded for any corpus size as long as the
+# games arrive in chronological order.
+#
+# After each period the new rating of every player who played is appended to a RatingStore,
+# from which to_players_data() produces the (age, rating) series used by the chart.
+
+CSV_CHUNK_ROWS = 250_000
+PGN_CHUNK_BYTES = 16 * 1024 * 1024
+
+# K-factor rules as used by FIDE: 40 for the first 30 games, 20 below 2400, and 10 for
+# players who have ever reached 2400
+FIDE_K_RULES = {
+    'new_player_games': 30,
+    'new_player_k': 40,
+    'default_k': 20,
+    'elite_rating': 2400,
+    'elite_k': 10,
+}
+
+RESULT_SCORES = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5, '1': 1.0, '0': 0.0, '0.5': 0.5}
+
+
+# K-factor of each player from a rules dict like FIDE_K_RULES, or a constant when given a number
+def k_factors(rules, ratings, games, peaks):
+    if not isinstance(rules, dict):
+        return np.full(len(ratings), float(rules))
+    k = np.full(len(ratings), float(rules['default_k']))
+    k[peaks >= rules['elite_rating']] = rules['elite_k']
+    k[games < rules['new_player_games']] = rules['new_player_k']
+    return k
+
+
+class EloEngine:
+    def __init__(self, k_rules=FIDE_K_RULES, initial_rating=1500, period_months=1, birth_years=None):
+        self.k_rules = k_rules
+        self.initial_rating = initial_rating
+        self.period_months = period_months
+        self.birth_years = {} if birth_years is None else dict(birth_years)
+
+        self.player_ids = {}
+        self._ratings = np.empty(0)
+        self._games = np.empty(0, dtype=np.int64)
+        self._peaks = np.empty(0)
+        self._birth = np.empty(0, dtype=np.uint16)
+
+        self.history = RatingStore()
+        self.games_processed = 0
+        self.late_games = 0  # Games older than the period being collected when they arrived
+        self.periods_processed = 0
+
+        self._period = None
+        self._pending = []
+
+    @property
+    def ratings(self):
+        names = list(self.player_ids)
+        return dict(zip(names, self._ratings[:len(names)].tolist()))
+
+    # Global ids for an array of names; new players start at the initial rating
+    def _ids(self, names):
+        import pandas as pd
+
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        new_players = []
+        for k, name in enumerate(uniques):
+            player_id = self.player_ids.get(name)
+            if player_id is None:
+                player_id = self.player_ids[name] = len(self.player_ids)
+                new_players.append((player_id, name))
+            lookup[k] = player_id
+
+        count = len(self.player_ids)
+        if count > len(self._ratings):
+            grow = max(count, 2 * len(self._ratings)) - len(self._ratings)
+            self._ratings = np.concatenate([self._ratings, np.full(grow, float(self.initial_rating))])
+            self._games = np.concatenate([self._games, np.zeros(grow, dtype=np.int64)])
+            self._peaks = np.concatenate([self._peaks, np.full(grow, float(self.initial_rating))])
+            self._birth = np.concatenate([self._birth, np.zeros(grow, dtype=np.uint16)])
+        for player_id, name in new_players:
+            self._birth[player_id] = self.birth_years.get(name, 0)
+        return lookup[codes]
+
+    # Feed a chunk of games. `scores` are white's scores (1, 0.5, 0) and `periods` month
+    # indexes (year * 12 + month - 1); games should arrive in chronological order.
+    def add_games(self, white, black, scores, periods):
+        if not len(white):
+            return
+        white = self._ids(white)
+        black = self._ids(black)
+        scores = np.asarray(scores, dtype=np.float64)
+        periods = np.asarray(periods, dtype=np.int64) // self.period_months * self.period_months
+
+        order = np.argsort(periods, kind='stable')
+        white, black, scores, periods = white[order], black[order], scores[order], periods[order]
+        boundaries = np.flatnonzero(np.diff(periods)) + 1
+        for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(periods)]):
+            period = int(periods[start])
+            if self._period is not None and period < self._period:
+                self.late_games += stop - start
+                period = self._period
+            if self._period is not None and period > self._period:
+                self._flush()
+            self._period = period
+            self._pending.append((white[start:stop], black[start:stop], scores[start:stop]))
+
+    # Apply every pending game of the current period in one batched update
+    def _flush(self):
+        if not self._pending:
+            return
+        white = np.concatenate([games[0] for games in self._pending])
+        black = np.concatenate([games[1] for games in self._pending])
+        scores = np.concatenate([games[2] for games in self._pending])
+        self._pending = []
+
+        count = len(self.player_ids)
+        ratings = self._ratings[:count]
+        k = k_factors(self.k_rules, ratings, self._games[:count], self._peaks[:count])
+
+        expected = 1.0 / (1.0 + 10.0 ** ((ratings[black] - ratings[white]) / 400.0))
+        delta = np.bincount(white, k[white] * (scores - expected), minlength=count)
+        delta -= np.bincount(black, k[black] * (scores - expected), minlength=count)
+        ratings += delta
+
+        played = np.bincount(white, minlength=count) + np.bincount(black, minlength=count)
+        self._games[:count] += played
+        np.maximum(self._peaks[:count], ratings, out=self._peaks[:count])
+
+        # Record the rating at the end of the period for everyone who played in it
+        active = np.flatnonzero(played)
+        last_month = self._period + self.period_months - 1
+        period = (last_month // 12) * 100 + last_month % 12 + 1
+        self.history.append(active, self._birth[active], period,
+                            np.clip(np.round(ratings[active]), 0, np.iinfo(np.uint16).max))
+        self.games_processed += len(white)
+        self.periods_processed += 1
+
+    def finish(self):
+        self._flush()
+        self._period = None
+
+    # {name: [(age, rating), ...]} for the given players (all when None) that have a birth year
+    def to_players_data(self, players=None, min_points=4):
+        self.history.names = {player_id: name for name, player_id in self.player_ids.items()}
+        ids = None if players is None else [self.player_ids[name] for name in players if name in self.player_ids]
+        return self.history.to_players_data(ids, min_points=min_points)
+
+
+# White's score and the month index of every game, dropping unfinished or undated games
+def _decode_games(white, black, results, dates):
+    import pandas as pd
+
+    results = pd.Series(results, dtype=object).astype(str).str.strip()
+    scores = results.map(RESULT_SCORES).to_numpy(dtype=np.float64)
+    dates = pd.Series(dates, dtype=object).astype(str)
+    years = pd.to_numeric(dates.str.slice(0, 4), errors='coerce').to_numpy(dtype=np.float64)
+    months = pd.to_numeric(dates.str.slice(5, 7), errors='coerce').fillna(1).to_numpy(dtype=np.float64)
+    months = np.clip(months, 1, 12)
+
+    keep = ~np.isnan(scores) & ~np.isnan(years)
+    periods = (years[keep] * 12 + months[keep] - 1).astype(np.int64)
+    return (np.asarray(white, dtype=object)[keep], np.asarray(black, dtype=object)[keep],
+            scores[keep], periods)
+
+
+# Chunks of (white, black, scores, periods) from a CSV with white,black,result,date columns
+def iter_csv_games(path, chunk_rows=CSV_CHUNK_ROWS):
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, usecols=['white', 'black', 'result', 'date'],
+                             dtype=str, chunksize=chunk_rows, keep_default_na=False):
+        yield _decode_games(chunk['white'].to_numpy(), chunk['black'].to_numpy(),
+                            chunk['result'].to_numpy(), chunk['date'].to_numpy())
+
+
+_PGN_TAG = re.compile(rb'\[(Event|Date|White|Black|Result)\s+"([^"]*)"\]')
+
+
+# Games of a block of PGN text as (white, black, scores, periods)
+def _parse_pgn_block(block):
+    columns = {b'Date': [], b'White': [], b'Black': [], b'Result': []}
+    game = {}
+    # Every game starts with its Event tag; games missing one of the other tags are skipped
+    for match in _PGN_TAG.finditer(block + b'[Event ""]'):
+        tag, value = match.group(1), match.group(2)
+        if tag != b'Event':
+            game[tag] = value
+            continue
+        if len(game) == len(columns):
+            for key, text in game.items():
+                columns[key].append(text.decode('utf-8', 'replace'))
+        game = {}
+    return _decode_games(columns[b'White'], columns[b'Black'], columns[b'Result'], columns[b'Date'])
+
+
+# Chunks of (white, black, scores, periods) from a PGN file; move text is skipped unread
+def iter_pgn_games(path, chunk_bytes=PGN_CHUNK_BYTES):
+    tail = b''
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                if tail:
+                    yield _parse_pgn_block(tail)
+                return
+            data = tail + data
+            # Cut before the last game header so every game is parsed in one piece
+            cut = data.rfind(b'[Event ')
+            if cut <= 0:
+                tail = data
+                continue
+            block, tail = data[:cut], data[cut:]
+            yield _parse_pgn_block(block)
+
+
+# Run the engine over PGN and/or CSV files (picked by extension)
+def rate_games(paths, engine=None):
+    engine = EloEngine() if engine is None else engine
+    for path in paths:
+        chunks = iter_pgn_games(path) if path.lower().endswith('.pgn') else iter_csv_games(path)
+        for white, black, scores, periods in chunks:
+            engine.add_games(white, black, scores, periods)
+    engine.finish()
+    return engine
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m elo_engine',
+        description='Compute Elo rating histories from game results (PGN or white,black,result,date CSV).')
+    parser.add_argument('games', nargs='+', help='PGN or CSV files, in chronological order')
+    parser.add_argument('-o', '--output', help='write a chess_elo_chart roster (JSON) here')
+    parser.add_argument('--players', nargs='+', metavar='NAME', help='players to export (default: all)')
+    parser.add_argument('--birth-years', help='JSON file mapping player names to birth years')
+    parser.add_argument('--period-months', type=int, default=1,
+                        help='length of a rating period in months (default: %(default)s)')
+    parser.add_argument('--k', type=float, help='constant K-factor instead of the FIDE rules')
+    parser.add_argument('--initial-rating', type=float, default=1500,
+                        help='rating of players in their first game (default: %(default)s)')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    import chess_elo_chart
+
+    birth_years = dict(chess_elo_chart.birth_years)
+    if args.birth_years:
+        with open(args.birth_years, encoding='utf-8') as f:
+            birth_years.update(json.load(f))
+    engine = EloEngine(k_rules=FIDE_K_RULES if args.k is None else args.k,
+                       initial_rating=args.initial_rating, period_months=args.period_months,
+                       birth_years=birth_years)
+
+    started = time.perf_counter()
+    rate_games(args.games, engine)
+    elapsed = time.perf_counter() - started
+    print(f"Rated {engine.games_processed:,} games of {len(engine.player_ids):,} players over "
+          f"{engine.periods_processed:,} periods in {elapsed:.2f}s "
+          f"({engine.games_processed / max(elapsed, 1e-9):,.0f} games/s)")
+    if engine.late_games:
+        print(f"warning: {engine.late_games:,} games arrived after their rating period "
+              f"and were rated in a later one", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(engine.to_players_data(args.players), f)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
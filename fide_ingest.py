@@ -0,0 +1,396 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+# Streaming loader for the official monthly FIDE rating lists.
+#
+# Both the fixed-width TXT lists (e.g. standard_oct25frl.txt, MAR11FRL.TXT) and the XML
+# lists (e.g. standard_oct25frl_xml.xml) are read in byte chunks and parsed with NumPy:
+# every chunk becomes one uint8 buffer, the fields are gathered for all of its rows at
+# once and the digits are decoded column by column, so there is no per-row Python work.
+# Only player id, birth year, period and rating are kept, appended to a RatingStore of
+# compact typed arrays that can be saved to disk and memory-mapped back.
+
+CHUNK_BYTES = 16 * 1024 * 1024
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+# Header names used for the columns we keep, across the different eras of the TXT format
+TXT_ID_HEADERS = ('ID_Number', 'ID_NUMBER', 'ID_NO', 'ID')
+TXT_BIRTH_HEADERS = ('B-day', 'BORN', 'Bday', 'BIRTHDAY')
+TXT_RATING_HEADERS = ('SRtng', 'RTNG', 'RATING', 'Rating')
+TXT_NAME_HEADERS = ('Name', 'NAME')
+
+# Two-digit years at or above this are 19xx, below it 20xx
+YEAR_PIVOT = 70
+
+_PERIOD_PATTERN = re.compile(r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(\d{2})(?:frl)?', re.IGNORECASE)
+
+
+# Period of a list as an int32 YYYYMM value, parsed from a name such as "oct25" or "MAR11FRL"
+def parse_period(text):
+    match = _PERIOD_PATTERN.search(os.path.basename(text))
+    if match is None:
+        return None
+    month = MONTHS.index(match.group(1).lower()) + 1
+    year = int(match.group(2))
+    year += 1900 if year >= YEAR_PIVOT else 2000
+    return year * 100 + month
+
+
+def period_to_year(period):
+    period = np.asarray(period)
+    return period // 100 + (period % 100 - 1) / 12
+
+
+# Compact columnar store of (player id, birth year, period, rating) rows.
+# Columns are preallocated NumPy arrays that grow geometrically on append.
+class RatingStore:
+    COLUMNS = {
+        'player_id': np.int32,
+        'birth_year': np.uint16,
+        'period': np.int32,
+        'rating': np.uint16,
+    }
+
+    def __init__(self, capacity=1 << 16):
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self._size = 0
+        self.names = {}  # Player id -> name, filled only when ingesting with keep_names
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        return self._columns[name][:self._size]
+
+    @property
+    def nbytes(self):
+        return sum(self[name].nbytes for name in self.COLUMNS)
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._columns['player_id'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def append(self, player_id, birth_year, period, rating):
+        player_id = np.asarray(player_id)
+        count = len(player_id)
+        self._reserve(count)
+        stop = self._size + count
+        self._columns['player_id'][self._size:stop] = player_id
+        self._columns['birth_year'][self._size:stop] = birth_year
+        self._columns['period'][self._size:stop] = period
+        self._columns['rating'][self._size:stop] = rating
+        self._size = stop
+
+    # One .npy file per column plus the known names, loadable with memory mapping
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.COLUMNS:
+            np.save(os.path.join(directory, f'{name}.npy'), self[name])
+        with open(os.path.join(directory, 'names.json'), 'w', encoding='utf-8') as f:
+            json.dump({str(player_id): name for player_id, name in self.names.items()}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        store = cls(capacity=1)
+        for name in cls.COLUMNS:
+            store._columns[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+        store._size = len(store._columns['player_id'])
+        names_path = os.path.join(directory, 'names.json')
+        if os.path.exists(names_path):
+            with open(names_path, encoding='utf-8') as f:
+                store.names = {int(player_id): name for player_id, name in json.load(f).items()}
+        return store
+
+    # Convert the stored history of the given players (all players when None) into the
+    # {name: [(age, rating), ...]} roster used by the chart. Rows without a birth year
+    # are skipped, repeated periods keep the last value, and players with fewer than
+    # `min_points` entries are dropped since the cubic interpolation needs four.
+    def to_players_data(self, player_ids=None, min_points=4):
+        ids = self['player_id']
+        mask = (self['birth_year'] > 0) & (self['rating'] > 0)
+        if player_ids is not None:
+            mask &= np.isin(ids, np.asarray(player_ids, dtype=np.int32))
+        rows = np.flatnonzero(mask)
+
+        ids = ids[rows]
+        periods = self['period'][rows]
+        order = np.lexsort((periods, ids))
+        ids = ids[order]
+        periods = periods[order]
+        rows = rows[order]
+
+        # Keep the last row of each (player, period) pair
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = (ids[1:] != ids[:-1]) | (periods[1:] != periods[:-1])
+        ids, periods, rows = ids[last], periods[last], rows[last]
+
+        ages = np.round(period_to_year(periods) - self['birth_year'][rows], 4)
+        ratings = self['rating'][rows]
+
+        boundaries = np.flatnonzero(np.diff(ids)) + 1
+        data = {}
+        for player_ages, player_ratings, player_id in zip(np.split(ages, boundaries),
+                                                          np.split(ratings, boundaries),
+                                                          ids[np.r_[0, boundaries]] if len(ids) else []):
+            if len(player_ages) < min_points:
+                continue
+            name = self.names.get(int(player_id), str(player_id))
+            data[name] = list(zip(player_ages.tolist(), player_ratings.tolist()))
+        return data
+
+
+# Read a binary file in chunks of whole records, cutting each chunk after the last delimiter
+def _iter_chunks(f, chunk_bytes, delimiter=b'\n'):
+    tail = b''
+    while True:
+        data = f.read(chunk_bytes)
+        if not data:
+            if tail.strip():
+                yield tail
+            return
+        data = tail + data
+        cut = data.rfind(delimiter)
+        if cut < 0:
+            tail = data
+            continue
+        cut += len(delimiter)
+        tail = data[cut:]
+        yield data[:cut]
+
+
+# Start offset and length (without the line break) of every line in a chunk
+def _line_bounds(buf):
+    ends = np.flatnonzero(buf == 10)
+    if len(buf) and buf[-1] != 10:
+        ends = np.append(ends, len(buf))
+    starts = np.empty_like(ends)
+    if len(ends):
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+    carriage_return = (lengths > 0) & (buf[np.maximum(ends - 1, 0)] == 13)
+    return starts, lengths - carriage_return
+
+
+# Characters [start, stop) of every line as a (rows x width) uint8 block, space padded
+def _field(buf, starts, lengths, start, stop):
+    offsets = np.arange(start, stop)
+    index = np.minimum(starts[:, None] + offsets, len(buf) - 1)
+    return np.where(offsets < lengths[:, None], buf[index], 32).astype(np.uint8)
+
+
+# Decode the first run of ASCII digits in each row of a uint8 block (0 when there is none)
+def _parse_digits(chars):
+    values = np.zeros(len(chars), dtype=np.int64)
+    started = np.zeros(len(chars), dtype=bool)
+    stopped = np.zeros(len(chars), dtype=bool)
+    for k in range(chars.shape[1]):
+        digit = chars[:, k] - np.uint8(48)
+        is_digit = digit < 10
+        take = is_digit & ~stopped
+        values = np.where(take, values * 10 + digit, values)
+        stopped |= started & ~is_digit
+        started |= take
+    return values
+
+
+# Column spans of a TXT list, derived from the positions of the header names
+def _txt_columns(header):
+    header = header.replace('ID Number', 'ID_Number')
+    spans = {}
+    tokens = [(m.group(), m.start()) for m in re.finditer(r'\S+', header)]
+    for k, (token, start) in enumerate(tokens):
+        stop = tokens[k + 1][1] if k + 1 < len(tokens) else start + 16
+        spans[token] = (start, stop)
+    return spans
+
+
+def _find_column(spans, candidates, what):
+    for name in candidates:
+        if name in spans:
+            return spans[name]
+    raise ValueError(f"Could not find the {what} column in the rating list header")
+
+
+# Stream a fixed-width TXT rating list into the store.
+# `rating_column` picks the header of the rating to load; by default the monthly column
+# of a standard list (e.g. "OCT25") or the standard rating of a combined list.
+def ingest_txt(path, store, period=None, rating_column=None, keep_names=False, chunk_bytes=CHUNK_BYTES):
+    rows = 0
+    with open(path, 'rb') as f:
+        header = f.readline().decode('latin-1').rstrip('\r\n')
+        spans = _txt_columns(header)
+
+        if rating_column is None:
+            rating_column = next((name for name in spans if _PERIOD_PATTERN.fullmatch(name)), None)
+        if period is None:
+            period = parse_period(rating_column or '') or parse_period(path)
+        if period is None:
+            raise ValueError(f"Could not determine the rating period of {path}; pass period=YYYYMM")
+
+        id_span = _find_column(spans, TXT_ID_HEADERS, 'player id')
+        birth_span = _find_column(spans, TXT_BIRTH_HEADERS, 'birth year')
+        rating_span = spans[rating_column] if rating_column else _find_column(spans, TXT_RATING_HEADERS, 'rating')
+        name_span = _find_column(spans, TXT_NAME_HEADERS, 'name') if keep_names else None
+
+        for chunk in _iter_chunks(f, chunk_bytes):
+            buf = np.frombuffer(chunk, dtype=np.uint8)
+            starts, lengths = _line_bounds(buf)
+
+            ids = _parse_digits(_field(buf, starts, lengths, *id_span))
+            ratings = _parse_digits(_field(buf, starts, lengths, *rating_span))
+            births = _parse_digits(_field(buf, starts, lengths, *birth_span))
+
+            keep = (ids > 0) & (ratings > 0)
+            store.append(ids[keep], births[keep], period, ratings[keep])
+            rows += int(keep.sum())
+
+            if keep_names:
+                for row in np.flatnonzero(keep):
+                    player_id = int(ids[row])
+                    if player_id not in store.names:
+                        start = starts[row] + name_span[0]
+                        stop = starts[row] + min(name_span[1], lengths[row])
+                        store.names[player_id] = chunk[start:stop].decode('utf-8', 'replace').strip()
+    return rows
+
+
+# Record number and text of every <tag>...</tag> in a chunk of `count` </player>-terminated
+# records, each holding the tag at most once. When every record has it, one scan gives the
+# values in record order. Otherwise each tag is placed by its offset among the record
+# ends, so a record without the tag (or with an empty <tag/>) is simply not listed.
+def _xml_values(chunk, tag, count):
+    pattern = rb'<' + tag + rb'>([^<]*)</' + tag + rb'>'
+    values = re.findall(pattern, chunk)
+    if len(values) == count:
+        return np.arange(count), values
+    matches = list(re.finditer(pattern, chunk))
+    ends = np.fromiter((m.end() for m in re.finditer(b'</player>', chunk)), dtype=np.int64, count=count)
+    records = np.searchsorted(ends, np.fromiter((m.start() for m in matches), dtype=np.int64, count=len(matches)))
+    inside = np.flatnonzero(records < count)  # Tags after the last </player> belong to no record
+    return records[inside], [matches[k].group(1) for k in inside]
+
+
+# Text of <tag> in every record of a chunk as a (records x width) uint8 block, NUL padded
+# and blank for records without it
+def _xml_field(chunk, tag, count, width=16):
+    records, values = _xml_values(chunk, tag, count)
+    chars = np.array(values, dtype=f'S{width}').view(np.uint8).reshape(len(values), width)
+    if len(values) == count:
+        return chars
+    block = np.zeros((count, width), dtype=np.uint8)
+    block[records] = chars
+    return block
+
+
+# Stream an XML rating list into the store.
+# Records are cut at </player> boundaries and each field is extracted for the whole chunk
+# with one regular-expression scan, so the document is never built as a tree. Like blank
+# columns of a TXT list, missing or empty fields read as 0 (unknown birth year, unrated).
+def ingest_xml(path, store, period=None, rating_tag='rating', keep_names=False, chunk_bytes=CHUNK_BYTES):
+    if period is None:
+        period = parse_period(path)
+    if period is None:
+        raise ValueError(f"Could not determine the rating period of {path}; pass period=YYYYMM")
+
+    rows = 0
+    rating_tag = rating_tag.encode('ascii')
+    with open(path, 'rb') as f:
+        for chunk in _iter_chunks(f, chunk_bytes, delimiter=b'</player>'):
+            count = chunk.count(b'</player>')
+            ids = _parse_digits(_xml_field(chunk, b'fideid', count))
+            ratings = _parse_digits(_xml_field(chunk, rating_tag, count))
+            births = _parse_digits(_xml_field(chunk, b'birthday', count))
+
+            keep = (ids > 0) & (ratings > 0)
+            store.append(ids[keep], births[keep], period, ratings[keep])
+            rows += int(keep.sum())
+
+            if keep_names:
+                records, values = _xml_values(chunk, b'name', count)
+                names = dict(zip(records.tolist(), values))
+                for row in np.flatnonzero(keep):
+                    player_id = int(ids[row])
+                    if player_id not in store.names and row in names:
+                        store.names[player_id] = names[row].decode('utf-8', 'replace').strip()
+    return rows
+
+
+# Ingest any number of TXT/XML lists (picked by extension) into one store
+def ingest_fide_lists(paths, store=None, keep_names=False, chunk_bytes=CHUNK_BYTES):
+    store = RatingStore() if store is None else store
+    for path in paths:
+        if path.lower().endswith('.xml'):
+            ingest_xml(path, store, keep_names=keep_names, chunk_bytes=chunk_bytes)
+        else:
+            ingest_txt(path, store, keep_names=keep_names, chunk_bytes=chunk_bytes)
+    return store
+
+
+# Peak resident set size of this process in MiB
+def peak_rss_mib():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m fide_ingest',
+        description='Stream FIDE rating lists into a compact columnar store.')
+    parser.add_argument('lists', nargs='+', help='TXT or XML rating list files')
+    parser.add_argument('--store', help='directory to save the store to (appends to an existing store)')
+    parser.add_argument('--names', action='store_true', help='also keep player names')
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // (1024 * 1024),
+                        help='read chunk size in MiB (default: %(default)s)')
+    parser.add_argument('--export', metavar='JSON',
+                        help='write the players given by --ids as a chess_elo_chart roster')
+    parser.add_argument('--ids', nargs='+', type=int, metavar='FIDE_ID',
+                        help='players to export (default: all)')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    store = None
+    if args.store and os.path.exists(os.path.join(args.store, 'player_id.npy')):
+        loaded = RatingStore.load(args.store, mmap_mode=None)
+        store = RatingStore(capacity=max(len(loaded), 1))
+        store.append(loaded['player_id'], loaded['birth_year'], loaded['period'], loaded['rating'])
+        store.names = loaded.names
+
+    rows_before = len(store) if store is not None else 0
+    started = time.perf_counter()
+    store = ingest_fide_lists(args.lists, store, keep_names=args.names,
+                              chunk_bytes=args.chunk_mb * 1024 * 1024)
+    elapsed = time.perf_counter() - started
+    rows = len(store) - rows_before
+    print(f"Ingested {rows:,} rows from {len(args.lists)} list(s) in {elapsed:.2f}s "
+          f"({rows / max(elapsed, 1e-9):,.0f} rows/s, peak RSS {peak_rss_mib():.0f} MiB, "
+          f"store {store.nbytes / (1024 * 1024):.1f} MiB)")
+
+    if args.store:
+        store.save(args.store)
+    if args.export:
+        with open(args.export, 'w', encoding='utf-8') as f:
+            json.dump(store.to_players_data(args.ids), f)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Opt-in instrumentation of the render pipeline.
+#
+# Pass an Instrumentation as the 'instrument' option of render_chart() and every stage of
+# the pipeline (data, interpolation, colormap, grid, markers, legend, info, timeline,
+# layout, savefig...) is recorded with its wall time, optionally its memory allocations
+# (tracemalloc) and a cProfile summary. Artist counts per axes are taken when the figure
+# is finished. Records are handed to an optional callback as they complete, and the whole
+# run can be exported as a JSON report.
+
+PROFILE_TOP = 25
+
+
+class Instrumentation:
+    def __init__(self, trace_allocations=False, profile_stages=(), callback=None):
+        self.trace_allocations = trace_allocations
+        self.profile_stages = set(profile_stages)
+        self.callback = callback
+        self.stages = []
+        self.artists = {}
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        record = {'stage': name}
+        profiler = cProfile.Profile() if name in self.profile_stages else None
+
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            allocated_before = tracemalloc.get_traced_memory()[0]
+
+        started = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['seconds'] = time.perf_counter() - started
+
+            if self.trace_allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                record['allocated_bytes'] = current - allocated_before
+                record['peak_bytes'] = peak - allocated_before
+
+            if profiler is not None:
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP)
+                record['profile'] = output.getvalue()
+
+            self.stages.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    # Number of artists in each axes of a figure: direct children and the full artist tree
+    def count_artists(self, fig):
+        for index, ax in enumerate(fig.axes):
+            label = ax.get_label() or f'axes{index}'
+            self.artists[label] = {
+                'children': len(ax.get_children()),
+                'total': sum(1 for _ in ax.findobj()),
+            }
+        return self.artists
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    # Seconds per stage, with repeated stages added up
+    def totals(self):
+        totals = {}
+        for record in self.stages:
+            totals[record['stage']] = totals.get(record['stage'], 0.0) + record['seconds']
+        return totals
+
+    def report(self):
+        return {
+            'total_seconds': sum(record['seconds'] for record in self.stages),
+            'stages': self.stages,
+            'artists': self.artists,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import sys
+from collections.abc import Mapping
+from itertools import chain
+
+import numpy as np
+
+# Compact, array-backed store of player series for very large rosters.
+#
+# Instead of a dict of Python lists of (age, rating) tuples (well over 100 bytes per
+# point), every series lives in two flat typed arrays shared by all players: ages in
+# months (uint16) and ratings (uint16), indexed CSR-style by an offsets array so player i
+# owns points offsets[i]:offsets[i + 1]. That is 4 bytes per point plus 8 per player.
+#
+# The store is a read-only Mapping of name -> PlayerSeries, a small __slots__ view that
+# iterates as (age, rating) tuples and converts to an (n, 2) array without copying per
+# point. It can therefore be passed anywhere the chart expects a roster
+# (select_players, build_rating_matrix, render_chart). Stores are saved as .npy files and
+# memory-mapped back, so a worker only pages in the series it charts.
+#
+# Ages are kept to the month and ratings to the point. Birth years are optional per-player
+# metadata (0 when unknown), used to place series on a calendar axis.
+
+MONTHS_PER_YEAR = 12
+MAX_AGE_MONTHS = np.iinfo(np.uint16).max
+MAX_RATING = np.iinfo(np.uint16).max
+
+
+class PlayerSeries:
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def name(self):
+        return self._store.names[self._index]
+
+    def _bounds(self):
+        offsets = self._store.offsets
+        return int(offsets[self._index]), int(offsets[self._index + 1])
+
+    # Ages in years as float64
+    @property
+    def ages(self):
+        start, stop = self._bounds()
+        return self._store.age_months[start:stop] / MONTHS_PER_YEAR
+
+    # Ratings as a uint16 view of the store
+    @property
+    def ratings(self):
+        start, stop = self._bounds()
+        return self._store.ratings[start:stop]
+
+    @property
+    def peak(self):
+        return int(self.ratings.max())
+
+    # Birth year, or None when unknown
+    @property
+    def birth_year(self):
+        return int(self._store.birth_years[self._index]) or None
+
+    def __len__(self):
+        start, stop = self._bounds()
+        return stop - start
+
+    def __iter__(self):
+        return zip(self.ages.tolist(), self.ratings.tolist())
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return list(zip(self.ages[k].tolist(), self.ratings[k].tolist()))
+        return self.ages[k].item(), self.ratings[k].item()
+
+    # (n, 2) array of (age, rating) rows, as np.asarray(list_of_tuples) would give
+    def __array__(self, dtype=None, copy=None):
+        return np.column_stack([self.ages, self.ratings]).astype(dtype or np.float64, copy=False)
+
+    def __repr__(self):
+        return f'PlayerSeries({self.name!r}, {len(self)} points)'
+
+
+class PlayerStore(Mapping):
+    def __init__(self, capacity=1 << 16):
+        self.age_months = np.empty(capacity, dtype=np.uint16)
+        self.ratings = np.empty(capacity, dtype=np.uint16)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.birth_years = np.zeros(0, dtype=np.uint16)
+        self.names = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, name):
+        return PlayerSeries(self, self._index[name])
+
+    @property
+    def points(self):
+        return int(self.offsets[-1])
+
+    @property
+    def nbytes(self):
+        return self.points * (self.age_months.itemsize + self.ratings.itemsize) + self.offsets.nbytes
+
+    def _reserve(self, extra):
+        needed = self.points + extra
+        capacity = len(self.age_months)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)  # Amortised doubling, from any capacity (even 0)
+        for name in ('age_months', 'ratings'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.points] = column[:self.points]
+            setattr(self, name, grown)
+
+    # Append many players at once: `lengths` points each, taken in order from the flat
+    # `ages` (years) and `ratings` arrays, with optional birth years (0 = unknown)
+    def append_arrays(self, names, lengths, ages, ratings, birth_years=None):
+        names = list(names)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        duplicates = [name for name in names if name in self._index]
+        if duplicates or len(set(names)) != len(names):
+            raise ValueError(f"Players already in the store: {', '.join(duplicates) or 'repeated names'}")
+        if len(lengths) != len(names) or lengths.sum() != len(ages) or len(ages) != len(ratings):
+            raise ValueError("Names, lengths, ages and ratings do not line up")
+
+        months = np.round(np.asarray(ages, dtype=np.float64) * MONTHS_PER_YEAR)
+        ratings = np.round(np.asarray(ratings, dtype=np.float64))
+        if len(months) and (months.min() < 0 or months.max() > MAX_AGE_MONTHS
+                            or ratings.min() < 0 or ratings.max() > MAX_RATING):
+            raise ValueError("Ages or ratings out of range for the store")
+
+        start = self.points
+        self._reserve(len(months))
+        self.age_months[start:start + len(months)] = months
+        self.ratings[start:start + len(ratings)] = ratings
+        self.offsets = np.concatenate([self.offsets, start + np.cumsum(lengths)])
+        births = np.zeros(len(names), dtype=np.uint16) if birth_years is None else birth_years
+        self.birth_years = np.concatenate([self.birth_years, np.asarray(births, dtype=np.uint16)])
+        for name in names:
+            self._index[name] = len(self.names)
+            self.names.append(name)
+
+    def append(self, name, series, birth_year=None):
+        series = np.asarray(series, dtype=np.float64).reshape(-1, 2)
+        self.append_arrays([name], [len(series)], series[:, 0], series[:, 1], [birth_year or 0])
+
+    # Store holding a {name: [(age, rating), ...]} roster, with birth years from an
+    # optional {name: year} mapping
+    @classmethod
+    def from_players_data(cls, data, birth_years=None):
+        lengths = np.fromiter((len(series) for series in data.values()), dtype=np.int64, count=len(data))
+        store = cls(capacity=int(lengths.sum()))
+        points = np.fromiter(chain.from_iterable(data.values()), dtype=np.dtype((np.float64, 2)),
+                             count=int(lengths.sum()))
+        births = None
+        if birth_years:
+            births = np.fromiter((birth_years.get(name, 0) for name in data), dtype=np.uint16, count=len(data))
+        store.append_arrays(data.keys(), lengths, points[:, 0], points[:, 1], births)
+        return store
+
+    # Peak rating of every player, in store order, without touching Python objects per point
+    def peaks(self):
+        peaks = np.zeros(len(self), dtype=np.uint16)
+        lengths = np.diff(self.offsets)
+        nonempty = lengths > 0
+        if nonempty.any():
+            peaks[nonempty] = np.maximum.reduceat(self.ratings[:self.points], self.offsets[:-1][nonempty])
+        return peaks
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'age_months.npy'), self.age_months[:self.points])
+        np.save(os.path.join(directory, 'ratings.npy'), self.ratings[:self.points])
+        np.save(os.path.join(directory, 'offsets.npy'), self.offsets)
+        np.save(os.path.join(directory, 'birth_years.npy'), self.birth_years)
+        with open(os.path.join(directory, 'names.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.names, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        store = cls(capacity=1)
+        store.age_months = np.load(os.path.join(directory, 'age_months.npy'), mmap_mode=mmap_mode)
+        store.ratings = np.load(os.path.join(directory, 'ratings.npy'), mmap_mode=mmap_mode)
+        store.offsets = np.load(os.path.join(directory, 'offsets.npy'))
+        with open(os.path.join(directory, 'names.json'), encoding='utf-8') as f:
+            store.names = json.load(f)
+        births_path = os.path.join(directory, 'birth_years.npy')
+        store.birth_years = (np.load(births_path) if os.path.exists(births_path)
+                             else np.zeros(len(store.names), dtype=np.uint16))
+        store._index = {name: index for index, name in enumerate(store.names)}
+        return store
+
+    # True for a directory written by save()
+    @staticmethod
+    def is_store(path):
+        return os.path.isfile(os.path.join(path, 'offsets.npy'))
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m player_store',
+        description='Convert a JSON roster into a compact, memory-mappable player store.')
+    parser.add_argument('input', help='JSON file mapping player names to [[age, rating], ...]')
+    parser.add_argument('output', help='store directory to write')
+    parser.add_argument('--birth-years', help='JSON file mapping player names to birth years')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    import chess_elo_chart
+
+    birth_years = dict(chess_elo_chart.birth_years)
+    if args.birth_years:
+        with open(args.birth_years, encoding='utf-8') as f:
+            birth_years.update(json.load(f))
+    store = PlayerStore.from_players_data(chess_elo_chart.load_players_data(args.input), birth_years)
+    store.save(args.output)
+    print(f"Stored {len(store):,} players and {store.points:,} points "
+          f"({store.nbytes / (1024 * 1024):.1f} MiB) in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
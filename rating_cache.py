@@ -0,0 +1,147 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Persistent, content-addressed cache of interpolated rating grids.
+#
+# Each entry holds one player's interpolated ratings over an age grid, stored as a .npy
+# file named after a SHA-256 of the player's (age, rating) series, the age grid and the
+# interpolation settings. Editing a player only changes that player's key, so unchanged
+# players are memory-mapped straight from disk while the edited ones are recomputed.
+# Entries are evicted least-recently-used first once the cache grows past max_bytes.
+
+# Bump when the interpolation code changes in a way that alters cached values
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class GridCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    # Cache key for a player's series evaluated over `ages` with the given settings
+    def key(self, series, ages, kind='cubic', dtype=np.float64):
+        digest = hashlib.sha256()
+        digest.update(f'v{CACHE_VERSION}|{kind}|{np.dtype(dtype).str}|'.encode('ascii'))
+        digest.update(np.ascontiguousarray(series, dtype=np.float64).tobytes())
+        digest.update(b'|')
+        digest.update(np.ascontiguousarray(ages, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.npy')
+
+    # Cached grid for `key` as a read-only memory map, or None on a miss
+    def get(self, key):
+        path = self._path(key)
+        try:
+            values = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        self.hits += 1
+        return values
+
+    def put(self, key, values):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.ascontiguousarray(values))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._total_bytes += os.path.getsize(path)
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.npy'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    yield path, stat.st_size, stat.st_mtime
+
+    # Remove least recently used entries until the cache fits in max_bytes
+    def evict(self, max_bytes=None):
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def clear(self):
+        self.evict(max_bytes=0)
+
+    def stats(self):
+        entries = list(self._entries())
+        lookups = self.hits + self.misses
+        return {
+            'directory': self.directory,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        return (f"Grid cache {stats['directory']}: {stats['entries']:,} entries, "
+                f"{stats['bytes'] / (1024 * 1024):.1f}/{stats['max_bytes'] / (1024 * 1024):.0f} MiB, "
+                f"{stats['hits']:,} hits, {stats['misses']:,} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']:,} evictions")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m rating_cache',
+        description='Inspect or trim the interpolated rating grid cache.')
+    parser.add_argument('directory', help='cache directory')
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help='size budget in MiB (default: %(default)s)')
+    parser.add_argument('--evict', action='store_true', help='evict entries down to the size budget')
+    parser.add_argument('--clear', action='store_true', help='remove every entry')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    cache = GridCache(args.directory, max_bytes=int(args.max_mb * 1024 * 1024))
+    if args.clear:
+        cache.clear()
+    elif args.evict:
+        cache.evict()
+    print(cache.report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+import chess_elo_chart
+
+# Streaming export of the interpolated rating grid in long format, one row per
+# (player, age or date):
+#
+#   player          dictionary of all player names (int32 codes)
+#   age | date      float32 age, or the first day of the month on the calendar axis
+#   rating          float32
+#   category        dictionary of chess_elo_chart.rating_categories names, null below them
+#   world_champion  bool, inside one of the player's reigns
+#
+# The roster is interpolated a chunk of players at a time, and each chunk is written as
+# one Parquet row group, Arrow IPC record batch or block of CSV lines before the next is
+# built. Memory therefore stays bounded by the chunk rather than the whole roster
+# (hundreds of millions of rows for tens of thousands of players at monthly resolution).
+# Both dictionaries are fixed for the whole file, so every batch shares them.
+#
+# Parquet and Arrow IPC need pyarrow, which is optional; CSV only needs pandas.
+
+EXPORT_FORMATS = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow', '.csv': 'csv'}
+DEFAULT_CHUNK_PLAYERS = 1024  # About 800,000 rows per chunk on the age grid
+
+
+def export_format(path):
+    fmt = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Cannot tell the export format of {path}, expected one of {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet and Arrow IPC export need pyarrow (pip install pyarrow); "
+                          "export to .csv does not") from e
+    return pyarrow
+
+
+# Long-format columns of one (positions x players) chunk, as numpy arrays. `first_code` is
+# the roster index of the chunk's first player and `reigns` its chunk-relative event index.
+def _long_columns(df, first_code, calendar, reigns):
+    values = df.to_numpy(dtype=np.float32)
+    positions = df.index.to_numpy(dtype=np.float64)
+    champion = np.zeros(values.shape, dtype=bool)
+    for row, start, end in zip(reigns['reign_rows'], reigns['reign_starts'], reigns['reign_ends']):
+        champion[(positions >= start) & (positions <= end), row] = True
+
+    position_idx, player_idx = np.nonzero(~np.isnan(values))
+    ratings = values[position_idx, player_idx]
+    bounds = [category['min'] for category in chess_elo_chart.rating_categories]
+    if calendar:
+        months = np.round(positions * 12).astype(np.int64) - 1970 * 12
+        position = months.astype('datetime64[M]').astype('datetime64[D]')[position_idx]
+    else:
+        position = positions.astype(np.float32)[position_idx]
+    return {
+        'player': (player_idx + first_code).astype(np.int32),
+        'position': position,
+        'rating': ratings,
+        'category': (np.digitize(ratings, bounds) - 1).astype(np.int8),
+        'world_champion': champion[position_idx, player_idx],
+    }
+
+
+class _ParquetSink:
+    def __init__(self, path, players, position_name, calendar, compression='zstd'):
+        pa = self.pa = _pyarrow()
+        self.players = pa.array(players, pa.string())
+        self.categories = pa.array([category['name'] for category in chess_elo_chart.rating_categories],
+                                   pa.string())
+        self.position_name = position_name
+        self.schema = pa.schema([
+            ('player', pa.dictionary(pa.int32(), pa.string())),
+            (position_name, pa.date32() if calendar else pa.float32()),
+            ('rating', pa.float32()),
+            ('category', pa.dictionary(pa.int8(), pa.string())),
+            ('world_champion', pa.bool_()),
+        ])
+        self.writer = self._open(path, compression)
+
+    def _open(self, path, compression):
+        return self.pa.parquet.ParquetWriter(path, self.schema, compression=compression)
+
+    def _batch(self, columns):
+        pa = self.pa
+        category = columns['category']
+        return pa.RecordBatch.from_arrays([
+            pa.DictionaryArray.from_arrays(pa.array(columns['player']), self.players),
+            pa.array(columns['position'], self.schema.field(self.position_name).type),
+            pa.array(columns['rating']),
+            pa.DictionaryArray.from_arrays(pa.array(category, mask=category < 0), self.categories),
+            pa.array(columns['world_champion']),
+        ], schema=self.schema)
+
+    def write(self, columns):
+        self.writer.write_batch(self._batch(columns))
+
+    def close(self):
+        self.writer.close()
+
+
+class _ArrowSink(_ParquetSink):
+    def _open(self, path, compression):
+        self.sink = self.pa.OSFile(path, 'wb')
+        options = self.pa.ipc.IpcWriteOptions(compression=compression)
+        return self.pa.ipc.new_file(self.sink, self.schema, options=options)
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+class _CsvSink:
+    def __init__(self, path, players, position_name, calendar, compression=None):  # Uncompressed
+        self.path = path
+        self.players = np.asarray(players, dtype=object)
+        self.categories = np.array([category['name'] for category in chess_elo_chart.rating_categories] + [''],
+                                   dtype=object)
+        self.position_name = position_name
+        self.header = True
+
+    def write(self, columns):
+        import pandas as pd
+
+        frame = pd.DataFrame({
+            'player': self.players[columns['player']],
+            self.position_name: columns['position'],
+            'rating': columns['rating'],
+            'category': self.categories[columns['category']],  # -1 picks the trailing ''
+            'world_champion': columns['world_champion'].astype(np.uint8),
+        })
+        frame.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False,
+                     float_format='%.6g')
+        self.header = False
+
+    def close(self):
+        if self.header:  # Nothing written: header only
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(f'player,{self.position_name},rating,category,world_champion\n')
+
+
+_SINKS = {'parquet': _ParquetSink, 'arrow': _ArrowSink, 'csv': _CsvSink}
+
+
+# Write (first player code, matrix chunk) pairs to `path`; returns the number of rows
+def _write_chunks(path, players, chunks, calendar, births, compression):
+    fmt = export_format(path)
+    sink = _SINKS[fmt](path, players, 'date' if calendar else 'age', calendar, compression)
+    rows = 0
+    try:
+        for first_code, df in chunks:
+            reigns = chess_elo_chart.build_event_index(df.columns, calendar=calendar, births=births)
+            columns = _long_columns(df, first_code, calendar, reigns)
+            sink.write(columns)
+            rows += len(columns['rating'])
+    finally:
+        sink.close()
+    return rows
+
+
+# Stream the rating grid of a whole roster to `path` (.parquet, .arrow/.feather/.ipc or
+# .csv), interpolating `chunk_players` players at a time. axis='calendar' writes dates
+# instead of ages; every player then needs a birth year. Returns the number of rows.
+def export_ratings(data=None, path='ratings.parquet', axis='age', chunk_players=DEFAULT_CHUNK_PLAYERS,
+                   birth_years=None, kind='cubic', cache=None, compression='zstd'):
+    from calendar_index import birth_year_map, build_calendar_matrix
+
+    data = chess_elo_chart.players_data if data is None else data
+    export_format(path)
+    players = list(data)
+    calendar = axis == 'calendar'
+    births = birth_year_map(data, birth_years)
+
+    def chunks():
+        for first in range(0, len(players), chunk_players):
+            chunk = {player: data[player] for player in players[first:first + chunk_players]}
+            if calendar:
+                yield first, build_calendar_matrix(chunk, birth_years, kind=kind, dtype=np.float32)
+            else:
+                yield first, chess_elo_chart.build_rating_matrix(chunk, chess_elo_chart.all_ages, np.float32,
+                                                                 cache=cache, kind=kind)
+
+    return _write_chunks(path, players, chunks(), calendar, births, compression)
+
+
+# Export an already built rating matrix (as used by render_chart), a block of players at a time
+def export_matrix(df, path, axis='age', births=None, chunk_players=DEFAULT_CHUNK_PLAYERS, compression='zstd'):
+    players = list(df.columns)
+    chunks = ((first, df.iloc[:, first:first + chunk_players]) for first in range(0, len(players), chunk_players))
+    return _write_chunks(path, players, chunks, axis == 'calendar',
+                         chess_elo_chart.birth_years if births is None else births, compression)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m rating_export',
+        description='Export the interpolated rating grid in long format to Parquet, Arrow IPC or CSV.')
+    parser.add_argument('input', nargs='?',
+                        help='JSON roster file or player store (defaults to the built-in roster)')
+    parser.add_argument('-o', '--output', required=True,
+                        help=f"output file; the format follows its extension ({', '.join(EXPORT_FORMATS)})")
+    parser.add_argument('--axis', choices=chess_elo_chart.CHART_AXES, default='age',
+                        help='one row per age or per calendar month (default: %(default)s)')
+    parser.add_argument('--birth-years', help='JSON file mapping player names to birth years')
+    parser.add_argument('--chunk-players', type=int, default=DEFAULT_CHUNK_PLAYERS,
+                        help='players interpolated and written at a time (default: %(default)s)')
+    parser.add_argument('--kind', choices=chess_elo_chart.INTERPOLATION_KINDS, default='cubic',
+                        help='interpolation kind (default: %(default)s)')
+    parser.add_argument('--compression', default='zstd',
+                        help='Parquet/Arrow compression codec, or "none" (default: %(default)s)')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    data = chess_elo_chart.load_players_data(args.input) if args.input else None
+    birth_years = None
+    if args.birth_years:
+        from calendar_index import load_birth_years
+        birth_years = load_birth_years(args.birth_years)
+    cache = None
+    if args.cache_dir:
+        from rating_cache import GridCache
+        cache = GridCache(args.cache_dir)
+
+    try:
+        rows = export_ratings(data, args.output, axis=args.axis, chunk_players=args.chunk_players,
+                              birth_years=birth_years, kind=args.kind, cache=cache,
+                              compression=None if args.compression == 'none' else args.compression)
+    except (ImportError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(f"Wrote {rows:,} rows to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import argparse
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+import chess_elo_chart
+
+# On-demand rating queries at arbitrary ages.
+#
+# Instead of materialising the full (ages x players) grid, each player's interpolant is
+# fitted the first time it is queried and kept in a bounded LRU cache keyed by
+# (player, kind), so repeated point lookups only pay for evaluating the spline. Queries
+# accept scalars or arrays and are evaluated vectorized; ratings_at() answers a batch of
+# (player, age) pairs with one evaluation per distinct player.
+
+DEFAULT_MAX_INTERPOLANTS = 1024
+
+
+class RatingQuery:
+    def __init__(self, data=None, kind='cubic', max_interpolants=DEFAULT_MAX_INTERPOLANTS):
+        if kind not in chess_elo_chart.INTERPOLATION_KINDS:
+            raise ValueError(f"Unknown interpolation kind {kind!r}, "
+                             f"expected one of {', '.join(chess_elo_chart.INTERPOLATION_KINDS)}")
+        self.data = chess_elo_chart.players_data if data is None else data
+        self.kind = kind
+        self.max_interpolants = max_interpolants
+        self.hits = 0
+        self.misses = 0
+        self._interpolants = OrderedDict()
+
+    # Fitted interpolant of a player, from the cache when possible
+    def interpolant(self, player, kind=None):
+        key = (player, kind or self.kind)
+        f = self._interpolants.get(key)
+        if f is not None:
+            self._interpolants.move_to_end(key)
+            self.hits += 1
+            return f
+
+        series = self.data.get(player)
+        if series is None:
+            raise KeyError(f"Unknown players: {player}")
+        f = chess_elo_chart.fit_interpolant(series, key[1])
+        self.misses += 1
+        self._interpolants[key] = f
+        if len(self._interpolants) > self.max_interpolants:
+            self._interpolants.popitem(last=False)
+        return f
+
+    # Rating of `player` at `ages`: a float for a scalar age, an array shaped like `ages` otherwise
+    def rating_at(self, player, ages, kind=None):
+        values = self.interpolant(player, kind)(np.asarray(ages, dtype=np.float64))
+        return float(values) if np.ndim(values) == 0 else values
+
+    # Ratings of many (player, age) pairs at once, evaluating each distinct player's
+    # interpolant once over all of its ages
+    def ratings_at(self, players, ages, kind=None):
+        import pandas as pd
+
+        players = np.asarray(players, dtype=object)
+        ages = np.broadcast_to(np.asarray(ages, dtype=np.float64), players.shape)
+        result = np.empty(players.shape, dtype=np.float64)
+        codes, uniques = pd.factorize(players.ravel())
+        flat_ages, flat_result = ages.ravel(), result.reshape(-1)
+        order = np.argsort(codes, kind='stable')
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                flat_result[group] = self.interpolant(uniques[codes[group[0]]], kind)(flat_ages[group])
+        return result
+
+    # Drop cached interpolants, of one player or of all of them (after editing the data)
+    def invalidate(self, player=None):
+        if player is None:
+            self._interpolants.clear()
+            return
+        for key in [key for key in self._interpolants if key[0] == player]:
+            del self._interpolants[key]
+
+    def stats(self):
+        return {
+            'interpolants': len(self._interpolants),
+            'max_interpolants': self.max_interpolants,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+_default_query = None
+
+
+# Rating of a built-in roster player at `ages`, through a shared module-level RatingQuery
+def rating_at(player, ages, kind='cubic'):
+    global _default_query
+    if _default_query is None:
+        _default_query = RatingQuery()
+    return _default_query.rating_at(player, ages, kind)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m rating_query',
+        description='Print interpolated ratings of a player at the given ages.')
+    parser.add_argument('player', help='player name')
+    parser.add_argument('ages', type=float, nargs='+', help='ages to query')
+    parser.add_argument('--input', help='JSON roster file (defaults to the built-in roster)')
+    parser.add_argument('--kind', choices=chess_elo_chart.INTERPOLATION_KINDS, default='cubic',
+                        help='interpolation kind (default: %(default)s)')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    data = chess_elo_chart.load_players_data(args.input) if args.input else None
+    try:
+        ratings = RatingQuery(data, kind=args.kind).rating_at(args.player, args.ages)
+    except KeyError as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return 2
+    for age, rating in zip(args.ages, ratings):
+        print(f"{age:g}\t{rating:.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
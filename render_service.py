@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import io
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import chess_elo_chart
+
+# Long-running local render service.
+#
+# Everything a cold run pays for on each chart is done once at start-up: the
+# matplotlib/pandas/scipy imports, the colormap, the rating matrix of the whole roster,
+# and a pool of figure templates whose static panels are already drawn (see
+# chess_elo_chart.build_chart_template). A request only redraws the main grid and the
+# legend of a template and saves it, compositing the static panels from cached images
+# by default ('static_panels' option of render_chart). Responses are cached by a hash of the normalised
+# request, so repeated requests are answered without drawing at all.
+#
+# matplotlib is not thread-safe, so drawing is serialised by one lock while cache hits
+# are served concurrently by the threading HTTP server.
+#
+#   GET  /render?players=Magnus+Carlsen&players=Mikhail+Tal&format=svg&dpi=100
+#   POST /render  {"players": [...], "format": "png", "dpi": 120, "render_mode": "auto"}
+#   GET  /stats, GET /health
+#
+# HEAD is answered like GET, with the same headers (ETag, Content-Length) and no body.
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+MAX_DPI = 300
+DEFAULT_CACHE_ENTRIES = 128
+DEFAULT_TEMPLATES = 2
+
+
+class RenderService:
+    def __init__(self, data=None, cache_entries=DEFAULT_CACHE_ENTRIES, templates=DEFAULT_TEMPLATES,
+                 compress_level=None, grid_cache=None, static_panels='cached'):
+        self.data = chess_elo_chart.players_data if data is None else data
+        self.cache_entries = cache_entries
+        self.max_templates = templates
+        self.compress_level = compress_level
+        self.grid_cache = grid_cache
+        self.static_panels = static_panels
+
+        self.hits = 0
+        self.misses = 0
+        self.render_seconds = []
+        self._responses = OrderedDict()
+        self._templates = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._draw_lock = threading.Lock()
+        self.matrix = None
+
+    # Pay every one-off cost up front: imports, colormap, rating matrix, a template and
+    # one throwaway render to fill matplotlib's font caches
+    def warm(self):
+        started = time.perf_counter()
+        self.matrix = chess_elo_chart.build_rating_matrix(self.data, chess_elo_chart.all_ages,
+                                                          cache=self.grid_cache)
+        chess_elo_chart.get_github_cmap()
+        with self._draw_lock:
+            self._draw(self.normalize({}))
+        return time.perf_counter() - started
+
+    # Validated request with every option filled in; raises ValueError or KeyError
+    def normalize(self, request):
+        players = request.get('players') or None
+        if isinstance(players, str):
+            players = [players]
+        if players is not None:
+            chess_elo_chart.select_players(self.data, players)
+
+        fmt = str(request.get('format', 'png')).lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}, expected one of {', '.join(FORMATS)}")
+        render_mode = request.get('render_mode', chess_elo_chart.DEFAULT_OPTIONS['render_mode'])
+        if render_mode not in chess_elo_chart.RENDER_MODES:
+            raise ValueError(f"Unknown render mode {render_mode!r}")
+        dpi = int(request.get('dpi', chess_elo_chart.DEFAULT_OPTIONS['dpi']))
+        if not 10 <= dpi <= MAX_DPI:
+            raise ValueError(f"dpi must be between 10 and {MAX_DPI}")
+        figsize = tuple(float(size) for size in request.get('figsize', chess_elo_chart.DEFAULT_OPTIONS['figsize']))
+        if len(figsize) != 2 or not all(0 < size <= 60 for size in figsize):
+            raise ValueError("figsize must be two sizes in inches, at most 60")
+
+        return {'players': players, 'format': fmt, 'render_mode': render_mode, 'dpi': dpi, 'figsize': figsize}
+
+    @staticmethod
+    def request_key(request):
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _cached(self, key):
+        with self._cache_lock:
+            body = self._responses.get(key)
+            if body is not None:
+                self._responses.move_to_end(key)
+                self.hits += 1
+            return body
+
+    def _template(self, figsize):
+        template = self._templates.get(figsize)
+        if template is None:
+            template = self._templates[figsize] = chess_elo_chart.build_chart_template(figsize)
+            if len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        self._templates.move_to_end(figsize)
+        return template
+
+    def _draw(self, request):
+        options = {'players': request['players'], 'render_mode': request['render_mode'], 'dpi': request['dpi'],
+                   'static_panels': self.static_panels}
+        fig = chess_elo_chart.render_chart(self.data, None, options, rating_matrix=self.matrix,
+                                           template=self._template(request['figsize']))
+        output = io.BytesIO()
+        pil_kwargs = None
+        if request['format'] == 'png' and self.compress_level is not None:
+            pil_kwargs = {'compress_level': self.compress_level}
+        chess_elo_chart.save_chart(fig, output, request['dpi'], format=request['format'], pil_kwargs=pil_kwargs)
+        return output.getvalue()
+
+    # (body, content type, request key, cache hit) for a raw request dict
+    def render(self, request):
+        request = self.normalize(request)
+        key = self.request_key(request)
+        body = self._cached(key)
+        if body is not None:
+            return body, FORMATS[request['format']], key, True
+
+        with self._draw_lock:
+            # Another thread may have rendered the same request while this one waited
+            body = self._cached(key)
+            if body is not None:
+                return body, FORMATS[request['format']], key, True
+            started = time.perf_counter()
+            body = self._draw(request)
+            elapsed = time.perf_counter() - started
+
+        with self._cache_lock:
+            self.misses += 1
+            self.render_seconds.append(elapsed)
+            del self.render_seconds[:-1000]
+            self._responses[key] = body
+            while len(self._responses) > self.cache_entries:
+                self._responses.popitem(last=False)
+        return body, FORMATS[request['format']], key, False
+
+    def stats(self):
+        with self._cache_lock:
+            seconds = sorted(self.render_seconds)
+            cached = len(self._responses)
+        percentile = (lambda q: round(seconds[min(int(q * len(seconds)), len(seconds) - 1)], 4)
+                      if seconds else None)
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'cached_responses': cached,
+            'templates': len(self._templates),
+            'render_p50_seconds': percentile(0.5),
+            'render_p95_seconds': percentile(0.95),
+        }
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    service = None  # Set by make_server
+    quiet = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            return self._send(200, b'ok\n', 'text/plain')
+        if url.path == '/stats':
+            return self._send_json(200, self.service.stats())
+        if url.path == '/render':
+            query = parse_qs(url.query)
+            request = {name: values[0] for name, values in query.items() if name != 'players'}
+            if 'players' in query:
+                request['players'] = query['players']
+            if 'figsize' in request:
+                request['figsize'] = request['figsize'].split(',')
+            return self._render(request)
+        self._send_json(404, {'error': f'Unknown path {url.path}'})
+
+    # Same headers as GET; _send leaves out the body
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/render':
+            return self._send_json(404, {'error': f'Unknown path {self.path}'})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("Expected a JSON object")
+        except ValueError as e:
+            return self._send_json(400, {'error': f'Invalid JSON body: {e}'})
+        self._render(request)
+
+    def _render(self, request):
+        try:
+            body, content_type, key, hit = self.service.render(request)
+        except (KeyError, ValueError, TypeError) as e:
+            return self._send_json(400, {'error': str(e.args[0]) if e.args else str(e)})
+        etag = f'"{key}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, b'', content_type, {'ETag': etag})
+        self._send(200, body, content_type, {'ETag': etag, 'X-Cache': 'hit' if hit else 'miss'})
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode('utf-8') + b'\n', 'application/json')
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(service, host='127.0.0.1', port=8765, quiet=False):
+    handler = type('BoundRenderHandler', (RenderHandler,), {'service': service, 'quiet': quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m render_service',
+        description='Serve rating charts over HTTP from a warm process.')
+    parser.add_argument('input', nargs='?',
+                        help='JSON file mapping player names to [[age, rating], ...] '
+                             '(defaults to the built-in roster)')
+    parser.add_argument('--host', default='127.0.0.1', help='address to bind (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on (default: %(default)s)')
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help='rendered responses kept in memory (default: %(default)s)')
+    parser.add_argument('--templates', type=int, default=DEFAULT_TEMPLATES,
+                        help='figure templates kept warm, one per figure size (default: %(default)s)')
+    parser.add_argument('--compress-level', type=int, choices=range(10), metavar='0-9',
+                        help='PNG zlib compression level; lower is faster but larger (default: Pillow\'s)')
+    parser.add_argument('--static-panels', choices=('cached', 'draw'), default='cached',
+                        help='composite the static panels from cached images or draw them (default: %(default)s)')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not log requests')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    data = chess_elo_chart.load_players_data(args.input) if args.input else None
+    grid_cache = None
+    if args.cache_dir:
+        from rating_cache import GridCache
+        grid_cache = GridCache(args.cache_dir)
+
+    service = RenderService(data, cache_entries=args.cache_entries, templates=args.templates,
+                            compress_level=args.compress_level, grid_cache=grid_cache,
+                            static_panels=args.static_panels)
+    print(f"Warmed up in {service.warm():.2f}s")
+    server = make_server(service, args.host, args.port, quiet=args.quiet)
+    print(f"Serving charts on http://{args.host}:{server.server_address[1]}/render")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+import argparse
+import html
+import json
+import sys
+
+import numpy as np
+
+import chess_elo_chart
+
+# Interactive SVG/HTML output written directly from the rating matrix, without matplotlib.
+#
+# SVG: one <use> of a shared cell symbol per sampled cell, streamed row by row.
+# HTML: a <canvas> painted client-side from the embedded data, which is far smaller for
+# large rosters.
+# Both embed one compact JSON document with the sampled ratings (integers, one array per
+# player), championship reigns and notable events, and a small script that hit-tests the
+# pointer against the grid to show a real hover tooltip. No per-event hidden artists are
+# created, and the whole document is produced in a single pass.
+
+# Cell geometry in pixels, keeping the proportions of the matplotlib chart
+CELL_PX = 5
+GAP_PX = 2
+PITCH_PX = CELL_PX + GAP_PX
+LABEL_CHAR_PX = 7
+TOP_PX = 48
+BOTTOM_PX = 36
+RIGHT_PX = 24
+
+STYLE = ('text{fill:#c9d1d9;font-size:11px}.title{font-size:16px;font-weight:bold}'
+         '.axis{fill:#8b949e;font-size:10px}.crown,.star{fill:gold;font-size:8px;pointer-events:none}'
+         '.tip rect{fill:#161b22;stroke:#30363d}')
+
+# Pointer hit-testing shared by both outputs. `toLocal` maps an event to document
+# coordinates and `showTip` positions the tooltip.
+_HIT_TEST_JS = '''
+var d = JSON.parse(document.getElementById('chart-data').textContent);
+function lookup(x, y) {
+  var col = Math.floor((x - d.left) / d.pitch), row = Math.floor((y - d.top) / d.pitch);
+  if (col < 0 || row < 0 || row >= d.players.length || (x - d.left) % d.pitch > d.cell) return null;
+  var p = d.players[d.players.length - 1 - row], k = col - p.first;
+  if (k < 0 || k >= p.ratings.length || !p.ratings[k]) return null;
+  var age = d.ages[0] + col * d.ages[1], text = p.name + ' - age ' + age.toFixed(1) + ': ' + p.ratings[k];
+  (p.events || []).forEach(function (e) { if (Math.abs(e[0] - age) < d.ages[1] / 2) text += ' - ' + e[1]; });
+  (p.reigns || []).forEach(function (r) { if (age >= r[0] && age <= r[1]) text += ' - World Champion'; });
+  return text;
+}
+'''
+
+_SVG_JS = _HIT_TEST_JS + '''
+var svg = document.documentElement, tip = document.getElementById('tip');
+var tipText = tip.querySelector('text'), tipBox = tip.querySelector('rect');
+svg.addEventListener('mousemove', function (ev) {
+  var pt = svg.createSVGPoint(); pt.x = ev.clientX; pt.y = ev.clientY;
+  pt = pt.matrixTransform(svg.getScreenCTM().inverse());
+  var text = lookup(pt.x, pt.y);
+  if (!text) { tip.setAttribute('visibility', 'hidden'); return; }
+  tipText.textContent = text;
+  var w = tipText.getComputedTextLength() + 12;
+  var x = Math.min(pt.x + 12, d.width - w - 2);
+  tipBox.setAttribute('width', w);
+  tip.setAttribute('transform', 'translate(' + x + ',' + (pt.y - 24) + ')');
+  tip.setAttribute('visibility', 'visible');
+});
+'''
+
+_CANVAS_JS = _HIT_TEST_JS + '''
+var canvas = document.getElementById('grid'), ctx = canvas.getContext('2d');
+var tip = document.getElementById('tip');
+d.players.forEach(function (p, i) {
+  var y = d.top + (d.players.length - 1 - i) * d.pitch;
+  p.ratings.forEach(function (r, k) {
+    if (!r) return;
+    var c = Math.min(Math.max(Math.floor((r - d.min) / (d.max - d.min) * 256), 0), 255);
+    ctx.fillStyle = d.lut[c];
+    ctx.fillRect(d.left + (p.first + k) * d.pitch, y, d.cell, d.cell);
+  });
+});
+canvas.addEventListener('mousemove', function (ev) {
+  var box = canvas.getBoundingClientRect();
+  var text = lookup((ev.clientX - box.left) * canvas.width / box.width,
+                    (ev.clientY - box.top) * canvas.height / box.height);
+  tip.style.display = text ? 'block' : 'none';
+  if (text) { tip.textContent = text; tip.style.left = (ev.pageX + 12) + 'px'; tip.style.top = (ev.pageY - 28) + 'px'; }
+});
+canvas.addEventListener('mouseleave', function () { tip.style.display = 'none'; });
+'''
+
+
+# The chart's 256-entry GitHub colormap as hex strings, built with NumPy alone
+# (the same linear interpolation as LinearSegmentedColormap.from_list)
+def github_lut(n=256):
+    colors = np.array([[int(c[k:k + 2], 16) for k in (1, 3, 5)] for c in chess_elo_chart.enhanced_colors],
+                      dtype=np.float64)
+    positions = np.linspace(0, 1, len(colors))
+    x = np.linspace(0, 1, n)
+    rgb = np.column_stack([np.interp(x, positions, colors[:, channel]) for channel in range(3)])
+    rgb = np.clip(np.round(rgb), 0, 255).astype(int)
+    return [f'#{r:02x}{g:02x}{b:02x}' for r, g, b in rgb]
+
+
+# Colormap index (0-255) of every rating, as matplotlib's Colormap would pick it
+def _lut_index(ratings, n=256):
+    scaled = (ratings - chess_elo_chart.min_rating) / (chess_elo_chart.max_rating - chess_elo_chart.min_rating)
+    return np.clip((scaled * n).astype(int), 0, n - 1)
+
+
+# Everything both writers need: sampled grid, per-player JSON and pixel geometry
+def _prepare(df, data):
+    sampled = df.iloc[::chess_elo_chart.sample_step]
+    ages = sampled.index.to_numpy(dtype=np.float64)
+    values = sampled.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    players = list(df.columns)
+    index = chess_elo_chart.build_event_index(players)
+
+    labels = [f"{player} ({max(rating for _, rating in data[player])})" for player in players]
+    left = 12 + LABEL_CHAR_PX * max((len(label) for label in labels), default=0)
+    width = left + len(ages) * PITCH_PX + RIGHT_PX
+    height = TOP_PX + len(players) * PITCH_PX + BOTTOM_PX
+
+    meta = {
+        'left': left, 'top': TOP_PX, 'pitch': PITCH_PX, 'cell': CELL_PX,
+        'width': width, 'height': height,
+        'ages': [float(ages[0]), float(ages[1] - ages[0]) if len(ages) > 1 else 1.0],
+        'min': chess_elo_chart.min_rating, 'max': chess_elo_chart.max_rating,
+    }
+    return sampled, ages, values, valid, players, index, labels, meta
+
+
+# JSON record of one player: sampled ratings from the first to the last valid cell (0 = empty)
+def _player_record(player, column, values, valid, index, row):
+    cells = np.flatnonzero(valid[:, column])
+    record = {'name': player, 'first': 0, 'ratings': []}
+    if len(cells):
+        first, last = cells[0], cells[-1] + 1
+        ratings = np.where(valid[first:last, column], np.round(values[first:last, column]), 0)
+        record['first'] = int(first)
+        record['ratings'] = ratings.astype(int).tolist()
+    events = [[float(age), text] for r, age, text in zip(index['event_rows'], index['event_ages'],
+                                                          index['event_texts']) if r == row]
+    reigns = [[float(start), float(end)] for r, start, end in zip(index['reign_rows'], index['reign_starts'],
+                                                                  index['reign_ends']) if r == row]
+    if events:
+        record['events'] = events
+    if reigns:
+        record['reigns'] = reigns
+    return record
+
+
+def _json_for_script(obj):
+    # Keep the embedded document from closing its <script> or CDATA section early
+    return json.dumps(obj, separators=(',', ':')).replace('</', '<\\/').replace(']]>', ']]\\u003e')
+
+
+def _axis_markup(ages, meta, n_players):
+    y = meta['top'] + n_players * PITCH_PX + 14
+    parts = []
+    for age in range(int(np.ceil(ages[0])), int(ages[-1]) + 1, 5):
+        x = meta['left'] + (age - ages[0]) / meta['ages'][1] * PITCH_PX + CELL_PX / 2
+        parts.append(f'<text class="axis" x="{x:.1f}" y="{y}" text-anchor="middle">{age}</text>')
+    parts.append(f'<text class="axis" x="{meta["left"]}" y="{y + 16}">Age</text>')
+    return ''.join(parts)
+
+
+def _marker_markup(df, index, meta, n_players):
+    markers = chess_elo_chart.resolve_markers(df, index)
+    parts = []
+    for kind, glyph, xs, ys in (('crown', '♔', markers['crown_x'], markers['crown_y']),
+                                ('star', '★', markers['star_x'], markers['star_y'])):
+        for x, y in zip(xs, ys):
+            row = int(round(y / chess_elo_chart.total_cell_size))
+            px = meta['left'] + (x - meta['ages'][0]) / meta['ages'][1] * PITCH_PX + CELL_PX / 2
+            py = meta['top'] + (n_players - 1 - row) * PITCH_PX + CELL_PX
+            parts.append(f'<text class="{kind}" x="{px:.1f}" y="{py}" text-anchor="middle">{glyph}</text>')
+    return ''.join(parts)
+
+
+# Stream the chart as a standalone SVG document
+def write_svg(df, path, data):
+    sampled, ages, values, valid, players, index, labels, meta = _prepare(df, data)
+    lut = np.array(github_lut())
+    n_players = len(players)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{meta["width"]}" height="{meta["height"]}" '
+                f'viewBox="0 0 {meta["width"]} {meta["height"]}" font-family="monospace">'
+                f'<style>{STYLE}</style>'
+                f'<defs><rect id="c" width="{CELL_PX}" height="{CELL_PX}" rx="1" stroke="#30363d" '
+                f'stroke-width="0.5"/></defs>'
+                f'<rect width="100%" height="100%" fill="#0d1117"/>'
+                f'<text class="title" x="{meta["left"]}" y="28">Chess Grandmasters ELO Rating Progression</text>\n')
+
+        f.write(f'<g transform="translate({meta["left"]},{meta["top"]})">\n')
+        x_positions = [f'{x}' for x in range(0, len(ages) * PITCH_PX, PITCH_PX)]
+        for column in range(n_players):
+            y = (n_players - 1 - column) * PITCH_PX
+            cells = np.flatnonzero(valid[:, column])
+            fills = lut[_lut_index(values[cells, column])]
+            f.write(f'<g transform="translate(0,{y})">')
+            f.write(''.join(f'<use href="#c" x="{x_positions[k]}" fill="{fill}"/>'
+                            for k, fill in zip(cells, fills)))
+            f.write('</g>\n')
+        f.write('</g>\n')
+
+        for column, label in enumerate(labels):
+            y = meta['top'] + (n_players - 1 - column) * PITCH_PX + CELL_PX
+            f.write(f'<text x="{meta["left"] - 8}" y="{y}" text-anchor="end" font-weight="bold" '
+                    f'font-size="{min(11, PITCH_PX + 2)}">{html.escape(label)}</text>')
+        f.write('\n' + _axis_markup(ages, meta, n_players) + _marker_markup(df, index, meta, n_players) + '\n')
+
+        f.write('<g id="tip" class="tip" visibility="hidden" pointer-events="none">'
+                '<rect height="20" rx="3"/><text x="6" y="14"></text></g>\n')
+        _write_data(f, players, values, valid, index, meta, cdata=True)
+        f.write(f'<script><![CDATA[{_SVG_JS}]]></script></svg>\n')
+
+
+# Stream the chart as an HTML page with a canvas painted from the embedded data
+def write_html(df, path, data):
+    sampled, ages, values, valid, players, index, labels, meta = _prepare(df, data)
+    meta = dict(meta, lut=github_lut())
+    n_players = len(players)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html><head><meta charset="utf-8">'
+                '<title>Chess Grandmasters ELO Rating Progression</title>'
+                '<style>body{background:#0d1117;margin:0;font-family:monospace}'
+                '#wrap{position:relative;display:inline-block}#wrap svg,#wrap canvas{position:absolute;left:0;top:0}'
+                '#tip{position:absolute;display:none;background:#161b22;border:1px solid #30363d;'
+                'color:#c9d1d9;font-size:12px;padding:3px 6px;border-radius:3px;pointer-events:none;'
+                'white-space:nowrap}</style></head><body>\n')
+        f.write(f'<div id="wrap" style="width:{meta["width"]}px;height:{meta["height"]}px">'
+                f'<svg xmlns="http://www.w3.org/2000/svg" width="{meta["width"]}" height="{meta["height"]}" '
+                f'font-family="monospace"><style>{STYLE}</style>'
+                f'<text class="title" x="{meta["left"]}" y="28">Chess Grandmasters ELO Rating Progression</text>\n')
+        for column, label in enumerate(labels):
+            y = meta['top'] + (n_players - 1 - column) * PITCH_PX + CELL_PX
+            f.write(f'<text x="{meta["left"] - 8}" y="{y}" text-anchor="end" font-weight="bold" '
+                    f'font-size="{min(11, PITCH_PX + 2)}">{html.escape(label)}</text>')
+        f.write('\n' + _axis_markup(ages, meta, n_players) + _marker_markup(df, index, meta, n_players))
+        f.write(f'</svg><canvas id="grid" width="{meta["width"]}" height="{meta["height"]}"></canvas></div>'
+                '<div id="tip"></div>\n')
+        _write_data(f, players, values, valid, index, meta, cdata=False)
+        f.write(f'<script>{_CANVAS_JS}</script></body></html>\n')
+
+
+# Embedded JSON, written one player at a time
+def _write_data(f, players, values, valid, index, meta, cdata):
+    f.write('<script type="application/json" id="chart-data">')
+    if cdata:
+        f.write('<![CDATA[')
+    f.write(_json_for_script(meta)[:-1] + ',"players":[')
+    for column, player in enumerate(players):
+        if column:
+            f.write(',')
+        f.write(_json_for_script(_player_record(player, column, values, valid, index, column)))
+    f.write(']}')
+    if cdata:
+        f.write(']]>')
+    f.write('</script>\n')
+
+
+# Counterpart of render_chart() for the interactive outputs; the format follows the
+# extension of `output` (.svg or .html)
+def render_interactive(data=None, output='chess_grandmasters_elo_progression.html', options=None,
+                       rating_matrix=None):
+    options = {**chess_elo_chart.DEFAULT_OPTIONS, **(options or {})}
+    data = chess_elo_chart.select_players(chess_elo_chart.players_data if data is None else data,
+                                          options['players'])
+    if rating_matrix is None:
+        df = chess_elo_chart.build_rating_matrix(data, chess_elo_chart.all_ages, cache=options['cache'])
+    else:
+        df = rating_matrix[list(data)]
+
+    if output.lower().endswith('.svg'):
+        write_svg(df, output, data)
+    elif output.lower().endswith(('.html', '.htm')):
+        write_html(df, output, data)
+    else:
+        raise ValueError(f"Unsupported interactive output {output!r}, expected .svg or .html")
+    return output
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m svg_output',
+        description='Write the rating chart as interactive SVG or HTML with hover tooltips.')
+    parser.add_argument('input', nargs='?',
+                        help='JSON file mapping player names to [[age, rating], ...] '
+                             '(defaults to the built-in roster)')
+    parser.add_argument('-o', '--output', default='chess_grandmasters_elo_progression.html',
+                        help='output .svg or .html path (default: %(default)s)')
+    parser.add_argument('--players', nargs='+', metavar='NAME',
+                        help='only chart these players, in this order')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    data = chess_elo_chart.load_players_data(args.input) if args.input else None
+    cache = None
+    if args.cache_dir:
+        from rating_cache import GridCache
+        cache = GridCache(args.cache_dir)
+    try:
+        render_interactive(data, args.output, {'players': args.players, 'cache': cache})
+    except (KeyError, ValueError) as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return 2
+    print(f"Saved chart to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from calendar_index import CalendarIndex, format_month, parse_month
+
+ROSTER = {
+    'Alpha': [(20, 2500), (30, 2700), (40, 2600)],
+    'Beta': [(20, 2400), (30, 2650), (40, 2700)],
+    'Gamma': [(25, 2300), (35, 2500)],
+}
+BIRTH_YEARS = {'Alpha': 1950, 'Beta': 1952, 'Gamma': 1960}
+
+
+@pytest.fixture(scope='module')
+def index():
+    return CalendarIndex(ROSTER, BIRTH_YEARS, kind='linear')
+
+
+def test_parse_and_format_month():
+    assert parse_month('1985-03') == 1985 * 12 + 2
+    assert parse_month('1985') == 1985 * 12
+    assert format_month(parse_month('1985-03')) == '1985-03'
+    with pytest.raises(ValueError):
+        parse_month('1985-13')
+
+
+def test_top_sorts_by_rating_and_skips_unrated(index):
+    top = index.top('1980-01')
+    assert [player for player, _ in top] == ['Alpha', 'Beta']  # Gamma starts in 1985
+    ratings = [rating for _, rating in top]
+    assert ratings == sorted(ratings, reverse=True)
+    assert ratings[0] == pytest.approx(2700, abs=1)  # Alpha at 30
+
+
+def test_top_default_n_on_a_small_roster(index):
+    assert len(index.top('1990-01')) == 3
+
+
+def test_top_beyond_the_built_depth():
+    small = CalendarIndex(ROSTER, BIRTH_YEARS, kind='linear', depth=2)
+    assert len(small.top('1990-01', 2)) == 2
+    with pytest.raises(ValueError):
+        small.top('1990-01', 3)
+
+
+def test_rank_of_matches_top(index):
+    for rank, (player, _) in enumerate(index.top('1990-01'), start=1):
+        assert index.rank_of(player, '1990-01') == rank
+    assert index.rank_of('Gamma', '1980-01') is None
+
+
+def test_matrix_is_nan_outside_careers(index):
+    column = index.players.index('Gamma')
+    assert np.isnan(index.matrix[index.row('1984-01'), column])
+    assert not np.isnan(index.matrix[index.row('1990-01'), column])
+
+
+def test_number_one_spells_cover_every_rated_month(index):
+    months = index.months_at_number_one()
+    assert sum(months.values()) == int(np.count_nonzero(index.active))
+
+
+def test_no_known_birth_year():
+    with pytest.raises(ValueError, match='No birth year for: Nobody'):
+        CalendarIndex({'Nobody': [(20, 2000), (30, 2100)]})
@@ -0,0 +1,44 @@
+import sys
+
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip('matplotlib')
+pytest.importorskip('PIL')
+matplotlib.use('Agg')
+
+import chart_outputs  # noqa: E402
+from chart_outputs import parse_target, save_targets  # noqa: E402
+
+
+@pytest.fixture
+def fig():
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(3, 2))
+    ax.plot([0, 1, 2], [2500, 2700, 2650])
+    ax.set_title('Rating')
+    yield fig
+    plt.close(fig)
+
+
+def test_parse_target_sizes():
+    assert parse_target('chart@2x.png')['scale'] == 2.0
+    assert parse_target('chart.webp@240') == {'path': 'chart.webp', 'dpi': 240, 'scale': None, 'width': None,
+                                              'format': 'WEBP'}
+    assert parse_target('thumb.png@480w')['width'] == 480
+    with pytest.raises(ValueError):
+        parse_target('chart.gif')
+
+
+def test_duplicate_paths_are_rejected(fig, tmp_path):
+    path = str(tmp_path / 'chart.png')
+    with pytest.raises(ValueError, match='Duplicate output paths'):
+        save_targets(fig, [path, path + '@240'])
+
+
+def test_savefig_fallback_matches_the_single_draw(fig, monkeypatch):
+    direct = np.asarray(chart_outputs._rasterise(fig, 100))
+    monkeypatch.setitem(sys.modules, 'matplotlib._tight_bbox', None)
+    fallback = np.asarray(chart_outputs._rasterise(fig, 100))
+    np.testing.assert_array_equal(direct, fallback)
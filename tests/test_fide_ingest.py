@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from fide_ingest import RatingStore, ingest_fide_lists, ingest_txt, ingest_xml, parse_period
+
+TXT_HEADER = 'ID Number      Name                                                         Fed Sex Tit  WTit OTit           FOA OCT25 Gms  K   B-day Flag'
+TXT_ROWS = [
+    (1503014, 'Carlsen, Magnus', 'NOR', 'M', 'GM', '2839', '1990'),
+    (2016192, 'Nakamura, Hikaru', 'USA', 'M', 'GM', '2816', '1987'),
+    (9999999, 'Unrated, Player', 'FID', 'M', '', '', '2001'),
+    (8888888, 'Unknown, Birth', 'FID', 'F', '', '1500', ''),
+]
+
+
+def _txt_line(header, player_id, name, fed, sex, title, rating, birth):
+    line = [' '] * len(header)
+
+    def put(column, text):
+        start = header.index(column)
+        line[start:start + len(text)] = text
+
+    put('ID Number', str(player_id))
+    put('Name', name)
+    put('Fed', fed)
+    put('Sex', sex)
+    put('Tit ', title)
+    put('OCT25', rating)
+    put('B-day', birth)
+    return ''.join(line).rstrip()
+
+
+XML = b'''<playerslist>
+<player><fideid>1503014</fideid><name>Carlsen, Magnus</name><country>NOR</country><rating>2839</rating><birthday>1990</birthday><flag></flag></player>
+<player><fideid>2016192</fideid><name>Nakamura, Hikaru</name><country>USA</country><rating>2816</rating><birthday>1987</birthday><flag>i</flag></player>
+<player><fideid>9999999</fideid><name>Unrated, Player</name><rating>0</rating><birthday>2001</birthday></player>
+<player><fideid>8888888</fideid><name>Unknown, Birth</name><rating>1500</rating><birthday/></player>
+<player><fideid>7777777</fideid><rating>1600</rating><birthday></birthday></player>
+</playerslist>
+'''
+
+
+@pytest.fixture
+def txt_list(tmp_path):
+    path = tmp_path / 'standard_oct25frl.txt'
+    lines = [TXT_HEADER] + [_txt_line(TXT_HEADER, *row) for row in TXT_ROWS]
+    path.write_bytes('\r\n'.join(lines).encode('latin-1') + b'\r\n')
+    return str(path)
+
+
+@pytest.fixture
+def xml_list(tmp_path):
+    path = tmp_path / 'standard_oct25frl_xml.xml'
+    path.write_bytes(XML)
+    return str(path)
+
+
+def test_parse_period():
+    assert parse_period('standard_oct25frl.txt') == 202510
+    assert parse_period('MAR99FRL.TXT') == 199903
+    assert parse_period('ratings.txt') is None
+
+
+def test_ingest_txt(txt_list):
+    store = RatingStore(capacity=0)
+    assert ingest_txt(txt_list, store, keep_names=True) == 3
+    assert store['player_id'].tolist() == [1503014, 2016192, 8888888]
+    assert store['rating'].tolist() == [2839, 2816, 1500]
+    assert store['birth_year'].tolist() == [1990, 1987, 0]
+    assert set(store['period'].tolist()) == {202510}
+    assert store.names[1503014] == 'Carlsen, Magnus'
+
+
+@pytest.mark.parametrize('chunk_bytes', [1 << 20, 64])
+def test_ingest_xml_with_missing_and_empty_fields(xml_list, chunk_bytes):
+    store = RatingStore()
+    assert ingest_xml(xml_list, store, keep_names=True, chunk_bytes=chunk_bytes) == 4
+    assert store['player_id'].tolist() == [1503014, 2016192, 8888888, 7777777]
+    assert store['rating'].tolist() == [2839, 2816, 1500, 1600]
+    assert store['birth_year'].tolist() == [1990, 1987, 0, 0]
+    assert store.names == {1503014: 'Carlsen, Magnus', 2016192: 'Nakamura, Hikaru', 8888888: 'Unknown, Birth'}
+
+
+def test_txt_and_xml_agree_and_round_trip(txt_list, xml_list, tmp_path):
+    store = ingest_fide_lists([txt_list, xml_list], keep_names=True)
+    txt, xml = np.split(store['player_id'], [3])
+    assert txt.tolist() == xml[:3].tolist()
+    store.save(tmp_path / 'store')
+    loaded = RatingStore.load(tmp_path / 'store')
+    np.testing.assert_array_equal(loaded['rating'], store['rating'])
+    assert loaded.names == store.names
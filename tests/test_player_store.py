@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from player_store import PlayerStore
+
+ROSTER = {
+    'Alpha': [(20.0, 2500), (30.5, 2700), (40.25, 2600)],
+    'Beta': [(18.0, 2400)],
+    'Empty': [],
+}
+
+
+def test_round_trip_through_disk(tmp_path):
+    store = PlayerStore.from_players_data(ROSTER, {'Alpha': 1950})
+    store.append('Gamma', [(25, 2300), (35, 2550)], birth_year=1960)
+    store.save(tmp_path / 'store')
+
+    assert PlayerStore.is_store(tmp_path / 'store')
+    loaded = PlayerStore.load(tmp_path / 'store')
+    assert list(loaded) == ['Alpha', 'Beta', 'Empty', 'Gamma']
+    assert list(loaded['Alpha']) == ROSTER['Alpha']
+    assert list(loaded['Empty']) == []
+    assert loaded['Gamma'][1] == (35.0, 2550)
+    assert [loaded[name].birth_year for name in loaded] == [1950, None, None, 1960]
+    np.testing.assert_array_equal(loaded.peaks(), [2700, 2400, 0, 2550])
+
+
+def test_appending_grows_from_any_capacity():
+    store = PlayerStore(capacity=0)
+    for k in range(40):
+        store.append(f'P{k}', [(20 + k, 2000 + k)] * (k % 3 + 1))
+    assert store.points == sum(k % 3 + 1 for k in range(40))
+    assert list(store['P39']) == [(59.0, 2039)]
+    assert PlayerStore.from_players_data({}).points == 0
+
+
+def test_appending_to_a_loaded_store(tmp_path):
+    PlayerStore.from_players_data(ROSTER).save(tmp_path / 'store')
+    store = PlayerStore.load(tmp_path / 'store')
+    store.append('Gamma', [(25, 2300)])
+    assert list(store['Alpha']) == ROSTER['Alpha']
+    assert list(store['Gamma']) == [(25.0, 2300)]
+
+
+def test_rejects_duplicates_and_out_of_range_values():
+    store = PlayerStore.from_players_data(ROSTER)
+    with pytest.raises(ValueError):
+        store.append('Alpha', [(20, 2500)])
+    with pytest.raises(ValueError):
+        store.append('Delta', [(-1, 2500)])
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trajectory_similarity import (
+    distance_matrix, dtw_distances, load_distances, resample_careers, similarity_order,
+)
+
+
+def naive_dtw(a, b, window=None):
+    n, m = len(a), len(b)
+    width = max(window, abs(n - m)) if window is not None else max(n, m)
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0, 0] = 0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            if abs(i - j) <= width:
+                cost[i, j] = (a[i - 1] - b[j - 1]) ** 2 + min(cost[i - 1, j - 1], cost[i - 1, j], cost[i, j - 1])
+    return np.sqrt(cost[n, m] / max(n, m))
+
+
+@pytest.fixture(scope='module')
+def careers():
+    rng = np.random.default_rng(1)
+    lengths = rng.integers(1, 12, size=20)
+    padded = np.zeros((20, 12))
+    for k, length in enumerate(lengths):
+        padded[k, :length] = 2500 + rng.normal(0, 100, size=length).cumsum()
+    return padded, lengths
+
+
+@pytest.mark.parametrize('window', [None, 0, 2])
+def test_dtw_matches_the_naive_recurrence(careers, window):
+    padded, lengths = careers
+    rows, columns = np.triu_indices(len(lengths))
+    distances = dtw_distances(padded[rows], padded[columns], lengths[rows], lengths[columns], window)
+    expected = [naive_dtw(padded[i, :lengths[i]], padded[j, :lengths[j]], window) for i, j in zip(rows, columns)]
+    np.testing.assert_allclose(distances, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize('window', [None, 1])
+def test_dtw_when_every_first_career_is_longer(careers, window):
+    padded, lengths = careers
+    rows, columns = np.flatnonzero(lengths > 4), np.flatnonzero(lengths <= 4)
+    rows, columns = np.repeat(rows, len(columns)), np.tile(columns, len(rows))
+    distances = dtw_distances(padded[rows], padded[columns], lengths[rows], lengths[columns], window)
+    expected = [naive_dtw(padded[i, :lengths[i]], padded[j, :lengths[j]], window) for i, j in zip(rows, columns)]
+    np.testing.assert_allclose(distances, expected, rtol=1e-9)
+
+
+def test_dtw_of_identical_careers_is_zero(careers):
+    padded, lengths = careers
+    np.testing.assert_allclose(dtw_distances(padded, padded, lengths, lengths), 0, atol=1e-9)
+
+
+def test_resample_careers_left_aligns():
+    values = np.array([[np.nan, 1.0], [2.0, 3.0], [4.0, np.nan]])
+    careers, lengths = resample_careers(values, np.array([0.0, 0.5, 1.0]), step=0.5)
+    assert list(lengths) == [2, 2]
+    np.testing.assert_allclose(careers, [[2.0, 4.0], [1.0, 3.0]])
+
+
+@pytest.fixture(scope='module')
+def grid():
+    rng = np.random.default_rng(2)
+    values = 2500 + rng.normal(0, 80, size=(30, 6)).cumsum(axis=0)
+    values[:5, 0] = np.nan
+    values[-8:, 3] = np.nan
+    values[:, 5] = np.nan
+    values[10, 5] = 2600  # A single rated age: too short to compare
+    return pd.DataFrame(values, index=np.arange(30) * 0.5, columns=list('ABCDEF'))
+
+
+def test_euclidean_matches_the_naive_rms(grid):
+    distances = distance_matrix(grid, workers=1, min_overlap=2.0)
+    np.testing.assert_array_equal(np.diag(distances), 0)
+    values = grid.to_numpy()
+    for i in range(values.shape[1]):
+        for j in range(i + 1, values.shape[1]):
+            both = ~np.isnan(values[:, i]) & ~np.isnan(values[:, j])
+            if both.sum() < 4:  # 2 years at half-year steps
+                assert np.isinf(distances[i, j])
+            else:
+                expected = np.sqrt(np.mean((values[both, i] - values[both, j]) ** 2))
+                assert distances[i, j] == pytest.approx(expected, rel=1e-5)
+
+
+def test_blocks_and_pool_match_a_single_block(grid):
+    whole = distance_matrix(grid, metric='dtw', workers=1)
+    blocked = distance_matrix(grid, metric='dtw', block=4, workers=2)
+    np.testing.assert_allclose(blocked, whole, rtol=1e-6)
+    np.testing.assert_allclose(whole, whole.T)
+
+
+def test_saved_distances_are_reused_only_for_the_same_options(grid, tmp_path):
+    path = str(tmp_path / 'distances.npy')
+    distance_matrix(grid, metric='euclidean', path=path, workers=1)
+    assert load_distances(path, grid, metric='euclidean') is not None
+    assert load_distances(path, grid, metric='dtw') is None
+    assert load_distances(path, grid, metric='euclidean', min_overlap=3.0) is None
+    assert load_distances(path, grid + 1, metric='euclidean') is None
+    assert load_distances(path, grid.iloc[:, ::-1], metric='euclidean') is None
+
+
+def test_similarity_order_is_a_permutation(grid):
+    order = similarity_order(grid, metric='dtw')
+    assert sorted(order) == sorted(grid.columns)
@@ -0,0 +1,307 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+import chess_elo_chart
+
+# Tiled rendering for rosters too tall for one figure.
+#
+# Players are split into tiles of a fixed number of rows. Each tile is its own small figure
+# with the same fixed geometry (no tight bbox), so every tile has exactly the same pixel
+# size and the tiles line up edge to edge. A tile interpolates only its own players, so peak
+# memory depends on the tile size, not on the roster. Tiles can be rendered in parallel.
+# The output directory gets a header strip (title and age axis), the tiles, an index.json
+# describing them and an index.html mosaic stacking them. Optionally it also gets a Deep
+# Zoom (DZI) pyramid built from the tiles one band at a time.
+#
+# Unlike the full chart, tiles list players from the top down, in roster order.
+
+DEFAULT_ROWS_PER_TILE = 50
+DEFAULT_OPTIONS = {
+    'rows_per_tile': DEFAULT_ROWS_PER_TILE,
+    'dpi': 120,
+    'render_mode': 'auto',
+    'width': 16.0,  # Figure width in inches
+    'label_width': 3.5,  # Room for the player labels, in inches
+    'row_height': 0.16,  # Height of one player row, in inches
+    'cache': None,  # rating_cache.GridCache for the interpolated grid
+}
+HEADER_HEIGHT = 0.9  # Inches
+RIGHT_MARGIN = 0.3  # Inches
+BACKGROUND = '#0d1117'
+PYRAMID_TILE_SIZE = 256
+
+# Per-worker state set up by _init_worker
+_worker = {}
+
+
+# Axes rectangle (in figure fractions) shared by the header and every tile so their age
+# axes line up exactly
+def _axes_rect(options, bottom, height):
+    left = options['label_width'] / options['width']
+    width = 1 - (options['label_width'] + RIGHT_MARGIN) / options['width']
+    return [left, bottom, width, height]
+
+
+def _style_tile_axes(ax, df, data, rows):
+    ax.set_yticks([i * chess_elo_chart.total_cell_size for i in range(len(df.columns))])
+    labels = [f"{player} ({max(rating for _, rating in data[player])})" for player in df.columns]
+    ax.set_yticklabels(labels, fontsize=8, fontweight='bold')
+    ax.tick_params(axis='y', length=0)
+    ax.set_xticks(range(10, 76, 5))
+    ax.tick_params(axis='x', which='both', bottom=False, labelbottom=False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.grid(True, linestyle='--', alpha=0.1, color='#30363d', axis='x')
+    ax.set_axisbelow(True)
+
+    # Every tile spans `rows` rows, even the last one, and lists its first player at the top
+    ax.set_xlim(9.5, 73.5)
+    ax.set_ylim((rows - 0.5) * chess_elo_chart.total_cell_size, -0.5 * chess_elo_chart.total_cell_size)
+
+
+# Title and age axis above the first tile
+def render_header(output, options=None):
+    import matplotlib.style
+
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    with matplotlib.style.context(['dark_background', chess_elo_chart.CHART_STYLE]):
+        fig = chess_elo_chart._new_figure((options['width'], HEADER_HEIGHT))
+        ax = fig.add_axes(_axes_rect(options, 0, 1e-3), label='header')
+        ax.set_yticks([])
+        ax.xaxis.set_ticks_position('top')
+        ax.set_xticks(range(10, 76, 5))
+        ax.set_xticks(range(10, 76, 1), minor=True)
+        ax.set_xlim(9.5, 73.5)  # After the ticks, which would widen it to 75, as in _style_tile_axes
+        ax.tick_params(axis='x', which='minor', length=2, color='#30363d')
+        ax.tick_params(axis='x', labelsize=9)
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+        fig.text(options['label_width'] / options['width'], 0.72, 'Chess Grandmasters ELO Rating Progression',
+                 fontsize=14, fontweight='bold', color='#c9d1d9')
+        fig.text(options['label_width'] / options['width'] - 0.01, 0.05, 'Age',
+                 fontsize=10, fontweight='bold', color='#c9d1d9', ha='right')
+        fig.savefig(output, dpi=options['dpi'], facecolor=BACKGROUND)
+    return output
+
+
+# Render one tile of players to `output`; only their rows are interpolated
+def render_tile(data, players, output, options=None, rating_matrix=None):
+    import matplotlib.style
+
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    rows = options['rows_per_tile']
+    if len(players) > rows:
+        raise ValueError(f"A tile holds at most {rows} players, got {len(players)}")
+    data = chess_elo_chart.select_players(data, players)
+    if rating_matrix is None:
+        df = chess_elo_chart.build_rating_matrix(data, chess_elo_chart.all_ages, cache=options['cache'])
+    else:
+        df = rating_matrix[list(data)]
+
+    with matplotlib.style.context(['dark_background', chess_elo_chart.CHART_STYLE]):
+        fig = chess_elo_chart._new_figure((options['width'], rows * options['row_height']))
+        ax = fig.add_axes(_axes_rect(options, 0, 1), label='main')
+        chess_elo_chart.draw_rating_grid(ax, df, chess_elo_chart.get_github_cmap(),
+                                         chess_elo_chart.get_rating_norm(), mode=options['render_mode'])
+        chess_elo_chart.draw_event_markers(ax, df)
+        _style_tile_axes(ax, df, data, rows)
+        fig.savefig(output, dpi=options['dpi'], facecolor=BACKGROUND)
+    return output
+
+
+def _init_worker(data, options):
+    _worker['data'] = data
+    _worker['options'] = options
+
+
+def _render_tile_job(job):
+    started = time.perf_counter()
+    index, players, output = job
+    render_tile(_worker['data'], players, output, _worker['options'])
+    return index, output, time.perf_counter() - started
+
+
+def _image_size(path):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return image.size
+
+
+# Render every tile of the roster into `directory` with `workers` processes (1 renders
+# in-process) and write the index and mosaic. Returns the index as a dict.
+def render_tiles(data=None, directory='tiles', options=None, workers=1, pyramid=False, progress=None):
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    data = chess_elo_chart.players_data if data is None else data
+    players = list(data)
+    rows = options['rows_per_tile']
+    os.makedirs(directory, exist_ok=True)
+
+    header = render_header(os.path.join(directory, 'header.png'), options)
+    jobs = [(k, players[start:start + rows], os.path.join(directory, f'tile_{k:05d}.png'))
+            for k, start in enumerate(range(0, len(players), rows))]
+
+    if workers == 1:
+        _init_worker(data, options)
+        results = map(_render_tile_job, jobs)
+        pool = None
+    else:
+        pool = get_context().Pool(workers or os.cpu_count() or 1, initializer=_init_worker,
+                                  initargs=(data, options))
+        results = pool.imap_unordered(_render_tile_job, jobs)
+    try:
+        for result in results:
+            if progress is not None:
+                progress(*result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    width, header_height = _image_size(header)
+    tile_height = _image_size(jobs[0][2])[1] if jobs else 0
+    index = {
+        'width': width,
+        'header': {'file': os.path.basename(header), 'height': header_height},
+        'tile_height': tile_height,
+        'rows_per_tile': rows,
+        'dpi': options['dpi'],
+        'tiles': [{'file': os.path.basename(output), 'first_row': k * rows, 'players': tile_players}
+                  for k, tile_players, output in jobs],
+    }
+    with open(os.path.join(directory, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    _write_mosaic(os.path.join(directory, 'index.html'), index)
+
+    if pyramid:
+        strips = [header] + [output for _, _, output in jobs]
+        index['pyramid'] = build_pyramid(strips, directory)
+    return index
+
+
+def _write_mosaic(path, index):
+    images = [index['header']] + index['tiles']
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html><head><meta charset="utf-8">'
+                '<title>Chess Grandmasters ELO Rating Progression</title>'
+                f'<style>body{{background:{BACKGROUND};margin:0}}img{{display:block}}</style>'
+                '</head><body>\n')
+        for image in images:
+            f.write(f'<img src="{image["file"]}" width="{index["width"]}" loading="lazy" alt="">\n')
+        f.write('</body></html>\n')
+
+
+# Deep Zoom pyramid of the vertically stacked `strips` (images of equal width), written as
+# <name>.dzi plus <name>_files/<level>/<col>_<row>.png. The full-resolution level is cut one
+# band of tile rows at a time; every lower level is built from the four child tiles of each
+# tile, so memory stays bounded by a band rather than by the whole image.
+def build_pyramid(strips, directory, name='chart', tile_size=PYRAMID_TILE_SIZE):
+    from PIL import Image
+
+    sizes = [_image_size(path) for path in strips]
+    width = max(w for w, _ in sizes)
+    height = sum(h for _, h in sizes)
+    offsets = np.concatenate([[0], np.cumsum([h for _, h in sizes])])
+    max_level = max(math.ceil(math.log2(max(width, height))), 0)
+    files = os.path.join(directory, f'{name}_files')
+
+    def tile_path(level, col, row):
+        return os.path.join(files, str(level), f'{col}_{row}.png')
+
+    os.makedirs(os.path.join(files, str(max_level)), exist_ok=True)
+    loaded = {}
+    for row, top in enumerate(range(0, height, tile_size)):
+        bottom = min(top + tile_size, height)
+        band = Image.new('RGBA', (width, bottom - top), BACKGROUND)
+        for k, (w, h) in enumerate(sizes):
+            if offsets[k] >= bottom or offsets[k] + h <= top:
+                continue
+            if k not in loaded:
+                loaded[k] = Image.open(strips[k]).convert('RGBA')
+            crop = loaded[k].crop((0, max(top - offsets[k], 0), w, min(bottom - offsets[k], h)))
+            band.paste(crop, (0, max(offsets[k] - top, 0)))
+        for k in [k for k in loaded if offsets[k] + sizes[k][1] <= bottom]:
+            del loaded[k]
+        for col, left in enumerate(range(0, width, tile_size)):
+            band.crop((left, 0, min(left + tile_size, width), band.height)).save(tile_path(max_level, col, row))
+
+    child_width, child_height = width, height
+    for level in range(max_level - 1, -1, -1):
+        os.makedirs(os.path.join(files, str(level)), exist_ok=True)
+        level_width, level_height = math.ceil(child_width / 2), math.ceil(child_height / 2)
+        child_cols, child_rows = math.ceil(child_width / tile_size), math.ceil(child_height / tile_size)
+        for row in range(math.ceil(level_height / tile_size)):
+            for col in range(math.ceil(level_width / tile_size)):
+                block = Image.new('RGBA', (min(2 * tile_size, child_width - 2 * col * tile_size),
+                                           min(2 * tile_size, child_height - 2 * row * tile_size)))
+                for dy in (0, 1):
+                    for dx in (0, 1):
+                        if 2 * col + dx < child_cols and 2 * row + dy < child_rows:
+                            with Image.open(tile_path(level + 1, 2 * col + dx, 2 * row + dy)) as child:
+                                block.paste(child, (dx * tile_size, dy * tile_size))
+                block = block.resize((math.ceil(block.width / 2), math.ceil(block.height / 2)), Image.LANCZOS)
+                block.save(tile_path(level, col, row))
+        child_width, child_height = level_width, level_height
+
+    descriptor = os.path.join(directory, f'{name}.dzi')
+    with open(descriptor, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="png" '
+                f'Overlap="0" TileSize="{tile_size}"><Size Width="{width}" Height="{height}"/></Image>\n')
+    return {'file': os.path.basename(descriptor), 'width': width, 'height': height, 'levels': max_level + 1}
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m tiled_render',
+        description='Render a large roster as fixed-height tiles with an index, a mosaic '
+                    'and optionally a Deep Zoom pyramid.')
+    parser.add_argument('input', nargs='?',
+                        help='JSON file mapping player names to [[age, rating], ...] '
+                             '(defaults to the built-in roster)')
+    parser.add_argument('-o', '--output-dir', default='tiles',
+                        help='directory for the tiles and index (default: %(default)s)')
+    parser.add_argument('--rows-per-tile', type=int, default=DEFAULT_ROWS_PER_TILE,
+                        help='players per tile (default: %(default)s)')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_OPTIONS['dpi'],
+                        help='output resolution (default: %(default)s)')
+    parser.add_argument('--render-mode', choices=chess_elo_chart.RENDER_MODES,
+                        default=DEFAULT_OPTIONS['render_mode'],
+                        help='engine used to draw the rating grid (default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='worker processes, 0 for all cores (default: %(default)s)')
+    parser.add_argument('--pyramid', action='store_true', help='also build a Deep Zoom (DZI) pyramid')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only print the summary')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    data = chess_elo_chart.load_players_data(args.input) if args.input else None
+    cache = None
+    if args.cache_dir:
+        from rating_cache import GridCache
+        cache = GridCache(args.cache_dir)
+    options = {'rows_per_tile': args.rows_per_tile, 'dpi': args.dpi,
+               'render_mode': args.render_mode, 'cache': cache}
+
+    progress = None if args.quiet else (lambda index, output, seconds: print(f"{output} ({seconds:.2f}s)"))
+    started = time.perf_counter()
+    index = render_tiles(data, args.output_dir, options, workers=args.workers,
+                         pyramid=args.pyramid, progress=progress)
+    elapsed = time.perf_counter() - started
+    print(f"Rendered {len(index['tiles'])} tiles of {index['width']}x{index['tile_height']} px "
+          f"to {args.output_dir} in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,444 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from multiprocessing import get_context
+
+import numpy as np
+
+import chess_elo_chart
+from career_stats import recorded_mask
+
+# Career-trajectory similarity and clustering over the chart's age-aligned rating grid.
+#
+# Players are compared through their interpolated ratings (ages x players, as the chart
+# draws them), restricted to the ages inside each recorded career so the clamped ends do
+# not count:
+#
+# - 'euclidean': root mean square rating difference over the ages both players were
+#   rated at. Expanding the square turns a whole block of pairs into four matrix products
+#   of the masked ratings, their squares and the masks. Pairs sharing fewer than
+#   `min_overlap` years are infinitely far apart.
+# - 'dtw': dynamic time warping of the two careers, each resampled to one point every
+#   `dtw_step` years from its own start. The start age is ignored, so a late bloomer can
+#   match a prodigy with the same shape of career. The recurrence runs one grid cell at a
+#   time over a whole batch of pairs, optionally inside a Sakoe-Chiba band of `window`
+#   steps. The result is the RMS difference per step of the longer career.
+#
+# The n x n distance matrix is computed in square blocks of `block` players spread over a
+# process pool. Each worker writes its blocks straight into a float32 .npy memory map, so
+# memory stays bounded by a block: 10,000 players take 400 MB on disk, not in every worker.
+# Nearest neighbours are read off the matrix a block of rows at a time. Hierarchical
+# clustering (scipy) works on its condensed form, and k-means on the resampled careers
+# themselves. The leaf order of the hierarchical clustering is the chart's 'row_order',
+# which puts similar careers next to each other.
+
+METRICS = ('euclidean', 'dtw')
+LINKAGE_METHODS = ('average', 'complete', 'single', 'weighted')
+DEFAULT_BLOCK = 512  # Players per side of a block of the distance matrix
+DEFAULT_MIN_OVERLAP = 2.0  # Years two careers must share to be compared by 'euclidean'
+DEFAULT_DTW_STEP = 1.0  # Years between the points of a career compared by 'dtw'
+DTW_BATCH = 32768  # Pairs advanced together through the DTW recurrence
+CENTRE = 2500.0  # Subtracted from ratings before expanding squares, for precision
+
+# Per-worker state set up by _init_worker
+_worker = {}
+
+
+# Ratings of the age grid with NaN outside each player's recorded career. Without the
+# roster the grid is used as is.
+def career_matrix(df, data=None):
+    values = df.to_numpy(dtype=np.float64, copy=True)
+    if data is not None:
+        values[~recorded_mask(df, data)] = np.nan
+    return values
+
+
+# Every career resampled every `step` years from its first recorded age, left-aligned:
+# (players x points) padded with zeros, and the number of points of each player
+def resample_careers(values, positions, step=DEFAULT_DTW_STEP):
+    valid = ~np.isnan(values)
+    rated = valid.any(axis=0)
+    grid_step = positions[1] - positions[0] if len(positions) > 1 else 1.0
+    first = np.where(rated, valid.argmax(axis=0), 0)
+    last = np.where(rated, len(positions) - 1 - valid[::-1].argmax(axis=0), -1)
+    lengths = np.where(rated, np.floor((last - first) * grid_step / step + 1e-9).astype(np.int64) + 1, 0)
+
+    # Fractional grid rows of every point, interpolated linearly between grid rows
+    points = np.arange(max(int(lengths.max(initial=0)), 1))
+    rows = first[:, None] + points[None, :] * (step / grid_step)
+    inside = points[None, :] < lengths[:, None]
+    rows = np.where(inside, rows, first[:, None])
+    lo = np.minimum(np.floor(rows).astype(np.int64), len(positions) - 1)
+    hi = np.minimum(lo + 1, np.maximum(last, 0)[:, None])
+    frac = rows - lo
+    columns = np.arange(values.shape[1])[:, None]
+    filled = np.nan_to_num(values)
+    careers = filled[lo, columns] * (1 - frac) + filled[hi, columns] * frac
+    return np.where(inside, careers, 0.0), lengths
+
+
+# What the distance workers need for a metric, built once in the parent
+def _prepare(values, positions, metric, min_overlap, dtw_step, window):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {', '.join(METRICS)}")
+    if metric == 'euclidean':
+        mask = (~np.isnan(values)).astype(np.float64)
+        centred = np.nan_to_num(values - CENTRE)
+        step = positions[1] - positions[0] if len(positions) > 1 else 1.0
+        return {'metric': metric, 'x': centred, 'x2': centred ** 2, 'mask': mask,
+                'min_points': min_overlap / step - 1e-9}
+    careers, lengths = resample_careers(values, positions, dtw_step)
+    return {'metric': metric, 'careers': careers, 'lengths': lengths, 'window': window}
+
+
+def _euclidean_block(prepared, rows, columns):
+    x, x2, mask = prepared['x'], prepared['x2'], prepared['mask']
+    shared = mask[:, rows].T @ mask[:, columns]
+    squares = (x2[:, rows].T @ mask[:, columns] + mask[:, rows].T @ x2[:, columns]
+               - 2 * x[:, rows].T @ x[:, columns])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distances = np.sqrt(np.maximum(squares, 0) / shared)
+    distances[shared < max(prepared['min_points'], 1)] = np.inf
+    return distances
+
+
+# DTW distances of the careers a[k] and b[k] (left-aligned, with la[k] and lb[k] points).
+# Arrays are laid out (points x pairs) so every step of the recurrence is a contiguous
+# vector operation over the batch.
+def dtw_distances(a, b, la, lb, window=None):
+    pairs = len(la)
+    result = np.full(pairs, np.inf)
+    if pairs == 0:
+        return result
+    n_a, n_b = int(la.max()), int(lb.max())
+    a = np.ascontiguousarray(a[:, :n_a].T)
+    b = np.ascontiguousarray(b[:, :n_b].T)
+    width = None if window is None else np.maximum(window, np.abs(la - lb))
+    reach = max(n_a, n_b) if width is None else int(width.max())
+    offsets = np.arange(1, n_b + 1)[:, None]
+
+    previous = np.full((n_b + 1, pairs), np.inf)
+    previous[0] = 0
+    current = np.empty_like(previous)
+    for i in range(1, n_a + 1):
+        lo, hi = max(1, i - reach), min(n_b, i + reach)  # Columns j of row i inside the band
+        cost = (a[i - 1] - b[lo - 1:hi]) ** 2
+        if width is not None:
+            np.copyto(cost, np.inf, where=np.abs(offsets[lo - 1:hi] - i) > width)
+        best = np.minimum(previous[lo - 1:hi], previous[lo:hi + 1])  # From (i-1, j-1) or (i-1, j)
+        current[lo - 1:hi + 2].fill(np.inf)
+        for j in range(lo, hi + 1):
+            np.minimum(best[j - lo], current[j - 1], out=current[j])  # ... or (i, j-1)
+            current[j] += cost[j - lo]
+        done = np.flatnonzero(la == i)
+        result[done] = current[lb[done], done]
+        previous, current = current, previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(result / np.maximum(la, lb))
+
+
+def _dtw_block(prepared, rows, columns, upper=False):
+    careers, lengths = prepared['careers'], prepared['lengths']
+    row_index, column_index = np.meshgrid(rows, columns, indexing='ij')
+    keep = row_index < column_index if upper else np.ones(row_index.shape, dtype=bool)
+    pair_rows, pair_columns = row_index[keep], column_index[keep]
+    if prepared['window'] is not None:
+        # Batch pairs of similar length difference together, which keeps each batch's band narrow
+        order = np.argsort(np.abs(lengths[pair_rows] - lengths[pair_columns]), kind='stable')
+        pair_rows, pair_columns = pair_rows[order], pair_columns[order]
+
+    distances = np.zeros(row_index.shape)
+    for start in range(0, len(pair_rows), DTW_BATCH):
+        i, j = pair_rows[start:start + DTW_BATCH], pair_columns[start:start + DTW_BATCH]
+        distances[i - rows[0], j - columns[0]] = dtw_distances(careers[i], careers[j], lengths[i], lengths[j],
+                                                               prepared['window'])
+    if upper:
+        distances = np.triu(distances, 1) + np.triu(distances, 1).T
+    return distances
+
+
+# Distances between the players at positions `rows` and those at `columns`
+def _distance_block(prepared, rows, columns, diagonal=False):
+    if prepared['metric'] == 'euclidean':
+        distances = _euclidean_block(prepared, rows, columns)
+    else:
+        distances = _dtw_block(prepared, rows, columns, upper=diagonal)
+    if diagonal:
+        np.fill_diagonal(distances, 0)
+    return distances
+
+
+def _init_worker(path, prepared):
+    _worker['out'] = np.load(path, mmap_mode='r+')
+    _worker['prepared'] = prepared
+
+
+def _distance_job(job):
+    (r0, r1), (c0, c1) = job
+    distances = _distance_block(_worker['prepared'], np.arange(r0, r1), np.arange(c0, c1), diagonal=r0 == c0)
+    out = _worker['out']
+    out[r0:r1, c0:c1] = distances
+    out[c0:c1, r0:r1] = distances.T
+    out.flush()
+    return (r1 - r0) * (c1 - c0)
+
+
+# What a distance matrix was computed from: the metric and its parameters, and a digest of
+# the players and their careers. Stored in a .json file next to the matrix's .npy.
+def _matrix_key(df, data, metric, min_overlap, dtw_step, window):
+    digest = hashlib.sha1('\0'.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(np.ascontiguousarray(career_matrix(df, data)).tobytes())
+    return {'metric': metric, 'min_overlap': min_overlap, 'dtw_step': dtw_step, 'window': window,
+            'players': len(df.columns), 'roster': digest.hexdigest()}
+
+
+def _key_path(path):
+    return path + '.json'
+
+
+# A distance matrix saved by distance_matrix(path=...), memory-mapped, when it was computed
+# for this roster with these parameters; None otherwise
+def load_distances(path, df, data=None, metric='euclidean', min_overlap=DEFAULT_MIN_OVERLAP,
+                   dtw_step=DEFAULT_DTW_STEP, window=None):
+    try:
+        with open(_key_path(path), encoding='utf-8') as f:
+            key = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if key != _matrix_key(df, data, metric, min_overlap, dtw_step, window) or not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+# n x n float32 matrix of trajectory distances between the players of the age-grid rating
+# matrix `df`. Give the roster as `data` to compare recorded careers only. With `path` the
+# matrix is written to that .npy file (with its parameters in path + '.json', see
+# load_distances) and returned memory-mapped; without it, it is returned in memory. Blocks are spread over `workers` processes (all cores when None).
+def distance_matrix(df, data=None, metric='euclidean', path=None, block=DEFAULT_BLOCK, workers=None,
+                    min_overlap=DEFAULT_MIN_OVERLAP, dtw_step=DEFAULT_DTW_STEP, window=None, progress=None):
+    positions = df.index.to_numpy(dtype=np.float64)
+    prepared = _prepare(career_matrix(df, data), positions, metric, min_overlap, dtw_step, window)
+    n = len(df.columns)
+    if path is None:
+        with tempfile.TemporaryDirectory() as directory:
+            distances = distance_matrix(df, data, metric, os.path.join(directory, 'distances.npy'), block,
+                                        workers, min_overlap, dtw_step, window, progress)
+            return np.array(distances)
+
+    if os.path.exists(_key_path(path)):
+        os.remove(_key_path(path))  # The old key no longer describes the file
+    np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(n, n)).flush()
+    bounds = [(start, min(start + block, n)) for start in range(0, n, block)]
+    jobs = [(rows, columns) for k, rows in enumerate(bounds) for columns in bounds[k:]]
+    total, done = n * (n + 1) // 2, 0
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        _init_worker(path, prepared)
+        results = map(_distance_job, jobs)
+    else:
+        pool = get_context().Pool(workers, initializer=_init_worker, initargs=(path, prepared))
+        results = pool.imap_unordered(_distance_job, jobs)
+    try:
+        for cells in results:
+            done += cells
+            if progress is not None:
+                progress(min(done, total), total)
+    finally:
+        if workers > 1:
+            pool.close()
+            pool.join()
+        _worker.clear()
+    with open(_key_path(path), 'w', encoding='utf-8') as f:
+        json.dump(_matrix_key(df, data, metric, min_overlap, dtw_step, window), f, indent=2)
+    return np.load(path, mmap_mode='r')
+
+
+# Distances from one player to every player of `df`, without the full matrix
+def distances_to(df, player, data=None, metric='euclidean', min_overlap=DEFAULT_MIN_OVERLAP,
+                 dtw_step=DEFAULT_DTW_STEP, window=None):
+    players = list(df.columns)
+    if player not in players:
+        raise KeyError(f"Unknown players: {player}")
+    positions = df.index.to_numpy(dtype=np.float64)
+    prepared = _prepare(career_matrix(df, data), positions, metric, min_overlap, dtw_step, window)
+    distances = _distance_block(prepared, np.array([players.index(player)]), np.arange(len(players)))[0]
+    distances[players.index(player)] = 0
+    return distances
+
+
+# [(player, distance), ...] of the k players closest to `player`, from a row of distances
+# (as returned by distances_to) or the full matrix
+def nearest(distances, players, player, k=5):
+    players = list(players)
+    index = players.index(player)
+    row = np.asarray(distances[index] if np.ndim(distances) == 2 else distances, dtype=np.float64)
+    row = row.copy()
+    row[index] = np.inf
+    order = np.argsort(row, kind='stable')[:k]
+    return [(players[column], float(row[column])) for column in order if np.isfinite(row[column])]
+
+
+# Columns and distances (n x k) of every player's k nearest neighbours, read from the
+# distance matrix a block of rows at a time. Missing neighbours have column -1.
+def nearest_neighbours(distances, k=5, block=DEFAULT_BLOCK):
+    n = len(distances)
+    k = min(k, n - 1)
+    columns = np.full((n, k), -1, dtype=np.int64)
+    values = np.full((n, k), np.inf, dtype=np.float32)
+    for start in range(0, n, block):
+        rows = np.array(distances[start:start + block], dtype=np.float32)
+        rows[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+        top = np.argpartition(rows, k - 1, axis=1)[:, :k] if k < n - 1 else np.argsort(rows, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(rows, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        found = np.take_along_axis(rows, top, axis=1)
+        columns[start:start + len(rows)] = np.where(np.isfinite(found), top, -1)
+        values[start:start + len(rows)] = found
+    return columns, values
+
+
+# Condensed (upper triangle) float64 form of a distance matrix for scipy, built a row at
+# a time. Pairs without a distance are placed twice as far apart as the farthest pair.
+def condensed_distances(distances):
+    n = len(distances)
+    condensed = np.empty(n * (n - 1) // 2)
+    start = 0
+    for row in range(n - 1):
+        condensed[start:start + n - row - 1] = distances[row, row + 1:]
+        start += n - row - 1
+    finite = np.isfinite(condensed)
+    farthest = condensed[finite].max(initial=0.0)
+    condensed[~finite] = 2 * farthest if farthest > 0 else 1.0
+    return condensed
+
+
+# Hierarchical clustering of a distance matrix: (cluster label of every player, 1 to
+# n_clusters, and the leaf order of the dendrogram). The leaf order is optimal (adjacent
+# leaves as similar as possible) up to `optimal_limit` players.
+def hierarchical_clusters(distances, n_clusters=8, method='average', optimal_limit=2000):
+    from scipy.cluster.hierarchy import fcluster, leaves_list, linkage, optimal_leaf_ordering
+
+    if method not in LINKAGE_METHODS:
+        raise ValueError(f"Unknown linkage method {method!r}, expected one of {', '.join(LINKAGE_METHODS)}")
+    n = len(distances)
+    if n < 2:
+        return np.ones(n, dtype=np.int64), np.arange(n)
+    condensed = condensed_distances(distances)
+    tree = linkage(condensed, method)
+    if n <= optimal_limit:
+        tree = optimal_leaf_ordering(tree, condensed)
+    return fcluster(tree, n_clusters, 'maxclust').astype(np.int64), leaves_list(tree)
+
+
+# k-means clustering of the careers on the age grid (clamped ends included, as drawn),
+# sampled every `step` years: (cluster label of every player, 0 to k-1, and the centroid
+# trajectories, k x ages)
+def kmeans_clusters(df, k=8, step=DEFAULT_DTW_STEP, seed=0):
+    from scipy.cluster.vq import kmeans2
+
+    positions = df.index.to_numpy(dtype=np.float64)
+    grid_step = positions[1] - positions[0] if len(positions) > 1 else 1.0
+    rows = np.arange(0, len(positions), max(int(round(step / grid_step)), 1))
+    features = df.to_numpy(dtype=np.float64)[rows].T
+    centroids, labels = kmeans2(features, min(k, len(features)), minit='++', rng=seed)
+    return labels.astype(np.int64), centroids
+
+
+# Players of `df` reordered so similar careers sit next to each other (the leaf order of
+# an average-linkage clustering), as used by the chart's 'row_order' option
+def similarity_order(df, data=None, metric='euclidean', workers=1, **kwargs):
+    players = list(df.columns)
+    if len(players) < 3:
+        return players
+    distances = distance_matrix(df, data, metric, workers=workers, **kwargs)
+    order = hierarchical_clusters(distances, n_clusters=1)[1]
+    return [players[column] for column in order]
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m trajectory_similarity',
+        description='Compare, query and cluster career rating trajectories.')
+    parser.add_argument('--input', help='JSON roster file or player store (defaults to the built-in roster)')
+    parser.add_argument('--metric', choices=METRICS, default='euclidean',
+                        help='trajectory distance (default: %(default)s)')
+    parser.add_argument('--min-overlap', type=float, default=DEFAULT_MIN_OVERLAP,
+                        help="years two careers must share for 'euclidean' (default: %(default)s)")
+    parser.add_argument('--dtw-step', type=float, default=DEFAULT_DTW_STEP,
+                        help="years between career points for 'dtw' (default: %(default)s)")
+    parser.add_argument('--window', type=int,
+                        help="Sakoe-Chiba band of 'dtw', in points (default: unconstrained)")
+    parser.add_argument('--distances',
+                        help='.npy file of the distance matrix, reused when computed for the same roster and options')
+    parser.add_argument('--block', type=int, default=DEFAULT_BLOCK,
+                        help='players per side of a block of the distance matrix (default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, help='worker processes (default: all cores)')
+    parser.add_argument('--cache-dir', help='directory of the interpolated grid cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    near = commands.add_parser('nearest', help='players whose careers are closest to a player')
+    near.add_argument('player')
+    near.add_argument('-k', type=int, default=10, help='number of players (default: %(default)s)')
+    commands.add_parser('matrix', help='compute the distance matrix into --distances')
+    clusters = commands.add_parser('clusters', help='cluster the careers')
+    clusters.add_argument('-n', '--clusters', type=int, default=8, help='number of clusters (default: %(default)s)')
+    clusters.add_argument('--method', choices=LINKAGE_METHODS + ('kmeans',), default='average',
+                          help='linkage method, or kmeans (default: %(default)s)')
+    commands.add_parser('order', help='print the players with similar careers next to each other')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    options = {'min_overlap': args.min_overlap, 'dtw_step': args.dtw_step, 'window': args.window}
+
+    def matrix():
+        if args.distances:
+            distances = load_distances(args.distances, df, data, args.metric, **options)
+            if distances is not None:
+                return distances
+        return distance_matrix(df, data, args.metric, args.distances, args.block, args.workers, **options)
+
+    try:
+        data = chess_elo_chart.load_players_data(args.input) if args.input else chess_elo_chart.players_data
+        cache = None
+        if args.cache_dir:
+            from rating_cache import GridCache
+            cache = GridCache(args.cache_dir)
+        df = chess_elo_chart.build_rating_matrix(data, chess_elo_chart.all_ages, cache=cache)
+        players = list(df.columns)
+        if args.command == 'nearest':
+            distances = distances_to(df, args.player, data, args.metric, **options)
+            for player, distance in nearest(distances, players, args.player, args.k):
+                print(f"{distance:8.1f}  {player}")
+        elif args.command == 'matrix':
+            if not args.distances:
+                print("error: matrix needs --distances", file=sys.stderr)
+                return 2
+            distance_matrix(df, data, args.metric, args.distances, args.block, args.workers, **options)
+            print(f"Wrote {len(players):,} x {len(players):,} distances to {args.distances}")
+        elif args.command == 'clusters':
+            if args.method == 'kmeans':
+                labels, _ = kmeans_clusters(df, args.clusters)
+                labels = labels + 1
+            else:
+                labels, _ = hierarchical_clusters(matrix(), args.clusters, args.method)
+            for label in np.unique(labels):
+                members = [players[column] for column in np.flatnonzero(labels == label)]
+                print(f"{label:>3}  ({len(members)})  {', '.join(members)}")
+        else:
+            for column in hierarchical_clusters(matrix(), 1)[1]:
+                print(players[column])
+    except OSError as e:
+        print(f"error: {e.filename}: {e.strerror}", file=sys.stderr)
+        return 2
+    except (KeyError, ValueError) as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())